@@ -0,0 +1,317 @@
+"""
+Micro-benchmarks for the NumLab front end.
+
+It measures:
+
+    - ``compile_patt`` compile time for each family of regex patterns.
+    - ``RegexPattern.match`` throughput.
+    - ``tknz.tokenize`` throughput on generated sources of increasing size.
+    - ``LR1Table`` load time from the table cache.
+    - ``LR1Parser.parse`` throughput (tokens and reductions per second).
+    - ``RAParser.parse`` throughput.
+    - ``LR1Parser.recognize`` throughput (syntax check without ASTs).
+
+The results are printed as a table and can be saved as JSON so they can be
+compared between runs.
+
+Usage:
+
+    python benchmarks/frontend.py [--repeat N] [--sizes 50,200] [--output out.json]
+"""
+
+import argparse
+import json
+import platform
+import random
+import statistics
+import sys
+import time
+from functools import wraps
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+# pylint: disable=wrong-import-position
+import numlab
+from numlab.compiler import Grammar, LR1Parser, LR1Table, RAParser, Token
+from numlab.nl_builders import builders
+from numlab.nl_tokenizer import tknz
+from numlab.nlre import compile_patt
+
+NUMLAB_DIR = Path(numlab.__file__).parent
+GRAMMAR_FILE = NUMLAB_DIR / "nl_grammar.gm"
+
+PATTERN_FAMILIES = {
+    "literal": [r"+=", r"\*\*=", r"<<=", r"==", r"//"],
+    "class": [r"\d\d*", r"(\a|\A|_)(\a|\A|\d|_)*", r"\d\d*|\d\d*\.\d\d*"],
+    "alternation": [r"( |\t)( |\t)*", r"if|elif|else|while|for|def|class"],
+    "negated": [r"'((^')|(\\'))*(^\\)'", r"\"((^\")|(\\\"))*(^\\)\""],
+}
+
+MATCH_CASES = {
+    "name": (r"(\a|\A|_)(\a|\A|\d|_)*", "some_variable_name_42 = 3"),
+    "number": (r"\d\d*|\d\d*\.\d\d*", "31415.92653 + 1"),
+    "string": (r"'((^')|(\\'))*(^\\)'", "'a string with \\' escaped quotes' + x"),
+    "no_match": (r"\d\d*", "not_a_number"),
+}
+
+
+def generate_source(lines: int, seed: int = 0) -> str:
+    """Generates a NumLab program with (about) the given number of lines.
+
+    Parameters
+    ----------
+    lines : int
+        Number of lines of the program.
+    seed : int, optional
+        Random seed, by default 0.
+
+    Returns
+    -------
+    str
+        Program source.
+    """
+    rnd = random.Random(seed)
+    blocks = []
+    count = 0
+    i = 0
+    while count < lines:
+        k, j = rnd.randint(1, 99), rnd.randint(1, 99)
+        block = (
+            f"def f{i}(a, b):\n"
+            f"    c = a * {k} + b - {j}\n"
+            f"    while c > {k}:\n"
+            f"        c = c - 1\n"
+            f"    return c\n"
+            f"\n"
+            f"x{i} = f{i}({k}, {j})\n"
+            f"for i in range({k}):\n"
+            f"    x{i} = x{i} + i * 2\n"
+            f"if x{i} > {j}:\n"
+            f"    print(x{i}, 'x{i}', [1, 2, 3])\n"
+        )
+        blocks.append(block)
+        count += block.count("\n")
+        i += 1
+    return "".join(blocks)
+
+
+def measure(func: Callable[[], Any], repeat: int) -> Dict[str, float]:
+    """Runs a function several times and returns timing statistics.
+
+    Parameters
+    ----------
+    func : Callable[[], Any]
+        Function to be measured.
+    repeat : int
+        Number of runs.
+
+    Returns
+    -------
+    Dict[str, float]
+        Min, mean, and standard deviation (in seconds) of the runs.
+    """
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return {
+        "min": min(times),
+        "mean": statistics.mean(times),
+        "stdev": statistics.stdev(times) if len(times) > 1 else 0.0,
+        "runs": repeat,
+    }
+
+
+def load_grammar() -> Grammar:
+    grammar = Grammar.open(str(GRAMMAR_FILE))
+    grammar.assign_builders(builders)
+    return grammar
+
+
+def bench_compile_patt(repeat: int) -> List[Dict[str, Any]]:
+    results = []
+    for family, patterns in PATTERN_FAMILIES.items():
+        stats = measure(lambda: [compile_patt(patt) for patt in patterns], repeat)
+        results.append(
+            {
+                "name": f"compile_patt[{family}]",
+                "stats": stats,
+                "patterns": len(patterns),
+                "per_pattern": stats["min"] / len(patterns),
+            }
+        )
+    return results
+
+
+def bench_regex_match(repeat: int, count: int = 200) -> List[Dict[str, Any]]:
+    results = []
+    for case, (patt, text) in MATCH_CASES.items():
+        compiled = compile_patt(patt)
+        stats = measure(lambda: [compiled.match(text) for _ in range(count)], repeat)
+        results.append(
+            {
+                "name": f"RegexPattern.match[{case}]",
+                "stats": stats,
+                "matches_per_sec": count / stats["min"],
+            }
+        )
+    return results
+
+
+def bench_tokenize(repeat: int, sizes: List[int]) -> List[Dict[str, Any]]:
+    results = []
+    for size in sizes:
+        source = generate_source(size)
+        tokens = len(tknz.tokenize(source))
+        stats = measure(lambda: tknz.tokenize(source), repeat)
+        results.append(
+            {
+                "name": f"tokenize[{size} lines]",
+                "stats": stats,
+                "lines": size,
+                "tokens": tokens,
+                "tokens_per_sec": tokens / stats["min"],
+            }
+        )
+    return results
+
+
+def bench_table_load(repeat: int) -> List[Dict[str, Any]]:
+    grammar = load_grammar()
+    LR1Table(grammar, lalr=True, use_cache=True)
+    stats = measure(lambda: LR1Table(grammar, lalr=True, use_cache=True), repeat)
+    return [{"name": "LR1Table.load", "stats": stats}]
+
+
+def _count_reductions(grammar: Grammar, tokens: list) -> int:
+    counter = {"reductions": 0}
+
+    def counting(builder):
+        @wraps(builder)
+        def wrapper(*args):
+            counter["reductions"] += 1
+            return builder(*args)
+
+        return wrapper
+
+    # Identity productions are not reduced by the parser
+    for _, prod in grammar.all_productions():
+        if not prod.is_identity:
+            prod.set_builder(counting(prod._builder))
+    LR1Parser(grammar, lalr=True, use_cache=True).parse(list(tokens))
+    return counter["reductions"]
+
+
+def bench_parse(repeat: int, sizes: List[int]) -> List[Dict[str, Any]]:
+    results = []
+    parser = LR1Parser(load_grammar(), lalr=True, use_cache=True)
+    for size in sizes:
+        tokens = tknz.tokenize(generate_source(size))
+        tokens.append(Token("$", "$"))
+        reductions = _count_reductions(load_grammar(), tokens)
+        stats = measure(lambda: parser.parse(list(tokens)), repeat)
+        results.append(
+            {
+                "name": f"LR1Parser.parse[{size} lines]",
+                "stats": stats,
+                "lines": size,
+                "tokens": len(tokens),
+                "reductions": reductions,
+                "tokens_per_sec": len(tokens) / stats["min"],
+                "reductions_per_sec": reductions / stats["min"],
+            }
+        )
+    return results
+
+
+def bench_parse_ra(repeat: int, sizes: List[int]) -> List[Dict[str, Any]]:
+    results = []
+    parser = RAParser(load_grammar(), lalr=True, use_cache=True)
+    for size in sizes:
+        tokens = tknz.tokenize(generate_source(size))
+        tokens.append(Token("$", "$"))
+        stats = measure(lambda: parser.parse(list(tokens)), repeat)
+        results.append(
+            {
+                "name": f"RAParser.parse[{size} lines]",
+                "stats": stats,
+                "lines": size,
+                "tokens": len(tokens),
+                "tokens_per_sec": len(tokens) / stats["min"],
+            }
+        )
+    return results
+
+
+def bench_recognize(repeat: int, sizes: List[int]) -> List[Dict[str, Any]]:
+    results = []
+    parser = LR1Parser(load_grammar(), lalr=True, use_cache=True)
+    for size in sizes:
+        tokens = tknz.tokenize(generate_source(size))
+        tokens.append(Token("$", "$"))
+        stats = measure(lambda: parser.recognize(tokens), repeat)
+        results.append(
+            {
+                "name": f"LR1Parser.recognize[{size} lines]",
+                "stats": stats,
+                "lines": size,
+                "tokens": len(tokens),
+                "tokens_per_sec": len(tokens) / stats["min"],
+            }
+        )
+    return results
+
+
+BENCHMARKS = {
+    "compile_patt": lambda args: bench_compile_patt(args.repeat),
+    "regex_match": lambda args: bench_regex_match(args.repeat),
+    "tokenize": lambda args: bench_tokenize(args.repeat, args.sizes),
+    "table_load": lambda args: bench_table_load(args.repeat),
+    "parse": lambda args: bench_parse(args.repeat, args.sizes),
+    "parse_ra": lambda args: bench_parse_ra(args.repeat, args.sizes),
+    "recognize": lambda args: bench_recognize(args.repeat, args.sizes),
+}
+
+
+def main(argv: List[str] = None) -> Dict[str, Any]:
+    arg_parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    arg_parser.add_argument("--repeat", type=int, default=3, help="runs per case")
+    arg_parser.add_argument(
+        "--sizes",
+        type=lambda val: [int(size) for size in val.split(",")],
+        default=[50, 200, 800],
+        help="comma separated source sizes (in lines)",
+    )
+    arg_parser.add_argument(
+        "--only",
+        action="append",
+        choices=list(BENCHMARKS),
+        help="run only the given benchmarks",
+    )
+    arg_parser.add_argument("--output", "-o", help="JSON output file")
+    args = arg_parser.parse_args(argv)
+
+    results = []
+    for name in args.only or BENCHMARKS:
+        for result in BENCHMARKS[name](args):
+            results.append(result)
+            print(f"{result['name']:<40} min: {result['stats']['min'] * 1000:10.3f} ms")
+
+    report = {
+        "numlab": numlab.__version__,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as out_f:
+            json.dump(report, out_f, indent=2)
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -524,6 +524,7 @@ class Automata:
         self,
         input_: Iterable,
         stop_at_end: bool = False,
+        start: int = 0,
     ) -> bool:
         """
         Run the automata on the given input.
@@ -534,6 +535,8 @@ class Automata:
             The input to run the automata on.
         stop_at_end : bool
             Whether to stop the automata at the first end state encountered.
+        start : int
+            Position of the input where the automata starts.
         success_at_full_input : bool
             Whether to consider the automata successful if the input is fully
             consumed.
@@ -551,7 +554,7 @@ class Automata:
 
         if not self.start_states:
             raise ValueError("No start states defined.")
-        self._pos = 0
+        self._pos = start
         self._processes_idx = 0
         self._input = input_
         self._processes = [(st, self._pos) for st in self.start_states]
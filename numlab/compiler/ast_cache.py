@@ -0,0 +1,279 @@
+"""
+This module contains a compact binary serialization of ASTs and a cache of
+parsed ASTs (``.nlc`` files) in the NumLab cache directory.
+
+An AST is encoded as nested tuples which are serialized with ``marshal``.
+Each node is a tuple with the index of its class followed by the values of
+its fields (``__slots__``), lists are kept as lists and enum members are
+tuples with the index of their class and their value. Other values (numbers,
+strings, booleans and None) are kept as they are. Classes are saved by name,
+together with the names of their fields.
+"""
+
+import hashlib
+import importlib
+import logging
+import marshal
+import sys
+import types
+from enum import Enum
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from numlab.compiler.cache import atomic_write, cache_dir
+from numlab.compiler.generic_ast import AST
+
+_NLC_MAGIC = b"NLC\x00"
+
+# Version of the serialization format. It must be increased every time the
+# encoding changes, so cached ASTs are discarded.
+_NLC_VERSION = 2
+
+_SCALAR_TYPES = (bool, int, float, complex, str, bytes)
+
+
+def dump_ast(ast: AST) -> bytes:
+    """Serializes an AST.
+
+    Parameters
+    ----------
+    ast : AST
+        AST to be serialized.
+
+    Returns
+    -------
+    bytes
+        Serialized AST.
+
+    Raises
+    ------
+    TypeError
+        If the AST contains a value that can not be serialized.
+    ValueError
+        If the AST is too deep to be serialized.
+    """
+    classes: Dict[type, int] = {}
+
+    def encode(value: Any) -> Any:
+        if isinstance(value, AST):
+            cls = type(value)
+            cls_id = classes.setdefault(cls, len(classes))
+            return (cls_id, *[encode(getattr(value, field)) for field in cls.__slots__])
+        if isinstance(value, list):
+            return [encode(item) for item in value]
+        if isinstance(value, Enum):
+            return (classes.setdefault(type(value), len(classes)), value.value)
+        if value is None or isinstance(value, _SCALAR_TYPES):
+            return value
+        raise TypeError(f"Can not serialize a value of type {type(value).__name__}")
+
+    try:
+        tree = encode(ast)
+    except RecursionError as err:
+        raise ValueError("AST too deep to be serialized") from err
+    names = [
+        (
+            f"{cls.__module__}:{cls.__qualname__}",
+            None if issubclass(cls, Enum) else tuple(cls.__slots__),
+        )
+        for cls in classes
+    ]
+    return _NLC_MAGIC + marshal.dumps((_NLC_VERSION, names, tree))
+
+
+def load_ast(data: bytes) -> AST:
+    """Deserializes an AST (see ``dump_ast``).
+
+    Parameters
+    ----------
+    data : bytes
+        Serialized AST.
+
+    Returns
+    -------
+    AST
+        Deserialized AST.
+
+    Raises
+    ------
+    ValueError
+        If the data is not a valid serialized AST or the fields of a class
+        changed since it was serialized.
+    """
+    if data[: len(_NLC_MAGIC)] != _NLC_MAGIC:
+        raise ValueError("Invalid AST data")
+    try:
+        version, names, tree = marshal.loads(data[len(_NLC_MAGIC) :])
+    except (EOFError, TypeError) as err:
+        raise ValueError("Invalid AST data") from err
+    if version != _NLC_VERSION:
+        raise ValueError(f"Unsupported AST data version {version}")
+
+    # Fields of each class (None for enums)
+    classes: List[Tuple[type, Optional[Tuple[str, ...]]]] = []
+    for name, fields in names:
+        cls = _find_class(name)
+        cls_fields = None if issubclass(cls, Enum) else tuple(cls.__slots__)
+        if fields != cls_fields:
+            raise ValueError(f"Fields of AST class {name} changed")
+        classes.append((cls, cls_fields))
+
+    def decode(value: Any) -> Any:
+        if type(value) is tuple:  # pylint: disable=unidiomatic-typecheck
+            cls, fields = classes[value[0]]
+            if fields is None:
+                return cls(value[1])
+            if len(value) != len(fields) + 1:
+                raise ValueError(f"Invalid AST data for class {cls.__name__}")
+            node = cls.__new__(cls)
+            for field, item in zip(fields, value[1:]):
+                setattr(node, field, decode(item))
+            return node
+        if type(value) is list:  # pylint: disable=unidiomatic-typecheck
+            return [decode(item) for item in value]
+        return value
+
+    return decode(tree)
+
+
+def _find_class(name: str) -> type:
+    module_name, _, qualname = name.partition(":")
+    try:
+        obj = importlib.import_module(module_name)
+        for attr in qualname.split("."):
+            obj = getattr(obj, attr)
+    except (ImportError, AttributeError) as err:
+        raise ValueError(f"Unknown AST class {name}") from err
+    if not isinstance(obj, type) or not issubclass(obj, (AST, Enum)):
+        raise ValueError(f"Invalid AST class {name}")
+    return obj
+
+
+def ast_key(source: bytes, *parts: str) -> str:
+    """Calculates the cache key of the AST of a source.
+
+    Parameters
+    ----------
+    source : bytes
+        Source code (any bytes-like object, e.g. a memory-mapped file).
+    *parts : str
+        Other values the AST depends on (e.g. the grammar hash).
+
+    Returns
+    -------
+    str
+        Cache key (hexadecimal SHA-256 digest).
+    """
+    key = hashlib.sha256(source)
+    for part in (str(_NLC_VERSION), *parts):
+        key.update(b"\0" + part.encode("utf-8"))
+    return key.hexdigest()
+
+
+def code_fingerprint(objs: Iterable[Callable]) -> str:
+    """Calculates a fingerprint of the code that builds the ASTs (e.g. the
+    builders of the productions or the tokenizer).
+
+    It is a hash of the source files of the modules where the functions (or
+    classes) are defined and of the modules of the same package they use
+    (e.g. the module of the AST classes), so it changes when any of them is
+    edited.
+
+    Parameters
+    ----------
+    objs : Iterable[Callable]
+        Functions or classes.
+
+    Returns
+    -------
+    str
+        Fingerprint (hexadecimal SHA-256 digest).
+    """
+    modules: Dict[str, types.ModuleType] = {}
+    for obj in objs:
+        name = getattr(obj, "__module__", None)
+        module = sys.modules.get(name) if isinstance(name, str) else None
+        if module is None or name in modules:
+            continue
+        modules[name] = module
+        package = name.partition(".")[0]
+        for value in list(vars(module).values()):
+            if not isinstance(value, types.ModuleType):
+                value_module = getattr(value, "__module__", None)
+                if not isinstance(value_module, str):
+                    continue
+                value = sys.modules.get(value_module)
+            if value is not None and value.__name__.partition(".")[0] == package:
+                modules.setdefault(value.__name__, value)
+
+    key = hashlib.sha256()
+    for name in sorted(modules):
+        key.update(name.encode("utf-8") + b"\0")
+        file_path = getattr(modules[name], "__file__", None)
+        if file_path is None:
+            continue
+        try:
+            with open(file_path, "rb") as module_f:
+                key.update(hashlib.sha256(module_f.read()).digest())
+        except OSError:
+            pass
+    return key.hexdigest()
+
+
+def _cache_file(key: str) -> Path:
+    return cache_dir() / f"ast_{key[:32]}.nlc"
+
+
+def load_cached_ast(key: str) -> Optional[AST]:
+    """Loads an AST from the cache.
+
+    Parameters
+    ----------
+    key : str
+        Cache key (see ``ast_key``).
+
+    Returns
+    -------
+    Optional[AST]
+        Cached AST or None if there is no valid cached AST.
+    """
+    try:
+        with open(_cache_file(key), "rb") as cache_f:
+            data = cache_f.read()
+    except OSError:
+        return None
+    # The full key is saved before the AST
+    if data[:64] != key.encode("ascii"):
+        return None
+    try:
+        return load_ast(data[64:])
+    except ValueError as err:
+        logging.warning(f"Invalid AST cache {_cache_file(key)}: {err}")
+        return None
+
+
+def save_cached_ast(key: str, ast: AST):
+    """Saves an AST to the cache.
+
+    ASTs that can not be serialized (see ``dump_ast``) are not saved.
+
+    Parameters
+    ----------
+    key : str
+        Cache key (see ``ast_key``).
+    ast : AST
+        AST to be saved.
+    """
+    cache_file = _cache_file(key)
+    try:
+        data = dump_ast(ast)
+    except (TypeError, ValueError) as err:
+        logging.warning(f"Can not save AST cache {cache_file}: {err}")
+        return
+    try:
+        cache_file.parent.mkdir(parents=True, exist_ok=True)
+        with atomic_write(cache_file) as cache_f:
+            cache_f.write(key.encode("ascii"))
+            cache_f.write(data)
+    except OSError as err:
+        logging.warning(f"Can not save AST cache {cache_file}: {err}")
@@ -0,0 +1,157 @@
+"""
+This module contains utilities for caching generated files (e.g. parse
+tables) in a per-user cache directory.
+"""
+
+import os
+import secrets
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import BinaryIO, Iterator, Optional, Union
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+def cache_dir() -> Path:
+    """Returns the NumLab cache directory.
+
+    It is ``$XDG_CACHE_HOME/numlab`` if the ``XDG_CACHE_HOME`` environment
+    variable is set, otherwise ``~/.cache/numlab``. The directory is not
+    created.
+
+    Returns
+    -------
+    Path
+        Cache directory.
+    """
+    base = os.environ.get("XDG_CACHE_HOME", "")
+    if not base:
+        base = Path.home() / ".cache"
+    return Path(base) / "numlab"
+
+
+@contextmanager
+def atomic_write(file_path: Union[str, Path]) -> Iterator[BinaryIO]:
+    """Opens a file for (binary) writing atomically.
+
+    The data is written to a temporary file in the same directory, which
+    replaces the target file only if no error occurs. Readers never see a
+    partially written file.
+
+    Parameters
+    ----------
+    file_path : Union[str, Path]
+        Path to the file.
+
+    Yields
+    ------
+    BinaryIO
+        Temporary file to write to.
+    """
+    file_path = Path(file_path)
+    while True:
+        tmp_path = str(
+            file_path.parent / f".{file_path.name}.{secrets.token_hex(4)}.tmp"
+        )
+        try:
+            # Created with the default permissions (0o666 masked by the umask)
+            # as the target file would be
+            fd = os.open(tmp_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o666)
+        except FileExistsError:
+            continue
+        break
+    try:
+        with os.fdopen(fd, "wb") as tmp_file:
+            yield tmp_file
+        os.replace(tmp_path, str(file_path))
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+class FileLock:
+    """Inter-process lock based on an advisory lock (``flock``) of a file.
+
+    The lock is released by the operating system when the holder process
+    dies, so a lock is never left behind by a killed process. The lock file
+    is removed when the lock is released (except on Windows).
+
+    Parameters
+    ----------
+    lock_file : Union[str, Path]
+        Path to the lock file.
+    poll_interval : float, optional
+        Time (in seconds) between attempts to acquire the lock on Windows, by
+        default 0.05.
+    """
+
+    def __init__(self, lock_file: Union[str, Path], poll_interval: float = 0.05):
+        self.lock_file = str(lock_file)
+        self.poll_interval = poll_interval
+        self._fd: Optional[int] = None
+
+    @property
+    def locked(self) -> bool:
+        """Whether the lock is held by this object."""
+        return self._fd is not None
+
+    def acquire(self):
+        """Acquires the lock, waiting while other process holds it."""
+        while True:
+            lock_fd = os.open(self.lock_file, os.O_CREAT | os.O_RDWR, 0o666)
+            try:
+                self._lock(lock_fd)
+                # The previous holder may have removed the file (and other
+                # process may have created it again) while waiting for it
+                if fcntl is None or os.path.samestat(
+                    os.fstat(lock_fd), os.stat(self.lock_file)
+                ):
+                    self._fd = lock_fd
+                    return
+            except FileNotFoundError:
+                pass
+            except BaseException:
+                os.close(lock_fd)
+                raise
+            os.close(lock_fd)
+
+    def release(self):
+        """Releases the lock."""
+        if self._fd is None:
+            return
+        lock_fd, self._fd = self._fd, None
+        try:
+            if fcntl is not None:
+                # Removed while it is locked, so no other process locks it
+                # after it is released
+                try:
+                    os.unlink(self.lock_file)
+                except FileNotFoundError:
+                    pass
+            else:
+                msvcrt.locking(lock_fd, msvcrt.LK_UNLCK, 1)
+        finally:
+            os.close(lock_fd)
+
+    def _lock(self, lock_fd: int):
+        if fcntl is not None:
+            fcntl.flock(lock_fd, fcntl.LOCK_EX)
+            return
+        while True:
+            try:
+                msvcrt.locking(lock_fd, msvcrt.LK_NBLCK, 1)
+                return
+            except OSError:
+                time.sleep(self.poll_interval)
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *args):
+        self.release()
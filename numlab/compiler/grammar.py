@@ -4,13 +4,24 @@ This module contains the structures for representing grammars.
 
 from __future__ import annotations
 
+import hashlib
+import logging
+import pickle
 from abc import ABCMeta, abstractmethod
+from pathlib import Path
 from typing import (Any, Callable, Dict, Iterator, List, Optional, Set, Tuple,
                     Union)
 
+from numlab.compiler.cache import atomic_write, cache_dir
 from numlab.compiler.generic_ast import AST
 from numlab.compiler.tokenizer import Token, Tokenizer
 
+# Version of the cached grammar format (see ``Grammar.load``)
+_GRAMMAR_CACHE_VERSION = 3
+
+# Associativity of the precedence declarations
+_ASSOC_DIRECTIVES = {"%left": "left", "%right": "right"}
+
 # Tokenizer for grammars
 TKNZ = Tokenizer()
 TKNZ.add_pattern("NEWLINE", r"( |\n)*\n\n*( |\n)*", lambda l: "NEWLINE")
@@ -18,8 +29,9 @@ TKNZ.add_pattern("SPACE", r"( |\t)( |\t)*", lambda t: None)
 TKNZ.add_pattern("COMMENT", r"#(^\n)*\n", lambda t: None)
 TKNZ.add_pattern("LITERAL", r"'((^')|(\\'))*(^\\)'", lambda l: l[1:-1])
 TKNZ.add_pattern("SPECIAL", r"EPS")
+TKNZ.add_pattern("DIRECTIVE", r"%(\a)(\a)*")
 TKNZ.add_pattern("ID", r"(\a|\A|_)(\a|\A|\d|_)*")
-TKNZ.add_pattern("OP", r"\||:")
+TKNZ.add_pattern("OP", r"\||:|\*|+|?|\(|\)")
 
 
 @TKNZ.process_tokens
@@ -73,6 +85,73 @@ def _process_tokens(tokens: List[Token]) -> List[Token]:
     return new_tokens
 
 
+def identity(value):
+    """Builder of the unit productions whose AST is the AST of their only
+    symbol (e.g. ``"stmt -> simple_stmt": identity``).
+
+    Parsers do not reduce the productions with this builder, they go
+    directly to the GOTO state of the production head (see
+    ``Production.is_identity``).
+    """
+    return value
+
+
+# Builders of the helper productions generated for groups and EBNF operators
+
+
+def _ebnf_value(value):
+    return value
+
+
+def _ebnf_tuple(*values):
+    return values
+
+
+def _ebnf_list(value):
+    return [value]
+
+
+def _ebnf_list_tuple(*values):
+    return [values]
+
+
+def _ebnf_append(items, value):
+    items.append(value)
+    return items
+
+
+def _ebnf_append_tuple(items, *values):
+    items.append(values)
+    return items
+
+
+def _ebnf_empty():
+    return []
+
+
+def _ebnf_none():
+    return None
+
+
+_EBNF_BUILDERS = {
+    func.__name__: func
+    for func in (
+        _ebnf_value,
+        _ebnf_tuple,
+        _ebnf_list,
+        _ebnf_list_tuple,
+        _ebnf_append,
+        _ebnf_append_tuple,
+        _ebnf_empty,
+        _ebnf_none,
+    )
+}
+
+
+def _is_ebnf_builder(func: Callable) -> bool:
+    return any(func is builder for builder in _EBNF_BUILDERS.values())
+
+
 class Symbol(metaclass=ABCMeta):
     """Abstract class for representing either a Terminal or a NonTerminal.
 
@@ -145,10 +224,14 @@ class Production:
     ----------
     symbols : List[Symbo]
         List of grammar symbols that compose the production.
+    prec : Optional[str]
+        Name of the terminal (or precedence level) whose precedence is used
+        for the production (``%prec``), by default None.
     """
 
-    def __init__(self, symbols: List[Symbol]):
+    def __init__(self, symbols: List[Symbol], prec: Optional[str] = None):
         self.symbols = symbols
+        self.prec = prec
         self._head: NonTerminal = None
         self._builder: Callable = None
 
@@ -199,6 +282,26 @@ class Production:
         """
         return f"{self.head.name} {str(self)}"
 
+    @property
+    def is_identity(self) -> bool:
+        """Checks if the production is a unit production (a single non
+        terminal) whose builder returns the AST of the symbol unchanged.
+
+        The builder must be declared as ``identity`` (other builders are
+        always called, even if they return their argument).
+
+        Reducing an identity production does not change the AST, so parsers
+        may skip it.
+
+        Returns
+        -------
+        bool
+            True if the production is an identity production.
+        """
+        if len(self.symbols) != 1 or self.symbols[0].is_terminal:
+            return False
+        return self._builder is identity or self._builder is _ebnf_value
+
     @property
     def is_eps(self) -> bool:
         """Checks if the production is the empty production.
@@ -367,20 +470,34 @@ class Grammar:
     ----------
     exprs : List[NonTerminal]
         Grammar expressions.
+    precedence : Dict[str, Tuple[int, str]], optional
+        Precedence level and associativity (``"left"`` or ``"right"``) of
+        the terminals, by default no precedences.
 
     Attributes
     ----------
     exprs : List[NonTerminal]
         Grammar expressions.
+    precedence : Dict[str, Tuple[int, str]]
+        Precedence level and associativity of the terminals. Higher levels
+        bind tighter.
     """
 
-    def __init__(self, exprs: List[NonTerminal] = None):
+    def __init__(
+        self,
+        exprs: List[NonTerminal] = None,
+        precedence: Dict[str, Tuple[int, str]] = None,
+    ):
         self.exprs = [] if exprs is None else exprs
+        self.precedence = {} if precedence is None else precedence
         self.start = None
         if exprs:
             self.start = exprs[0]
         self.exprs_dict = {exp.name: exp for exp in exprs}
 
+        # Builder keys of the productions (when loaded from the cache)
+        self._builder_keys: List[str] = None
+
     def __getattr__(self, item):
         if item in self.exprs_dict:
             return self.exprs_dict[item]
@@ -402,15 +519,72 @@ class Grammar:
     def assign_builders(self, builders: Dict[str, Callable]) -> None:
         """Assigns the builders for the productions.
 
+        The productions generated for groups and EBNF operators already have
+        a builder, which is only replaced if ``builders`` contains its key.
+
         Parameters
         ----------
         builders : Dict[str, Callable]
             Dictionary of builders.
         """
-        for expr in self.exprs:
-            for prod in expr.prods:
-                builder_name = f"{expr.name} {prod}"
-                prod.set_builder(builders[builder_name])
+        if self._builder_keys is not None:
+            builder_names = self._builder_keys
+        else:
+            builder_names = [
+                f"{expr.name} {prod}" for expr, prod in self.all_productions()
+            ]
+        for (_, prod), builder_name in zip(self.all_productions(), builder_names):
+            if builder_name not in builders and _is_ebnf_builder(prod._builder):
+                continue
+            prod.set_builder(builders[builder_name])
+
+    def prod_precedence(self, prod: Production) -> Optional[Tuple[int, str]]:
+        """Returns the precedence of a production.
+
+        It is the precedence given by ``%prec`` or, if not given, the one of
+        the last terminal of the production that has a precedence.
+
+        Parameters
+        ----------
+        prod : Production
+            Production.
+
+        Returns
+        -------
+        Optional[Tuple[int, str]]
+            Precedence level and associativity, or None if the production
+            has no precedence.
+        """
+        if prod.prec is not None:
+            return self.precedence[prod.prec]
+        for sym in reversed(prod.symbols):
+            if sym.is_terminal and sym.name in self.precedence:
+                return self.precedence[sym.name]
+        return None
+
+    def content_hash(self) -> str:
+        """Returns a hash of the grammar content.
+
+        Two grammars have the same hash if they have the same start
+        expression, the same productions (in the same order) and the same
+        precedences. Builders are not taken into account.
+
+        Returns
+        -------
+        str
+            Hash (hexadecimal SHA-256 digest).
+        """
+        desc = [f"start: {self.start_expr.name}"]
+        for expr, prod in self.all_productions():
+            symbols = " ".join(
+                f"{'T' if sym.is_terminal else 'N'}:{sym.name}" for sym in prod.symbols
+            )
+            if prod.prec is not None:
+                symbols += f" %prec {prod.prec}"
+            desc.append(f"{expr.name} -> {symbols}")
+        for name, (level, assoc) in sorted(self.precedence.items()):
+            desc.append(f"%{assoc} {level} {name}")
+        return hashlib.sha256("\n".join(desc).encode("utf-8")).hexdigest()
 
     def add_expr(self, expr: NonTerminal):
         """Adds a grammar expression to the grammar.
@@ -506,6 +680,32 @@ class Grammar:
             | '(' E ')'
             | i
 
+        Productions can also use groups of alternatives between parentheses
+        and the EBNF operators ``*`` (zero or more), ``+`` (one or more) and
+        ``?`` (optional). They are replaced by generated helper expressions
+        (named after their text, e.g. ``(',' Expr)*``) whose builders give
+        a list of values (``*`` and ``+``), a value or None (``?``). The
+        value of an alternative with several symbols is a tuple:
+
+        Args: '(' (Expr (',' Expr)*)? ')'
+
+        Ambiguous grammars can declare the precedence and associativity of
+        terminals (as in yacc) in lines starting with ``%left`` or
+        ``%right``. Terminals in later lines have higher precedence. A
+        production takes the precedence of its last terminal that has one,
+        or the one given by ``%prec`` at its end. They are used to resolve
+        shift/reduce conflicts in the LR1 table:
+
+        %left '+'
+        %left '*'
+        %right UMINUS
+
+        E:
+            | E '+' E
+            | E '*' E
+            | '-' E %prec UMINUS
+            | i
+
         Parameters
         ----------
         file_path : str
@@ -523,6 +723,155 @@ class Grammar:
         grm = grm_parser.parse()
         return grm
 
+    @staticmethod
+    def load(
+        file_path: str,
+        builders: Dict[str, Callable] = None,
+        use_cache: bool = True,
+    ) -> Grammar:
+        """Reads a grammar from a `.gm` file and assigns its builders.
+
+        The first time a file is read, the grammar is saved in the NumLab
+        cache directory as plain data: the productions indexed by id (with
+        their symbols given by id too) and the builder key of each one. The
+        cache is keyed by the hash of the file content, so the following
+        calls load the grammar in one step (no tokenization or parsing of
+        the file) until the file is modified.
+
+        Parameters
+        ----------
+        file_path : str
+            Grammar file path.
+        builders : Dict[str, Callable], optional
+            Dictionary of builders (see ``assign_builders``).
+        use_cache : bool, optional
+            Whether to use the cache, by default True.
+
+        Returns
+        -------
+        Grammar
+            Readed grammar.
+        """
+        with open(file_path, "rb") as file:
+            file_hash = hashlib.sha256(file.read()).hexdigest()
+        cache_file = cache_dir() / f"grammar_{file_hash[:32]}.pickle"
+
+        grm = Grammar._load_cached(cache_file, file_hash) if use_cache else None
+        if grm is None:
+            grm = Grammar.open(file_path)
+            if use_cache:
+                grm._save_cached(cache_file, file_hash)
+        if builders is not None:
+            grm.assign_builders(builders)
+        return grm
+
+    def _save_cached(self, cache_file: Path, file_hash: str):
+        """Saves the grammar as plain data to a cache file.
+
+        Parameters
+        ----------
+        cache_file : Path
+            Cache file path.
+        file_hash : str
+            Hash of the grammar file.
+        """
+        expr_ids = {expr.name: i for i, expr in enumerate(self.exprs)}
+        terms: Dict[str, int] = {}
+        prods = []
+        for expr, prod in self.all_productions():
+            symbols = []
+            for sym in prod.symbols:
+                if sym.is_terminal:
+                    # Terminals are stored as negative ids
+                    symbols.append(-terms.setdefault(sym.name, len(terms)) - 1)
+                else:
+                    symbols.append(expr_ids[sym.name])
+            # Generated productions keep their builder (given by name)
+            ebnf_builder = (
+                prod._builder.__name__ if _is_ebnf_builder(prod._builder) else None
+            )
+            prods.append(
+                (
+                    expr_ids[expr.name],
+                    symbols,
+                    prod.prec,
+                    f"{expr.name} {prod}",
+                    ebnf_builder,
+                )
+            )
+        data = {
+            "version": _GRAMMAR_CACHE_VERSION,
+            "hash": file_hash,
+            "exprs": [expr.name for expr in self.exprs],
+            "terms": list(terms),
+            "start": expr_ids[self.start_expr.name],
+            "prods": prods,
+            "precedence": self.precedence,
+        }
+        try:
+            cache_file.parent.mkdir(parents=True, exist_ok=True)
+            with atomic_write(cache_file) as cache_f:
+                pickle.dump(data, cache_f, protocol=pickle.HIGHEST_PROTOCOL)
+        except OSError as err:
+            logging.warning(f"Can not save grammar cache {cache_file}: {err}")
+
+    @staticmethod
+    def _load_cached(cache_file: Path, file_hash: str) -> Optional[Grammar]:
+        """Loads a grammar from a cache file.
+
+        Parameters
+        ----------
+        cache_file : Path
+            Cache file path.
+        file_hash : str
+            Hash of the grammar file.
+
+        Returns
+        -------
+        Optional[Grammar]
+            Loaded grammar or None if there is no valid cached grammar (any
+            error loading the file is a cache miss).
+        """
+        try:
+            with open(cache_file, "rb") as cache_f:
+                data = pickle.load(cache_f)
+        except FileNotFoundError:
+            return None
+        except Exception as err:  # pylint: disable=broad-except
+            # Unpickling a corrupted (or foreign) file can fail in many ways
+            logging.warning(f"Invalid grammar cache {cache_file}: {err}")
+            return None
+        if (
+            not isinstance(data, dict)
+            or data.get("version") != _GRAMMAR_CACHE_VERSION
+            or data.get("hash") != file_hash
+        ):
+            return None
+        try:
+            return Grammar._from_cached_data(data)
+        except Exception as err:  # pylint: disable=broad-except
+            logging.warning(f"Invalid grammar cache {cache_file}: {err}")
+            return None
+
+    @staticmethod
+    def _from_cached_data(data: dict) -> Grammar:
+        exprs = [NonTerminal(name) for name in data["exprs"]]
+        terms = [Terminal(name) for name in data["terms"]]
+        builder_keys = []
+        for head, symbols, prec, builder_key, ebnf_builder in data["prods"]:
+            prod = Production(
+                [terms[-sym - 1] if sym < 0 else exprs[sym] for sym in symbols], prec
+            )
+            if ebnf_builder is not None:
+                prod.set_builder(_EBNF_BUILDERS[ebnf_builder])
+            prod._head = exprs[head]
+            exprs[head].prods.append(prod)
+            builder_keys.append(builder_key)
+        grm = Grammar(exprs, data["precedence"])
+        grm.start = exprs[data["start"]]
+        grm._builder_keys = builder_keys
+        return grm
+
 
 class _GrammarParser:
     """Parser for grammars.
@@ -536,6 +885,9 @@ class _GrammarParser:
     def __init__(self, tokens: List[Token]):
         self.tokens = tokens
         self._cursor = 0
+        self._precedence: Dict[str, Tuple[int, str]] = {}
+        self._prec_level = 0
+        self._helpers: Dict[str, NonTerminal] = {}
 
     def _check_token(
         self,
@@ -611,8 +963,12 @@ class _GrammarParser:
         """
         if self._cursor >= len(self.tokens):
             return None
-        self._check_token("ID")
+        self._check_token(["ID", "DIRECTIVE"])
+        self._precedence = {}
+        self._prec_level = 0
+        self._helpers = {}
         exprs = self._parse_expr_list()
+        exprs += self._helpers.values()
         exprs_dict = {exp.name: exp for exp in exprs}
         terminals = {}
         for exp in exprs:
@@ -624,7 +980,12 @@ class _GrammarParser:
                         prod[i] = terminals[symbol.name]
                     else:
                         terminals[symbol.name] = symbol
-        return Grammar(exprs)
+                if prod.prec is not None and prod.prec not in self._precedence:
+                    raise ValueError(
+                        f"Undeclared precedence '{prod.prec}' in production "
+                        f"{exp.name} {prod}"
+                    )
+        return Grammar(exprs, self._precedence)
 
     def _parse_expr_list(self) -> List[NonTerminal]:
         """Parses an expression list.
@@ -634,13 +995,12 @@ class _GrammarParser:
         List[NonTerminal]
             Resulting expressions.
         """
-        if self._ctoken is None:
-            return None
-        expr = self._parse_expr()
-        expr_list = self._parse_expr_list()
-        exprs = [expr]
-        if expr_list is not None:
-            exprs += expr_list
+        exprs = []
+        while self._ctoken is not None:
+            if self._ctoken.DIRECTIVE:
+                self._parse_precedence()
+            else:
+                exprs.append(self._parse_expr())
         return exprs
 
     def _parse_expr(self) -> NonTerminal:
@@ -656,44 +1016,203 @@ class _GrammarParser:
         self._cursor += 1
         self._check_token("OP", ":")
         self._cursor += 1
-        prod = self._parse_prod()
-        prod_list = self._parse_prod_list()
+        prods = [self._parse_prod(expr_name)]
+        prods += self._parse_prod_list(expr_name)
         self._check_token("NEWLINE", or_none=True)
         self._cursor += 1
-        prods = [prod]
-        if prod_list is not None:
-            prods += prod_list
         expr = NonTerminal(expr_name, prods)
         return expr
 
-    def _parse_prod(self) -> Production:
+    def _parse_precedence(self):
+        """Parses a precedence declaration (``%left`` or ``%right``)."""
+        self._check_token("DIRECTIVE")
+        directive = self._ctoken.lexem
+        if directive not in _ASSOC_DIRECTIVES:
+            raise ValueError(f"Unexpected directive {self._ctoken}")
+        self._cursor += 1
+        self._prec_level += 1
+        while self._ctoken is not None and not self._ctoken.NEWLINE:
+            self._check_token(["ID", "LITERAL"])
+            name = self._ctoken.lexem
+            if name in self._precedence:
+                raise ValueError(f"Precedence of '{name}' declared twice")
+            self._precedence[name] = (self._prec_level, _ASSOC_DIRECTIVES[directive])
+            self._cursor += 1
+        self._cursor += 1
+
+    def _parse_prod(self, head: str) -> Production:
         """Parses a production.
 
+        Parameters
+        ----------
+        head : str
+            Name of the expression of the production.
+
         Returns
         -------
         Production
             Resulting production.
         """
-        prod_symbols = self._parse_prod_symbols()
-        return Production(prod_symbols)
-
-    def _parse_prod_symbols(self) -> List[Symbol]:
+        prod_symbols = self._parse_prod_symbols(head)
+        prec = None
+        if self._ctoken is not None and self._ctoken.DIRECTIVE:
+            self._check_token("DIRECTIVE", "%prec")
+            self._cursor += 1
+            self._check_token(["ID", "LITERAL"])
+            prec = self._ctoken.lexem
+            self._cursor += 1
+        return Production(prod_symbols, prec)
+
+    def _parse_prod_symbols(self, head: str) -> List[Symbol]:
         """Parses all the symbols of a production.
 
+        Groups of alternatives (between parentheses) can be nested, the
+        sequences of the enclosing groups are kept in a stack.
+
+        Parameters
+        ----------
+        head : str
+            Name of the expression of the production.
+
         Returns
         -------
         List[Symbol]
             Resulting symbols.
         """
-        if self._ctoken.OP:
-            return None
-        if self._ctoken.NEWLINE:
-            return None
-        symbol = self._parse_symbol()
-        prod_symbols = self._parse_prod_symbols()
-        if prod_symbols is None:
-            return [symbol]
-        return [symbol] + prod_symbols
+        symbols: List[Symbol] = []
+        # Symbols before each open group and the alternatives of the group
+        groups: List[Tuple[List[Symbol], List[List[Symbol]]]] = []
+        while True:
+            tok = self._ctoken
+            if tok is not None and tok.OP and tok.lexem == "(":
+                self._cursor += 1
+                groups.append((symbols, []))
+                symbols = []
+                continue
+            if not (
+                tok is None
+                or tok.NEWLINE
+                or tok.DIRECTIVE
+                or (tok.OP and tok.lexem in ("|", ":", ")"))
+            ):
+                symbol = self._parse_symbol()
+                symbols.append(self._parse_operator([[symbol]]))
+                continue
+            if not groups:
+                return symbols if symbols else None
+
+            # End of an alternative of the innermost group
+            outer_symbols, alternatives = groups[-1]
+            alternatives.append(symbols)
+            symbols = []
+            if tok is not None and tok.lexem == "|":
+                self._check_token("OP")
+                self._cursor += 1
+                continue
+            self._check_token("OP", ")")
+            self._cursor += 1
+            groups.pop()
+            for alternative in alternatives:
+                if not alternative or any(sym.name == "EPS" for sym in alternative):
+                    raise ValueError(
+                        f"Empty alternative in a group of {head}, use '?' instead"
+                    )
+            symbols = outer_symbols
+            symbols.append(self._parse_operator(alternatives))
+
+    def _parse_operator(self, alternatives: List[List[Symbol]]) -> Symbol:
+        """Parses the optional EBNF operator (``*``, ``+`` or ``?``) after a
+        symbol or a group of alternatives.
+
+        Groups and operators are replaced by a helper expression (see
+        ``_helper_expr``).
+
+        Parameters
+        ----------
+        alternatives : List[List[Symbol]]
+            Symbols of each alternative (a single symbol is a group with
+            one alternative).
+
+        Returns
+        -------
+        Symbol
+            Resulting symbol.
+        """
+        operator = None
+        if (
+            self._ctoken is not None
+            and self._ctoken.OP
+            and self._ctoken.lexem in ("*", "+", "?")
+        ):
+            operator = self._ctoken.lexem
+            self._cursor += 1
+        if operator is None and len(alternatives) == 1 and len(alternatives[0]) == 1:
+            return alternatives[0][0]
+        return self._helper_expr(alternatives, operator)
+
+    def _helper_expr(
+        self, alternatives: List[List[Symbol]], operator: Optional[str]
+    ) -> NonTerminal:
+        """Gets the helper expression of a group or an EBNF operator.
+
+        The expression is named after the EBNF text (e.g. ``(, NAME)*``), so
+        equal groups share it. Repetitions are left recursive and their
+        builders append to the list built so far. The value of an
+        alternative is the value of its symbol, or a tuple with the values
+        of its symbols if it has more than one:
+
+        - ``X*``: list of values (empty if there are no repetitions).
+        - ``X+``: list of values.
+        - ``X?``: value, or None if it is not present.
+        - ``(X | Y)``: value.
+
+        Parameters
+        ----------
+        alternatives : List[List[Symbol]]
+            Symbols of each alternative.
+        operator : Optional[str]
+            EBNF operator.
+
+        Returns
+        -------
+        NonTerminal
+            Helper expression.
+        """
+        alts_str = " | ".join(
+            " ".join(sym.name for sym in alternative) for alternative in alternatives
+        )
+        if len(alternatives) > 1 or len(alternatives[0]) > 1:
+            alts_str = f"({alts_str})"
+        name = alts_str + (operator or "")
+        if name in self._helpers:
+            return self._helpers[name]
+
+        helper = NonTerminal(name)
+        builders = []
+        if operator == "*":
+            builders.append(([Terminal("EPS")], _ebnf_empty))
+        for alternative in alternatives:
+            single = len(alternative) == 1
+            if operator == "+":
+                builder = _ebnf_list if single else _ebnf_list_tuple
+                builders.append((alternative, builder))
+            elif operator != "*":
+                builder = _ebnf_value if single else _ebnf_tuple
+                builders.append((alternative, builder))
+        if operator in ("*", "+"):
+            for alternative in alternatives:
+                single = len(alternative) == 1
+                builder = _ebnf_append if single else _ebnf_append_tuple
+                builders.append(([helper] + alternative, builder))
+        if operator == "?":
+            builders.append(([Terminal("EPS")], _ebnf_none))
+        for symbols, builder in builders:
+            prod = Production(list(symbols))
+            prod.set_builder(builder)
+            prod._head = helper
+            helper.prods.append(prod)
+        self._helpers[name] = helper
+        return helper
 
     def _parse_symbol(self) -> Symbol:
         """Parses a grammar symbol.
@@ -712,22 +1231,22 @@ class _GrammarParser:
         self._cursor += 1
         return term
 
-    def _parse_prod_list(self) -> List[Production]:
+    def _parse_prod_list(self, head: str) -> List[Production]:
         """Parses a production list.
 
+        Parameters
+        ----------
+        head : str
+            Name of the expression of the productions.
+
         Returns
         -------
         List[Production]
             Resulting productions.
         """
-        if self._cursor >= len(self.tokens):
-            return None
-        if self._ctoken.NEWLINE:
-            return None
-        self._check_token("OP", "|")
-        self._cursor += 1
-        prod = self._parse_prod()
-        prod_list = self._parse_prod_list()
-        if prod_list is None:
-            return [prod]
-        return [prod] + prod_list
+        prods = []
+        while self._ctoken is not None and not self._ctoken.NEWLINE:
+            self._check_token("OP", "|")
+            self._cursor += 1
+            prods.append(self._parse_prod(head))
+        return prods
@@ -1,31 +1,285 @@
-from typing import Dict, List
+"""
+This module contains the calculation of the ``first`` and ``follow`` sets of
+a grammar.
+
+The sets are calculated over an integer encoding of the grammar: terminals
+are identified by the ids ``[0, T)`` and non terminals by ``[T, T + N)``,
+productions are lists of symbol ids (empty for the EPS production) and sets
+of terminals are bitsets stored in ints. The inclusion constraints between
+the sets form a graph which is processed in strongly connected component
+order, so every set is computed once.
+"""
+
+from typing import Dict, List, Optional, Tuple
 
 from numlab.compiler.grammar import Grammar, Terminal
 from numlab.compiler.terminal_set import TerminalSet
 
 
-def calculate_first(gm: Grammar) -> Dict[str, TerminalSet]:
-    first = {expr.name: TerminalSet() for expr in gm.exprs}
-    prod_first = {prod: TerminalSet() for _, prod in gm.all_productions()}
-
-    change = True
-    while change:
-        change = False
-        for expr, prod in gm.all_productions():
-            for item in prod.symbols:
-                if item.is_terminal:
-                    change |= first[expr.name].add(item)
-                    prod_first[prod].add(item)
-                    break
-                if item != expr:
-                    change |= first[expr.name].update(first[item.name])
-                    prod_first[prod].update(first[item.name])
-                if "EPS" not in first[expr.name].terminals:
+def _propagate(base: List[int], edges: List[List[int]]) -> List[int]:
+    """Solves a system of set inclusions.
+
+    Calculates the smallest sets ``result`` such that ``result[i]``
+    contains ``base[i]`` and ``result[j]`` for every ``j`` in ``edges[i]``.
+    The strongly connected components of the graph are found (and solved)
+    with an iterative version of Tarjan's algorithm, which finishes every
+    component after the components it depends on.
+
+    Parameters
+    ----------
+    base : List[int]
+        Initial sets (bitsets).
+    edges : List[List[int]]
+        Sets included in each set.
+
+    Returns
+    -------
+    List[int]
+        Resulting sets (bitsets).
+    """
+    count = len(base)
+    result = list(base)
+    index = [-1] * count
+    low = [0] * count
+    on_stack = [False] * count
+    stack: List[int] = []
+    next_index = 0
+    for root in range(count):
+        if index[root] != -1:
+            continue
+        index[root] = low[root] = next_index
+        next_index += 1
+        stack.append(root)
+        on_stack[root] = True
+        work = [(root, 0)]
+        while work:
+            node, edge_pos = work[-1]
+            if edge_pos < len(edges[node]):
+                work[-1] = (node, edge_pos + 1)
+                succ = edges[node][edge_pos]
+                if index[succ] == -1:
+                    index[succ] = low[succ] = next_index
+                    next_index += 1
+                    stack.append(succ)
+                    on_stack[succ] = True
+                    work.append((succ, 0))
+                elif on_stack[succ]:
+                    low[node] = min(low[node], index[succ])
+                continue
+            work.pop()
+            if work:
+                parent = work[-1][0]
+                low[parent] = min(low[parent], low[node])
+            if low[node] != index[node]:
+                continue
+
+            # Node is the root of a component. Components it depends on are
+            # already solved and the bases of its members are still in
+            # result.
+            members = []
+            while True:
+                member = stack.pop()
+                on_stack[member] = False
+                members.append(member)
+                if member == node:
                     break
-    return first
+            value = 0
+            for member in members:
+                value |= result[member]
+                for succ in edges[member]:
+                    value |= result[succ]
+            for member in members:
+                result[member] = value
+    return result
+
+
+def _nullable(heads: List[int], rhs: List[List[int]], term_count: int) -> List[bool]:
+    """Finds the non terminals that can derive EPS (in linear time)."""
+    nonterm_count = max(heads, default=-1) + 1
+    nullable = [False] * nonterm_count
+    # Number of symbols not known to be nullable in each production
+    missing = [len(symbols) for symbols in rhs]
+    users: List[List[int]] = [[] for _ in range(nonterm_count)]
+    pending = []
+    for prod_id, symbols in enumerate(rhs):
+        if any(sym < term_count for sym in symbols):
+            continue
+        if not symbols:
+            pending.append(heads[prod_id])
+        for sym in symbols:
+            users[sym - term_count].append(prod_id)
+    while pending:
+        nonterm = pending.pop()
+        if nullable[nonterm]:
+            continue
+        nullable[nonterm] = True
+        for prod_id in users[nonterm]:
+            missing[prod_id] -= 1
+            if missing[prod_id] == 0:
+                pending.append(heads[prod_id])
+    return nullable
+
+
+def first_bitsets(
+    heads: List[int], rhs: List[List[int]], term_count: int
+) -> Tuple[List[int], List[bool]]:
+    """Calculates the first sets of an integer encoded grammar.
+
+    Parameters
+    ----------
+    heads : List[int]
+        Non terminal id (starting at 0) of the head of each production.
+    rhs : List[List[int]]
+        Symbol ids of each production.
+    term_count : int
+        Number of terminals.
+
+    Returns
+    -------
+    Tuple[List[int], List[bool]]
+        First set (bitset) of each non terminal and whether it can derive
+        EPS.
+    """
+    nullable = _nullable(heads, rhs, term_count)
+    base = [0] * len(nullable)
+    edges: List[List[int]] = [[] for _ in nullable]
+    for head, symbols in zip(heads, rhs):
+        for sym in symbols:
+            if sym < term_count:
+                base[head] |= 1 << sym
+                break
+            edges[head].append(sym - term_count)
+            if not nullable[sym - term_count]:
+                break
+    return _propagate(base, edges), nullable
+
+
+def follow_bitsets(
+    heads: List[int],
+    rhs: List[List[int]],
+    term_count: int,
+    start: int,
+    end: int,
+    first: Optional[List[int]] = None,
+    nullable: Optional[List[bool]] = None,
+) -> List[int]:
+    """Calculates the follow sets of an integer encoded grammar.
+
+    Parameters
+    ----------
+    heads : List[int]
+        Non terminal id (starting at 0) of the head of each production.
+    rhs : List[List[int]]
+        Symbol ids of each production.
+    term_count : int
+        Number of terminals.
+    start : int
+        Non terminal id of the start expression.
+    end : int
+        Terminal id of the end of the input (``$``).
+    first : Optional[List[int]], optional
+        First sets of the non terminals. If not given, they are calculated.
+    nullable : Optional[List[bool]], optional
+        Whether each non terminal can derive EPS (required if ``first`` is
+        given).
+
+    Returns
+    -------
+    List[int]
+        Follow set (bitset) of each non terminal.
+    """
+    if first is None:
+        first, nullable = first_bitsets(heads, rhs, term_count)
+    base = [0] * len(first)
+    base[start] |= 1 << end
+    edges: List[List[int]] = [[] for _ in first]
+    for head, symbols in zip(heads, rhs):
+        # First set of the symbols after the current one
+        rest_first = 0
+        rest_nullable = True
+        for sym in reversed(symbols):
+            if sym < term_count:
+                rest_first, rest_nullable = 1 << sym, False
+                continue
+            nonterm = sym - term_count
+            base[nonterm] |= rest_first
+            if rest_nullable:
+                edges[nonterm].append(head)
+            if nullable[nonterm]:
+                rest_first |= first[nonterm]
+            else:
+                rest_first, rest_nullable = first[nonterm], False
+    return _propagate(base, edges)
+
+
+def _encode_grammar(gm: Grammar) -> Tuple[List[Terminal], List[int], List[List[int]]]:
+    """Encodes a grammar with integers.
+
+    Returns
+    -------
+    Tuple[List[Terminal], List[int], List[List[int]]]
+        Terminals (the position is the id), head of each production and
+        symbols of each production.
+    """
+    terms: Dict[str, int] = {}
+    term_list: List[Terminal] = []
+    for _, prod in gm.all_productions():
+        for sym in prod.symbols:
+            if sym.is_terminal and sym.name != "EPS" and sym.name not in terms:
+                terms[sym.name] = len(term_list)
+                term_list.append(sym)
+    nonterms = {expr.name: i for i, expr in enumerate(gm.exprs)}
+    heads, rhs = [], []
+    for expr, prod in gm.all_productions():
+        heads.append(nonterms[expr.name])
+        symbols = [] if prod.is_eps else prod.symbols
+        rhs.append(
+            [
+                terms[sym.name] if sym.is_terminal else len(terms) + nonterms[sym.name]
+                for sym in symbols
+            ]
+        )
+    return term_list, heads, rhs
+
+
+def _to_terminal_set(bitset: int, terms: List[Terminal]) -> TerminalSet:
+    terminals = set()
+    while bitset:
+        low_bit = bitset & -bitset
+        terminals.add(terms[low_bit.bit_length() - 1])
+        bitset ^= low_bit
+    return TerminalSet(terminals)
 
 
-def calculate_follow(gm: Grammar, first: TerminalSet = None) -> Dict[str, TerminalSet]:
+def calculate_first(gm: Grammar) -> Dict[str, TerminalSet]:
+    """
+    Calculate the first sets for all non-terminals in the grammar.
+
+    Parameters
+    ----------
+    gm : Grammar
+        The grammar to calculate the first sets for.
+
+    Returns
+    -------
+    Dict[str, TerminalSet]
+        The first sets for all non-terminals in the grammar. The set of a
+        non-terminal that can derive the empty string contains ``EPS``.
+    """
+    terms, heads, rhs = _encode_grammar(gm)
+    first, nullable = first_bitsets(heads, rhs, len(terms))
+    eps = Terminal("EPS")
+    result = {}
+    for i, expr in enumerate(gm.exprs):
+        result[expr.name] = _to_terminal_set(first[i], terms)
+        if nullable[i]:
+            result[expr.name].add(eps)
+    return result
+
+
+def calculate_follow(
+    gm: Grammar, first: Dict[str, TerminalSet] = None
+) -> Dict[str, TerminalSet]:
     """
     Calculate the follow sets for all non-terminals in the grammar.
 
@@ -33,7 +287,7 @@ def calculate_follow(gm: Grammar, first: TerminalSet = None) -> Dict[str, Termin
     ----------
     gm : Grammar
         The grammar to calculate the follow sets for.
-    first : TerminalSet, optional
+    first : Dict[str, TerminalSet], optional
         The first sets of the grammar. If not given, it will be calculated
         first.
 
@@ -42,28 +296,24 @@ def calculate_follow(gm: Grammar, first: TerminalSet = None) -> Dict[str, Termin
     Dict[str, TerminalSet]
         The follow sets for all non-terminals in the grammar.
     """
-
-    # First is needed to calculate follow
+    terms, heads, rhs = _encode_grammar(gm)
+    end = len(terms)
+    terms.append(Terminal("$"))
     if first is None:
-        first = calculate_first(gm)
-
-    follow = {expr.name: TerminalSet() for expr in gm.exprs}
-    follow[gm.start_expr.name].add(Terminal("$"))
-
-    change = True
-    while change:
-        change = False
-        for expr, prod in gm.all_productions():
-            for i, item in enumerate(prod.symbols):
-                next_item = prod.symbols[i + 1] if i + 1 < len(prod.symbols) else None
-                if item.is_terminal:
-                    continue
-                if next_item is None:
-                    change |= follow[item.name].update(follow[expr] - "EPS")
-                elif next_item.is_terminal:
-                    change |= follow[item.name].add(next_item)
-                else:
-                    change |= follow[item.name].update(first[next_item] - "EPS")
-                    if "EPS" in first[next_item].terminals:
-                        change |= follow[item.name].update(follow[expr] - "EPS")
-    return follow
+        first_sets, nullable = first_bitsets(heads, rhs, end)
+    else:
+        term_ids = {term.name: i for i, term in enumerate(terms)}
+        first_sets, nullable = [], []
+        for expr in gm.exprs:
+            bitset = 0
+            for term in first[expr.name]:
+                if term.name in term_ids:
+                    bitset |= 1 << term_ids[term.name]
+            first_sets.append(bitset)
+            nullable.append("EPS" in first[expr.name].terminals)
+    rhs = [[sym + 1 if sym >= end else sym for sym in symbols] for symbols in rhs]
+    start = gm.exprs.index(gm.start_expr)
+    follow = follow_bitsets(heads, rhs, end + 1, start, end, first_sets, nullable)
+    return {
+        expr.name: _to_terminal_set(follow[i], terms) for i, expr in enumerate(gm.exprs)
+    }
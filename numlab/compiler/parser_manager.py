@@ -4,13 +4,48 @@ This module contains the basic structures for parsing.
 
 from __future__ import annotations
 
-from typing import List
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from itertools import chain
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
 
+import numlab
+from numlab.compiler import ast_cache
 from numlab.compiler.generic_ast import AST
 from numlab.compiler.grammar import Grammar
 from numlab.compiler.parsers.lr1_parser import LR1Parser
 from numlab.compiler.parsers.parser import Parser
-from numlab.compiler.tokenizer import Token, Tokenizer
+from numlab.compiler.tokenizer import ByteText, Token, Tokenizer, map_file
+from numlab.exceptions import NumlabError, ParsingError
+
+# Number of columns a tab character expands to
+TAB_SIZE = 4
+
+# Top-level reduction: production id, values of the symbols after the
+# program, position of the lookahead token (-1 if the parsing can not be
+# resumed there) and its type.
+TopLevelReduction = Tuple[int, list, int, str]
+
+
+class IncrementalParse:
+    """Result of a parse that can be updated incrementally (see
+    ``ParserManager.reparse``).
+
+    Parameters
+    ----------
+    text : str
+        Parsed text.
+    ast : AST
+        AST generated by the parser.
+    reductions : List[TopLevelReduction]
+        Top-level reductions of the parse, in order.
+    """
+
+    def __init__(self, text: str, ast: AST, reductions: List[TopLevelReduction]):
+        self.text = text
+        self.ast = ast
+        self.reductions = reductions
 
 
 class ParserManager:
@@ -34,22 +69,123 @@ class ParserManager:
         self.tokenizer = tokenizer
         self.parser = LR1Parser(grammar) if parser is None else parser
 
-    def parse_file(self, file_path: str) -> AST:
+    def parse_file(self, file_path: str, use_cache: bool = False) -> AST:
         """Opens a file and parses it contents.
 
+        The file is memory-mapped and tokenized without reading it as a
+        whole into memory.
+
         Parameters
         ----------
         file_path : str
             File path.
+        use_cache : bool, optional
+            If True, the AST is stored in the NumLab cache directory (see
+            ``ast_cache``) keyed by the file content, the grammar, the
+            tokenizer, the code of the builders and the tokenizer, the tab
+            size and the NumLab version, and it is loaded from there (without
+            parsing the file) while none of them changes. By default False.
 
         Returns
         -------
         AST
             AST generated by the parser.
         """
-        with open(file_path, "r", encoding="utf-8") as file:
-            text = file.read()
-        return self.parse(text)
+        text = map_file(file_path)
+        if use_cache:
+            # The key is hashed from the mapped file, it is not read into memory
+            source = text.buffer if isinstance(text, ByteText) else b""
+            key = self._ast_key(source)
+            ast = ast_cache.load_cached_ast(key)
+            if ast is not None:
+                return ast
+        tokens = self.tokenizer.tokenize(text, TAB_SIZE)
+        ast = self.parse_tokens(tokens)
+        if use_cache:
+            ast_cache.save_cached_ast(key, ast)
+        return ast
+
+    def _ast_key(self, source: bytes) -> str:
+        """Calculates the AST cache key of a source parsed by this manager."""
+        code = [prod._builder for _, prod in self.grammar.all_productions()]
+        code += self.tokenizer._token_found_functions.values()
+        code += [self.tokenizer._process_tokens, type(self.tokenizer)]
+        return ast_cache.ast_key(
+            source,
+            self.grammar.content_hash(),
+            self.tokenizer.content_hash(),
+            ast_cache.code_fingerprint(code),
+            f"tab_size: {TAB_SIZE}",
+            numlab.__version__,
+        )
+
+    def parse_many(
+        self,
+        file_paths: Iterable[str],
+        jobs: Optional[int] = None,
+        ordered: bool = True,
+        use_cache: bool = False,
+    ) -> Iterator[Tuple[str, Optional[AST], Optional[Exception]]]:
+        """Parses many files in a process pool.
+
+        Workers are forked once, so they share the grammar, the parser table
+        and the tokenizer of the manager. Each worker parses whole files (see
+        ``parse_file``) and sends back the AST serialized with ``ast_cache``
+        (the AST itself if it can not be serialized). Errors found while
+        reading, tokenizing or parsing a file are given with the file
+        instead of being raised.
+
+        If the platform does not support forking processes (or ``jobs`` is
+        one) the files are parsed sequentially.
+
+        Parameters
+        ----------
+        file_paths : Iterable[str]
+            Paths of the files.
+        jobs : Optional[int], optional
+            Number of worker processes. By default the number of CPUs.
+        ordered : bool, optional
+            If True, the results are given in the order of the files,
+            otherwise as they are completed. By default True.
+        use_cache : bool, optional
+            Whether to use the AST cache (see ``parse_file``), by default
+            False.
+
+        Yields
+        ------
+        Tuple[str, Optional[AST], Optional[Exception]]
+            File path, AST (None if an error was found) and error (None if
+            the file was parsed).
+        """
+        file_paths = list(file_paths)
+        if jobs is None:
+            jobs = os.cpu_count() or 1
+        jobs = min(jobs, len(file_paths))
+        if jobs < 2 or "fork" not in multiprocessing.get_all_start_methods():
+            for file_path in file_paths:
+                yield _parse_file(self, file_path, use_cache)
+            return
+
+        with ProcessPoolExecutor(
+            max_workers=jobs,
+            mp_context=multiprocessing.get_context("fork"),
+            initializer=_init_parse_worker,
+            initargs=(self, use_cache),
+        ) as pool:
+            if ordered:
+                chunksize = max(1, len(file_paths) // (jobs * 4))
+                results = pool.map(_parse_worker_file, file_paths, chunksize=chunksize)
+            else:
+                results = (
+                    future.result()
+                    for future in as_completed(
+                        [pool.submit(_parse_worker_file, path) for path in file_paths]
+                    )
+                )
+            for file_path, data, ast, error in results:
+                if data is not None:
+                    ast = ast_cache.load_ast(data)
+                yield file_path, ast, error
 
     def parse(self, text: str) -> AST:
         """Parses a text.
@@ -64,8 +200,7 @@ class ParserManager:
         AST
             AST generated by the parser.
         """
-        text = text.replace("\t", "    ")
-        tokens = self.tokenizer.tokenize(text)
+        tokens = self.tokenizer.tokenize(text, TAB_SIZE)
         return self.parse_tokens(tokens)
 
     def parse_tokens(self, tokens: List[Token]) -> AST:
@@ -85,3 +220,303 @@ class ParserManager:
         """
         tokens += [Token("$", "$")]
         return self.parser.parse(tokens)
+
+    def check_file(self, file_path: str):
+        """Checks the syntax of a file without building its AST (see
+        ``LR1Parser.recognize``).
+
+        The file is tokenized lazily while it is checked.
+
+        Parameters
+        ----------
+        file_path : str
+            File path.
+
+        Raises
+        ------
+        ParsingError
+            If the file has a syntax error.
+        """
+        tokens = self.tokenizer.iter_file_tokens(file_path, TAB_SIZE)
+        self.parser.recognize(chain(tokens, [Token("$", "$")]))
+
+    def check(self, text: str):
+        """Checks the syntax of a text without building its AST (see
+        ``LR1Parser.recognize``).
+
+        Parameters
+        ----------
+        text : str
+            Text to be checked.
+
+        Raises
+        ------
+        ParsingError
+            If the text has a syntax error.
+        """
+        tokens = self.tokenizer.iter_tokens(text, TAB_SIZE)
+        self.parser.recognize(chain(tokens, [Token("$", "$")]))
+
+    def parse_file_stream(self, file_path: str) -> Iterator[AST]:
+        """Parses a file giving each top-level statement as soon as it is
+        parsed (see ``LR1Parser.parse_stream``).
+
+        The file is tokenized lazily while it is parsed.
+
+        Parameters
+        ----------
+        file_path : str
+            File path.
+
+        Yields
+        ------
+        AST
+            Top-level statements.
+        """
+        tokens = self.tokenizer.iter_file_tokens(file_path, TAB_SIZE)
+        return self.parse_tokens_stream(tokens)
+
+    def parse_stream(self, text: str) -> Iterator[AST]:
+        """Parses a text giving each top-level statement as soon as it is
+        parsed (see ``LR1Parser.parse_stream``).
+
+        Parameters
+        ----------
+        text : str
+            Text to be parsed.
+
+        Yields
+        ------
+        AST
+            Top-level statements.
+        """
+        tokens = self.tokenizer.iter_tokens(text, TAB_SIZE)
+        return self.parse_tokens_stream(tokens)
+
+    def parse_tokens_stream(self, tokens: Iterable[Token]) -> Iterator[AST]:
+        """Parses tokens giving each top-level statement as soon as it is
+        parsed (see ``LR1Parser.parse_stream``).
+
+        Parameters
+        ----------
+        tokens : Iterable[Token]
+            Tokens to be parsed.
+
+        Yields
+        ------
+        AST
+            Top-level statements.
+        """
+        return self.parser.parse_stream(chain(tokens, [Token("$", "$")]))
+
+    def parse_incremental(self, text: str) -> IncrementalParse:
+        """Parses a text keeping the data needed to reparse it after an edit
+        (see ``reparse``).
+
+        Parameters
+        ----------
+        text : str
+            Text to be parsed.
+
+        Returns
+        -------
+        IncrementalParse
+            Parse result.
+        """
+        return self._parse_top_level(text, [], -1)
+
+    def reparse(
+        self, previous: IncrementalParse, start: int, end: int, replacement: str
+    ) -> IncrementalParse:
+        """Parses a text again after an edit, reusing the unchanged top-level
+        statements of the previous parse.
+
+        The parser resumes at the last top-level statement boundary before
+        the edit (the program built so far is rebuilt from the statements
+        of the previous parse) and stops as soon as it reaches a boundary
+        after the edit which was also a boundary of the previous parse: the
+        rest of the text is parsed as before, so the remaining statements
+        are reused. Only the statements touched by the edit are tokenized
+        and parsed again, and the result (or the error raised) is the same
+        as parsing the new text from scratch.
+
+        Parameters
+        ----------
+        previous : IncrementalParse
+            Result of the previous parse.
+        start : int
+            Start of the edited range of the previous text.
+        end : int
+            End of the edited range of the previous text.
+        replacement : str
+            Text that replaces the edited range.
+
+        Returns
+        -------
+        IncrementalParse
+            Parse result of the new text.
+        """
+        old_text = previous.text
+        if not 0 <= start <= end <= len(old_text):
+            raise ValueError(f"Invalid edit range: {start}, {end}")
+        text = old_text[:start] + replacement + old_text[end:]
+        old = previous.reductions
+
+        # The parsing resumes at the lookahead token of a top-level reduction
+        # if it is not changed by the edit (the reduction only depends on
+        # its type)
+        resume = len(old) - 1
+        while resume >= 0:
+            _, _, pos, token_type = old[resume]
+            if 0 <= pos <= start:
+                first = next(self.tokenizer.iter_tokens(text, TAB_SIZE, pos), None)
+                if first is not None and (first.pos, first.token_type) == (
+                    pos,
+                    token_type,
+                ):
+                    break
+            resume -= 1
+        kept = old[: resume + 1]
+
+        # Boundaries where the previous parse can be continued
+        delta = len(replacement) - (end - start)
+        sync = {}
+        for i in range(resume + 1, len(old)):
+            pos = old[i][2]
+            if pos >= end:
+                sync[pos + delta] = i
+        return self._parse_top_level(text, kept, delta, old, sync)
+
+    def _parse_top_level(
+        self,
+        text: str,
+        kept: List[TopLevelReduction],
+        delta: int,
+        old: List[TopLevelReduction] = None,
+        sync: Dict[int, int] = None,
+    ) -> IncrementalParse:
+        """Parses a text recording the top-level reductions.
+
+        Parameters
+        ----------
+        text : str
+            Text to be parsed.
+        kept : List[TopLevelReduction]
+            Reductions of a previous parse which are kept. The parsing
+            resumes at the lookahead token of the last one.
+        delta : int
+            Length difference between the text and the previous one.
+        old : List[TopLevelReduction], optional
+            Reductions of the previous parse.
+        sync : Dict[int, int], optional
+            Index of the reduction of the previous parse at each position
+            (in the new text) where the previous parse can be continued.
+
+        Returns
+        -------
+        IncrementalParse
+            Parse result.
+        """
+        parser = self.parser
+        if not isinstance(parser, LR1Parser):
+            raise ValueError("Incremental parsing needs an LR1 parser")
+        _, _, builders = parser._reductions()
+        left_recursive = parser._statement_prods()
+        reductions = list(kept)
+        synced: List[int] = []
+
+        def on_top_level(prod: int, args: list, token: Token) -> bool:
+            if prod in left_recursive:
+                args = args[1:]
+            pos = token.pos if _is_line_start(text, token) else -1
+            reductions.append((prod, args, pos, token.token_type))
+            if sync and pos in sync:
+                synced.append(sync[pos])
+                return True
+            return False
+
+        program = None
+        offset = 0
+        if kept:
+            program = [_build_program(kept, builders, left_recursive)]
+            offset = kept[-1][2]
+        tokens = chain(
+            self.tokenizer.iter_tokens(text, TAB_SIZE, offset), [Token("$", "$")]
+        )
+        driver = parser._drive(tokens, None, on_top_level, program)
+        try:
+            next(driver)
+        except StopIteration as stop:
+            ast = stop.value
+        except ParsingError:
+            # The text is tokenized lazily, but ``parse`` tokenizes it as a
+            # whole before parsing it: an invalid character after the error
+            # is reported instead, as it is here
+            self.tokenizer.tokenize(text, TAB_SIZE)
+            raise
+        else:
+            raise AssertionError("Unexpected statement")
+        if synced:
+            rest = [
+                (prod, args, pos + delta if pos >= 0 else pos, token_type)
+                for prod, args, pos, token_type in old[synced[0] + 1 :]
+            ]
+            reductions += rest
+            ast = _build_program(rest, builders, left_recursive, ast)
+        return IncrementalParse(text, ast, reductions)
+
+
+def _parse_file(
+    manager: ParserManager, file_path: str, use_cache: bool
+) -> Tuple[str, Optional[AST], Optional[Exception]]:
+    try:
+        return file_path, manager.parse_file(file_path, use_cache), None
+    except (NumlabError, ValueError, OSError) as err:
+        return file_path, None, err
+
+
+# Manager and cache usage of the workers of ``ParserManager.parse_many``
+_WORKER_DATA: Tuple[ParserManager, bool] = None
+
+
+def _init_parse_worker(manager: ParserManager, use_cache: bool):
+    global _WORKER_DATA  # pylint: disable=global-statement
+    _WORKER_DATA = (manager, use_cache)
+
+
+def _parse_worker_file(
+    file_path: str,
+) -> Tuple[str, Optional[bytes], Optional[AST], Optional[Exception]]:
+    manager, use_cache = _WORKER_DATA
+    file_path, ast, error = _parse_file(manager, file_path, use_cache)
+    if ast is None:
+        return file_path, None, None, error
+    try:
+        return file_path, ast_cache.dump_ast(ast), None, None
+    except (TypeError, ValueError):
+        return file_path, None, ast, None
+
+
+def _is_line_start(text: str, token: Token) -> bool:
+    """Checks if the text can be tokenized again from a token, which is the
+    case of the scanned tokens that start a line."""
+    return (
+        token.token_type not in ("INDENT", "DEDENT")
+        and 0 <= token.pos < len(text)
+        and (token.pos == 0 or text[token.pos - 1] == "\n")
+    )
+
+
+def _build_program(
+    reductions: List[TopLevelReduction],
+    builders: list,
+    left_recursive: Dict[int, List[int]],
+    program: Optional[AST] = None,
+) -> AST:
+    """Builds a program by applying top-level reductions."""
+    for prod, args, _, _ in reductions:
+        if prod in left_recursive:
+            args = [program, *args]
+        builder = builders[prod]
+        program = args[0] if builder is None else builder(*args)
+    return program
@@ -1,24 +1,163 @@
+import hashlib
 import logging
-from functools import lru_cache
+import mmap
+import multiprocessing
+import os
+import struct
+import sys
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Any, Dict, List, Set, Tuple, Union
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
 
+from numlab.compiler.cache import FileLock, atomic_write, cache_dir
 from numlab.compiler.generic_ast import AST
-from numlab.compiler.grammar import (Grammar, NonTerminal, Production, Symbol,
-                                     Terminal)
-from numlab.compiler.grammar_ops import calculate_first, calculate_follow
-from numlab.compiler.parsers.lritem import LRItem
+from numlab.compiler.grammar import Grammar, NonTerminal, Production, Terminal
+from numlab.compiler.grammar_ops import first_bitsets
 from numlab.compiler.parsers.parser import Parser
 from numlab.compiler.tokenizer import Token
 from numlab.exceptions import ParsingError
 
+# Binary table format. Header fields: magic, format version, array typecode,
+# table key, number of states, terminals, non terminals and productions, and
+# the size of the symbol names and production blocks. The header is followed
+# by the symbol names, the productions and the packed arrays (each one
+# preceded by its length).
+_BIN_MAGIC = b"NLLR"
+_BIN_VERSION = 3
+_BIN_HEADER = struct.Struct("<4sHcx32sIIIIII")
+
+# Minimum number of states in a batch to expand it in parallel
+_MIN_PARALLEL_BATCH = 64
+
+# Version of the table generator. It must be increased every time a change
+# in the generator changes the tables it produces, so cached tables are
+# regenerated.
+_GENERATOR_VERSION = 1
+_BIN_ARRAY_LEN = struct.Struct("<I")
+
+# Arrays of a packed table (in the order they are saved)
+_PACKED_ARRAYS = (
+    "_action_default",
+    "_action_rows",
+    "_action_base",
+    "_action_check",
+    "_action_value",
+    "_goto_default",
+    "_goto_rows",
+    "_goto_base",
+    "_goto_check",
+    "_goto_value",
+)
+
+
+def _pack_rows(
+    rows: List[Dict[int, int]], width: int
+) -> Tuple[List[int], List[int], List[int], List[int]]:
+    """Packs sparse rows into a single array (row displacement).
+
+    Identical rows are merged. Each distinct row ``r`` is placed at an
+    offset ``base[r]`` so its entries do not overlap the ones of the rows
+    already placed. The value of column ``c`` of row ``r`` is
+    ``value[base[r] + c]`` if ``check[base[r] + c] == r``, otherwise the
+    row has no entry in that column.
+
+    Parameters
+    ----------
+    rows : List[Dict[int, int]]
+        Entries (column -> value) of each row.
+    width : int
+        Number of columns.
+
+    Returns
+    -------
+    Tuple[List[int], List[int], List[int], List[int]]
+        Row id of each row, base of each row id, check and value arrays.
+    """
+    row_ids: Dict[frozenset, int] = {}
+    row_of = []
+    unique_rows = []
+    for row in rows:
+        key = frozenset(row.items())
+        if key not in row_ids:
+            row_ids[key] = len(unique_rows)
+            unique_rows.append(row)
+        row_of.append(row_ids[key])
+
+    base = [0] * len(unique_rows)
+    used = bytearray()
+    check: List[int] = []
+    value: List[int] = []
+    first_free = 0
+    # Placing the densest rows first gives a tighter packing
+    order = sorted(range(len(unique_rows)), key=lambda r: -len(unique_rows[r]))
+    for row_id in order:
+        cols = sorted(unique_rows[row_id])
+        if not cols:
+            continue
+        offset = max(first_free - cols[0], 0)
+        while True:
+            if len(used) <= offset + cols[-1]:
+                extra = offset + cols[-1] + 1 - len(used) + width
+                used.extend(bytes(extra))
+                check.extend([-1] * extra)
+                value.extend([0] * extra)
+            if not any(used[offset + col] for col in cols):
+                break
+            # Skip the offsets where the first column is already used
+            offset = used.find(0, offset + cols[0] + 1) - cols[0]
+            if offset < 0:
+                offset = len(used) - cols[0]
+        base[row_id] = offset
+        for col in cols:
+            used[offset + col] = 1
+            check[offset + col] = row_id
+            value[offset + col] = unique_rows[row_id][col]
+        first_free = used.find(0, first_free)
+        if first_free < 0:
+            first_free = len(used)
+
+    # Any base + column is a valid index
+    size = max(base, default=0) + width
+    size = max(size, used.rfind(1) + 1)
+    if size > len(check):
+        check.extend([-1] * (size - len(check)))
+        value.extend([0] * (size - len(value)))
+    del check[size:], value[size:]
+    return row_of, base, check, value
+
 
 class LR1Table:
     """
     This class represents the LR1 table.
+
+    Values of the table are encoded as integers. A positive value ``v`` is
+    a shift (or goto) to state ``v - 1``, a negative value ``v`` is a
+    reduction by production ``-v - 1`` (production 0 is the augmented start
+    production, so reducing it means the input was accepted) and 0 is an
+    error.
+
+    The table is compressed:
+
+    - Each state has a default reduction (the most common one in its ACTION
+      row). It is used for every terminal that has no other action, so some
+      errors are detected after a few reductions but always before the
+      unexpected token is shifted.
+    - Each non terminal has a default GOTO state (the most common one).
+    - The remaining entries are packed with row displacement (see
+      ``_pack_rows``): identical rows are merged and the rows are overlapped
+      in a single array.
     """
 
-    def __init__(self, grammar: Grammar, table_file: str = None):
+    def __init__(
+        self,
+        grammar: Grammar,
+        table_file: str = None,
+        lalr: bool = False,
+        use_cache: bool = False,
+        jobs: Optional[int] = 1,
+    ):
         """
         Initializes a new LR1 table.
 
@@ -29,88 +168,506 @@ class LR1Table:
         table_file : str, optional
             File to load the table from.
 
-            If file does not the table will be created and saved to this file.
+            If file does not exist or it contains a table generated for
+            another grammar (or by another version of the generator), the
+            table will be created and saved to this file.
             If not given, the table will be generated.
+        lalr : bool, optional
+            If True, the generated table is an LALR(1) table (states with the
+            same core are merged), by default False.
+        use_cache : bool, optional
+            If True and ``table_file`` is not given, the table is stored in
+            the NumLab cache directory (see ``cache_dir``) under a name
+            given by the grammar content, by default False.
+        jobs : Optional[int], optional
+            Number of processes used to generate the table, by default 1.
+            If None, the number of CPUs is used. The generated table does
+            not depend on the number of processes.
         """
         self.grammar = grammar
+        self.lalr = lalr
+        self.jobs = jobs
         self._prepare_grammar()
+        self.key = self._table_key()
         self._symbols = {sym.name: sym for sym in grammar.symbols}
         self._symbols["$"] = Terminal("$")
         self._productions = {
             prod.head_str: prod for _, prod in grammar.all_productions()
         }
 
-        # [state, symbol] -> [next_state, production]
-        self._table: Dict[Tuple[int, str], Union[str, int, Production]] = {}
-
-        self._first = None
-        self._follow = None
-        self._states_by_id: Dict[int, List[LRItem]] = None
-        self._id_by_hashsum: Dict[int, int] = {}
-        self._closure_cache: Dict[int, List[LRItem]] = {}
-        self._goto_cache: Dict[Tuple[int, str], int] = {}
-        self._lr_items: Dict[Production, int, Terminal] = None
-        self._item_prods: Dict[NonTerminal, Production] = None
-
-        if table_file is not None:
-            table_file_path = Path(table_file)
-            if table_file_path.exists():
-                self._load_table(table_file)
+        # Symbol and production ids
+        self._term_ids: Dict[str, int] = {}
+        self._nonterm_ids: Dict[str, int] = {}
+        self._prods: List[Production] = []
+
+        # Packed ACTION (by state) and GOTO (by non terminal) tables
+        self._action_default: array = None
+        self._action_rows: array = None
+        self._action_base: array = None
+        self._action_check: array = None
+        self._action_value: array = None
+        self._goto_default: array = None
+        self._goto_rows: array = None
+        self._goto_base: array = None
+        self._goto_check: array = None
+        self._goto_value: array = None
+        self._state_count = 0
+
+        # Builder data (only set when the table is generated)
+        self._first: List[int] = None
+        self._nullable: List[bool] = None
+        self._item_sym: array = None
+        self._item_first: array = None
+        self._item_nullable: bytearray = None
+        self._item_prod: array = None
+        self._nonterm_items: List[List[int]] = None
+
+        if table_file is None and use_cache:
+            kind = "lalr1" if lalr else "lr1"
+            table_file = cache_dir() / f"{kind}_{self.key.hex()[:32]}.table"
+        if table_file is None:
+            self._build_table()
+        elif not self._load_table(table_file):
+            self._build_and_save(Path(table_file))
+
+    def _table_key(self) -> bytes:
+        """Returns the key that identifies the tables of the grammar.
+
+        The key depends on the grammar productions, the kind of table
+        (LR1 or LALR1) and the version of the generator.
+
+        Returns
+        -------
+        bytes
+            Key (a SHA-256 digest).
+        """
+        desc = f"{_BIN_VERSION} {_GENERATOR_VERSION} {self.lalr} "
+        desc += self.grammar.content_hash()
+        return hashlib.sha256(desc.encode("utf-8")).digest()
+
+    def _build_and_save(self, table_file: Path):
+        """Builds the table and saves it to a file.
+
+        A lock file prevents several processes from building the same table
+        at once: the ones that wait for the lock load the table saved by the
+        first one.
+
+        Parameters
+        ----------
+        table_file : Path
+            Path to the file.
+        """
+        try:
+            table_file.parent.mkdir(parents=True, exist_ok=True)
+            lock = FileLock(f"{table_file}.lock")
+            lock.acquire()
+        except OSError as err:
+            logging.warning(f"Can not lock table file {table_file}: {err}")
+            self._build_table()
+            return
+        try:
+            if self._load_table(table_file):
                 return
-        self._build_table(table_file)
+            self._build_table()
+            self.save_table(str(table_file))
+        except OSError as err:
+            logging.warning(f"Can not save table file {table_file}: {err}")
+        finally:
+            lock.release()
 
-    def _load_table(self, table_file: str):
+    def _load_table(self, table_file: str) -> bool:
         """Loads the table from a file.
 
+        Both the binary and the (legacy) text formats are supported.
+
         Parameters
         ----------
         table_file : str
             Path to the file.
+
+        Returns
+        -------
+        bool
+            False if the file does not exist or it contains an outdated
+            table (only binary tables can be checked), True otherwise.
         """
+        try:
+            with open(str(table_file), "rb") as table_f:
+                is_binary = table_f.read(len(_BIN_MAGIC)) == _BIN_MAGIC
+        except FileNotFoundError:
+            return False
         logging.info(f"Loading table from {table_file}")
+        if is_binary:
+            return self._load_binary_table(table_file)
+        self._load_text_table(table_file)
+        return True
+
+    def _load_binary_table(self, table_file: str) -> bool:
+        """Loads the table from a binary file.
+
+        Parameters
+        ----------
+        table_file : str
+            Path to the file.
+
+        Returns
+        -------
+        bool
+            False if the table is outdated, True otherwise.
+        """
+        with open(str(table_file), "rb") as table_f, mmap.mmap(
+            table_f.fileno(), 0, access=mmap.ACCESS_READ
+        ) as data, memoryview(data) as view:
+            (
+                _,
+                version,
+                typecode,
+                key,
+                state_count,
+                term_count,
+                nonterm_count,
+                prod_count,
+                names_size,
+                prods_size,
+            ) = _BIN_HEADER.unpack_from(view)
+            if version != _BIN_VERSION or key != self.key:
+                logging.info(f"Table in {table_file} is outdated")
+                return False
+            pos = _BIN_HEADER.size
+            names = str(view[pos : pos + names_size], "utf-8").split("\n")
+            pos += names_size
+            prod_keys = str(view[pos : pos + prods_size], "utf-8").split("\n")
+            pos += prods_size
+
+            arrays = []
+            for _ in _PACKED_ARRAYS:
+                (count,) = _BIN_ARRAY_LEN.unpack_from(view, pos)
+                pos += _BIN_ARRAY_LEN.size
+                arr = array(typecode.decode())
+                size = count * arr.itemsize
+                arr.frombytes(view[pos : pos + size])
+                if sys.byteorder == "big":
+                    arr.byteswap()
+                arrays.append(arr)
+                pos += size
+
+        assert len(names) == term_count + nonterm_count, "Invalid table file"
+        assert len(prod_keys) == prod_count, "Invalid table file"
+        self._term_ids = {name: i for i, name in enumerate(names[:term_count])}
+        self._nonterm_ids = {name: i for i, name in enumerate(names[term_count:])}
+        self._prods = [self._parse_prod(key) for key in prod_keys]
+        for name, arr in zip(_PACKED_ARRAYS, arrays):
+            setattr(self, name, arr)
+        self._state_count = state_count
+        return True
+
+    def _load_text_table(self, table_file: str):
+        """Loads the table from a text file.
+
+        Parameters
+        ----------
+        table_file : str
+            Path to the file.
+        """
         with open(str(table_file), "r", encoding="utf-8") as table_f:
             file_lines = table_f.readlines()
 
         assert len(file_lines) % 3 == 0, "Invalid table file"
 
+        table = {}
         for i in range(0, len(file_lines), 3):
             state = int(file_lines[i])
-            symbol = self._symbols[file_lines[i + 1].strip()]
+            symbol = file_lines[i + 1].strip()
             str_t_val = file_lines[i + 2].strip()
             t_val = str_t_val
             if "->" in str_t_val:
-                is_eps = False
-                if str_t_val.endswith("->"):
-                    is_eps = True
-                    str_t_val += " EPS"
-                t_val = self._productions[str_t_val]
-                if is_eps:
-                    item_prod = Production([])
-                    item_prod._head = t_val.head
-                    item_prod._builder = t_val._builder
-                    t_val = item_prod
+                t_val = self._parse_prod(str_t_val)
             elif str_t_val.isnumeric():
                 t_val = int(str_t_val)
-            self._table[(state, symbol)] = t_val
+            table[(state, symbol)] = t_val
+        self._set_table(table)
 
-    def save_table(self, table_file: str):
+    def _parse_prod(self, prod_key: str) -> Production:
+        """Gets the production used in reductions given its string key.
+
+        Epsilon productions are replaced by productions with no symbols.
+
+        Parameters
+        ----------
+        prod_key : str
+            Production key (as in ``Production.head_str``).
+
+        Returns
+        -------
+        Production
+            Production.
+        """
+        if prod_key.endswith("->"):
+            prod_key += " EPS"
+        prod = self._productions[prod_key]
+        if prod.is_eps:
+            item_prod = Production([], prod.prec)
+            item_prod._head = prod.head
+            item_prod._builder = prod._builder
+            prod = item_prod
+        return prod
+
+    @staticmethod
+    def _prod_key(prod: Production) -> str:
+        if not prod.symbols:
+            return f"{prod.head.name} -> EPS"
+        return prod.head_str
+
+    def _set_ids(self):
+        """Assigns ids to the terminals, non terminals and productions."""
+        start_prod = self.grammar.start_expr.prod_0
+        prods = [start_prod] + [
+            prod for _, prod in self.grammar.all_productions() if prod is not start_prod
+        ]
+        self._prods = [self._parse_prod(prod.head_str) for prod in prods]
+
+        terms = ["$"] + sorted(term.name for term in self.grammar.all_terminals())
+        self._term_ids = {name: i for i, name in enumerate(terms)}
+        self._nonterm_ids = {expr.name: i for i, expr in enumerate(self.grammar.exprs)}
+
+    def _set_arrays(self, state_count: int, values: List[int], goto_values: List[int]):
+        """Compresses and sets the ACTION and GOTO tables.
+
+        Parameters
+        ----------
+        state_count : int
+            Number of states.
+        values : List[int]
+            Encoded ACTION values (``state * terminal_count + terminal_id``).
+        goto_values : List[int]
+            Encoded GOTO values (``state * non_terminal_count + non_terminal_id``).
+        """
+        term_count = len(self._term_ids)
+        nonterm_count = len(self._nonterm_ids)
+
+        action_default = []
+        action_rows = []
+        for state in range(state_count):
+            row = values[state * term_count : (state + 1) * term_count]
+            # Accepting (-1) is never used as default, otherwise any token
+            # after a complete program would be accepted
+            reduces = [code for code in row if code < -1]
+            default = max(set(reduces), key=reduces.count) if reduces else 0
+            action_default.append(default)
+            action_rows.append(
+                {
+                    term: code
+                    for term, code in enumerate(row)
+                    if code not in (0, default)
+                }
+            )
+
+        goto_default = []
+        goto_rows = []
+        for nonterm in range(nonterm_count):
+            column = goto_values[nonterm::nonterm_count]
+            targets = [code for code in column if code]
+            default = max(set(targets), key=targets.count) if targets else 0
+            goto_default.append(default)
+            goto_rows.append(
+                {
+                    state: code
+                    for state, code in enumerate(column)
+                    if code not in (0, default)
+                }
+            )
+
+        packed = [action_default]
+        packed.extend(_pack_rows(action_rows, term_count))
+        packed.append(goto_default)
+        packed.extend(_pack_rows(goto_rows, state_count))
+
+        self._state_count = state_count
+        max_code = max(state_count, len(self._prods), max(map(len, packed))) + 1
+        typecode = "h" if max_code < 2**15 else "i"
+        for name, values in zip(_PACKED_ARRAYS, packed):
+            setattr(self, name, array(typecode, values))
+
+    def _set_table(self, table: Dict[Tuple[int, str], Union[str, int, Production]]):
+        """Sets the table arrays given a table dictionary.
+
+        Parameters
+        ----------
+        table : Dict[Tuple[int, str], Union[str, int, Production]]
+            Table as a dictionary ``(state, symbol name) -> value``. Values
+            are the next state, the production to be reduced or ``"OK"``.
+        """
+        self._set_ids()
+        prod_ids = {self._prod_key(prod): i for i, prod in enumerate(self._prods)}
+
+        state_count = max(state for state, _ in table) + 1 if table else 0
+        values = [0] * (state_count * len(self._term_ids))
+        goto_values = [0] * (state_count * len(self._nonterm_ids))
+        for (state, symbol), value in table.items():
+            if value == "OK":
+                code = -1
+            elif isinstance(value, Production):
+                code = -prod_ids[self._prod_key(value)] - 1
+            else:
+                code = value + 1
+            if symbol in self._term_ids:
+                values[state * len(self._term_ids) + self._term_ids[symbol]] = code
+            else:
+                sym_id = self._nonterm_ids[symbol]
+                goto_values[state * len(self._nonterm_ids) + sym_id] = code
+        self._set_arrays(state_count, values, goto_values)
+
+    def save_table(self, table_file: str, binary: bool = True):
         """Saves the table to a file.
 
+        The file is replaced atomically, so other processes never read a
+        partially written table.
+
         Parameters
         ----------
         table_file : str
             Path to the file.
+        binary : bool, optional
+            Whether to use the binary format or the text one, by default True.
         """
         logging.info(f"Saving table to {table_file}")
-        with open(table_file, "w", encoding="utf-8") as table_f:
-            for key, value in self._table.items():
-                state, symbol = key
+        if not binary:
+            lines = []
+            for (state, symbol), value in self.items():
                 t_val = "" if value is None else str(value)
                 if isinstance(value, Production):
                     t_val = value.head_str
-                table_f.write(f"{state}\n")
-                table_f.write(f"{symbol}\n")
-                table_f.write(f"{t_val}\n")
+                lines.append(f"{state}\n{symbol}\n{t_val}\n")
+            with atomic_write(table_file) as table_f:
+                table_f.write("".join(lines).encode("utf-8"))
+            return
+
+        names = list(self._term_ids) + list(self._nonterm_ids)
+        names_data = "\n".join(names).encode("utf-8")
+        prods_data = "\n".join(self._prod_key(prod) for prod in self._prods)
+        prods_data = prods_data.encode("utf-8")
+        header = _BIN_HEADER.pack(
+            _BIN_MAGIC,
+            _BIN_VERSION,
+            self._action_default.typecode.encode(),
+            self.key,
+            self._state_count,
+            len(self._term_ids),
+            len(self._nonterm_ids),
+            len(self._prods),
+            len(names_data),
+            len(prods_data),
+        )
+        with atomic_write(table_file) as table_f:
+            table_f.write(header)
+            table_f.write(names_data)
+            table_f.write(prods_data)
+            for name in _PACKED_ARRAYS:
+                arr = getattr(self, name)
+                if sys.byteorder == "big":
+                    arr = array(arr.typecode, arr)
+                    arr.byteswap()
+                table_f.write(_BIN_ARRAY_LEN.pack(len(arr)))
+                table_f.write(arr.tobytes())
+
+    @property
+    def productions(self) -> List[Production]:
+        """Productions of the table, indexed by production id.
+
+        Returns
+        -------
+        List[Production]
+            Productions (the first one is the augmented start production).
+        """
+        return self._prods
+
+    def items(self):
+        """Iterates over the non empty table entries.
+
+        Entries given by default reductions and default GOTO states are
+        included.
+
+        Yields
+        ------
+        Tuple[Tuple[int, str], Union[str, int, Production]]
+            ``(state, symbol name)`` and value of each entry.
+        """
+        for state in range(self._state_count):
+            for name, term_id in self._term_ids.items():
+                code = self._action_code(state, term_id)
+                if code:
+                    yield (state, name), self._decode(code)
+            for name, nonterm_id in self._nonterm_ids.items():
+                code = self._goto_code(state, nonterm_id)
+                if code:
+                    yield (state, name), self._decode(code)
+
+    def _action_code(self, state: int, term_id: int) -> int:
+        row = self._action_rows[state]
+        pos = self._action_base[row] + term_id
+        if self._action_check[pos] == row:
+            return self._action_value[pos]
+        return self._action_default[state]
+
+    def _goto_code(self, state: int, nonterm_id: int) -> int:
+        row = self._goto_rows[nonterm_id]
+        pos = self._goto_base[row] + state
+        if self._goto_check[pos] == row:
+            return self._goto_value[pos]
+        return self._goto_default[nonterm_id]
+
+    def action(self, state: int, terminal: str) -> Union[str, int, Production, None]:
+        """Returns the action of a state for a given terminal.
+
+        Parameters
+        ----------
+        state : int
+            State number.
+        terminal : str
+            Terminal name.
+
+        Returns
+        -------
+        Union[str, int, Production, None]
+            Next state (shift), production to be reduced, ``"OK"`` if the
+            input is accepted or None if there is no action (error).
+        """
+        term_id = self._term_ids.get(terminal, None)
+        if term_id is None:
+            return None
+        row = self._action_rows[state]
+        pos = self._action_base[row] + term_id
+        if self._action_check[pos] == row:
+            code = self._action_value[pos]
+        else:
+            code = self._action_default[state]
+        if code > 0:
+            return code - 1
+        return self._decode(code)
+
+    def goto(self, state: int, non_terminal: str) -> Union[int, None]:
+        """Returns the GOTO state of a state for a given non terminal.
+
+        Parameters
+        ----------
+        state : int
+            State number.
+        non_terminal : str
+            Non terminal name.
+
+        Returns
+        -------
+        Union[int, None]
+            Next state.
+        """
+        nonterm_id = self._nonterm_ids.get(non_terminal, None)
+        if nonterm_id is None:
+            return None
+        row = self._goto_rows[nonterm_id]
+        pos = self._goto_base[row] + state
+        if self._goto_check[pos] == row:
+            return self._goto_value[pos] - 1
+        return self._decode(self._goto_default[nonterm_id])
 
     def _prepare_grammar(self):
         logging.info("Preparing grammar (adding S')")
@@ -121,214 +678,382 @@ class LR1Table:
             self.grammar.start = non_ter
             self.grammar.start.prod_0.set_builder(lambda s: s.ast)
 
-    def _extract_grammar_lr_items(self) -> List[LRItem]:
-        """Extracts all LR items from the grammar."""
-
-        logging.info("Extracting all LR items")
-        lr_items = []
-        self._item_prods = {}
-        for _, prod in self.grammar.all_productions():
-            for dot_pos in range(len(prod.symbols) + 1):
-                item_prod = prod
-                is_eps = prod.is_eps
-                if is_eps:
-                    item_prod = Production([])
-                    item_prod._head = prod.head
-                    item_prod._builder = prod._builder
-                slr_item = LRItem(item_prod, dot_pos)
-                lr_items.append(slr_item)
-                if prod.head not in self._item_prods:
-                    self._item_prods[prod.head] = []
-                self._item_prods[prod.head.name].append(item_prod)
-                if is_eps:
-                    break
-        logging.info(f"Found {len(lr_items)} LR items")
-        logging.debug("Exacted items in the LR automata:")
-        for lr_item in lr_items:
-            logging.debug(f"  {lr_item}")
-        return lr_items
+    def _prepare_items(self):
+        """Codifies the LR items of the grammar as integers.
+
+        Symbols are identified by an integer: terminals take the ids
+        ``[0, T)`` and non terminals ``[T, T + N)``. The LR items of a
+        production are consecutive integers (one per dot position), so
+        advancing the dot of item ``i`` gives item ``i + 1``. Sets of
+        terminals (first sets and lookaheads) are bitsets stored in ints.
+        """
+        term_count = len(self._term_ids)
+        sym_ids = dict(self._term_ids)
+        for name, nonterm_id in self._nonterm_ids.items():
+            sym_ids[name] = term_count + nonterm_id
+        rhs = [[sym_ids[sym.name] for sym in prod.symbols] for prod in self._prods]
+        heads = [self._nonterm_ids[prod.head.name] for prod in self._prods]
+
+        first, nullable = first_bitsets(heads, rhs, term_count)
+        self._first, self._nullable = first, nullable
 
-    def _contained_in_first(self, terminal: Terminal, *symbols):
-        """Checks if a terminal is contained in the first set of a set of symbols.
+        # Items: next symbol (-1 if the dot is at the end), first set of the
+        # symbols after the next one and whether they can derive EPS.
+        item_sym, item_first, item_nullable, item_prod = [], [], [], []
+        self._nonterm_items = [[] for _ in self._nonterm_ids]
+        for prod_id, symbols in enumerate(rhs):
+            self._nonterm_items[heads[prod_id]].append(len(item_sym))
+            for dot_pos in range(len(symbols) + 1):
+                rest = symbols[dot_pos + 1 :]
+                mask, is_nullable = self._first_of(rest, first, nullable)
+                item_sym.append(symbols[dot_pos] if dot_pos < len(symbols) else -1)
+                item_first.append(mask)
+                item_nullable.append(is_nullable)
+                item_prod.append(prod_id)
+        self._item_sym = array("i", item_sym)
+        self._item_first = item_first
+        self._item_nullable = bytearray(item_nullable)
+        self._item_prod = array("i", item_prod)
+        logging.info(f"Found {len(item_sym)} LR items")
+
+    def _first_of(
+        self, symbols: List[int], first: List[int], nullable: List[bool]
+    ) -> Tuple[int, bool]:
+        """Returns the first set of a sequence of symbols.
 
         Parameters
         ----------
-        terminal : Terminal
-            Terminal to be checked.
-        symbols : Symbol
-            Symbols to be checked.
+        symbols : List[int]
+            Symbol ids.
+        first : List[int]
+            First sets (bitsets) of the non terminals.
+        nullable : List[bool]
+            Whether each non terminal can derive EPS.
 
         Returns
         -------
-        bool
-            True if the terminal is contained in the first set of the symbols.
+        Tuple[int, bool]
+            First set (bitset) and whether the sequence can derive EPS.
         """
-        for symbol in symbols:
-            if isinstance(symbol, Symbol) and symbol.is_terminal:
-                return symbol == terminal
-            if terminal in self._first[symbol]:
-                return True
-            if "EPS" not in self._first[symbol]:
-                break
-        return False
-
-    def _build_table(self, table_file: str = None):
-        self._first = calculate_first(self.grammar)
-        self._follow = calculate_follow(self.grammar, self._first)
-        items = self._extract_grammar_lr_items()
-
-        self._lr_items = {}
-        for item in items:
-            for follow in self._follow[item.prod.head]:
-                new_lr_item = LRItem(item.prod, item.dot_pos, follow)
-                self._lr_items[item.prod, item.dot_pos, follow] = new_lr_item
-
-        init_state = self._closure(
-            {
-                self._lr_items[
-                    self.grammar.start_expr.prod_0,
-                    0,
-                    self._follow[self.grammar.start_expr][0],
-                ]
-            }
-        )
+        term_count = len(self._term_ids)
+        mask = 0
+        for sym in symbols:
+            if sym < term_count:
+                return mask | (1 << sym), False
+            mask |= first[sym - term_count]
+            if not nullable[sym - term_count]:
+                return mask, False
+        return mask, True
 
-        self._states_by_id = {0: init_state}
-
-        logging.info("Building LR1 table")
-        lr1_table: Dict[Tuple[int, str], Union[str, int, Production]] = {}
-        current_state = 0
-        while current_state < len(self._states_by_id):
-            logging.info(f"Building state {current_state} of {len(self._states_by_id)}")
-            state = self._states_by_id[current_state]
-            for item in state:
-                if item.at_symbol is None:
-                    val = "OK" if item.prod.head.name == "S`" else item.prod
-                    table_key = (current_state, item.lah.name)
-                else:
-                    val = self._goto(current_state, item.at_symbol)
-                    table_key = (current_state, item.at_symbol.name)
+    def _build_table(self):
+        self._set_ids()
+        self._prepare_items()
 
-                cont_val = lr1_table.get(table_key, None)
+        logging.info("Building LALR1 table" if self.lalr else "Building LR1 table")
+        # Kernel of each state (item -> lookahead bitset). Canonical LR1
+        # states are identified by their kernel. LALR1 states are identified
+        # by their core (kernel items without lookaheads) and their
+        # lookaheads are merged, so a state is expanded again each time its
+        # lookaheads grow.
+        #
+        # States are expanded by batches (all the pending states at once),
+        # possibly in parallel. New states are numbered in the order of the
+        # batch, so the result does not depend on the number of processes.
+        kernels: List[Dict[int, int]] = [{0: 1 << self._term_ids["$"]}]
+        state_ids: Dict[frozenset, int] = {}
+        reductions: List[Dict[int, int]] = [None]
+        transitions: List[Dict[int, int]] = [None]
+        pending = [0]
+        queued = set()
+        with self._state_expander() as expand:
+            while pending:
+                batch, pending = pending, []
+                queued.clear()
+                results = expand([kernels[state] for state in batch])
+                for state, (reduces, gotos) in zip(batch, results):
+                    reductions[state] = reduces
+                    trans = transitions[state] = {}
+                    for sym, kernel in gotos:
+                        if self.lalr:
+                            key = frozenset(kernel)
+                        else:
+                            key = frozenset(kernel.items())
+                        next_state = state_ids.get(key, None)
+                        if next_state is None:
+                            next_state = len(kernels)
+                            state_ids[key] = next_state
+                            kernels.append(kernel)
+                            reductions.append(None)
+                            transitions.append(None)
+                            pending.append(next_state)
+                            queued.add(next_state)
+                        elif self.lalr and self._merge_lookaheads(
+                            kernels[next_state], kernel
+                        ):
+                            if next_state not in queued:
+                                pending.append(next_state)
+                                queued.add(next_state)
+                        trans[sym] = next_state
+        logging.info(f"Built {len(kernels)} states")
 
-                if cont_val is not None and cont_val != val:
-                    raise ValueError(
-                        f"LR1 table already contains "
-                        f"{table_key} -> {cont_val.__repr__()}  *** {val.__repr__()}"
-                    )
-                lr1_table[table_key] = val
-            current_state += 1
-        self._table = lr1_table
+        self._set_automaton_table(reductions, transitions)
         logging.info("LR1 table built")
-        if table_file is not None:
-            self.save_table(table_file)
 
-    def get_state_number(self, items: Set[LRItem]) -> int:
-        """Returns the state number for a list of LR items.
+    @contextmanager
+    def _state_expander(self) -> Iterator[Callable]:
+        """Creates the function used to expand batches of states.
+
+        If ``jobs`` is greater than one, big batches are expanded in a pool
+        of forked processes. If the platform does not support forking
+        processes the states are expanded sequentially.
+
+        Yields
+        ------
+        Callable[[List[Dict[int, int]]], List[Tuple[Dict[int, int], list]]]
+            Function that expands a list of kernels (see ``_expand``).
+        """
+        jobs = self.jobs
+        if jobs is None:
+            jobs = os.cpu_count() or 1
+        if jobs > 1 and "fork" in multiprocessing.get_all_start_methods():
+            pool = ProcessPoolExecutor(
+                max_workers=jobs,
+                mp_context=multiprocessing.get_context("fork"),
+                initializer=_init_build_worker,
+                initargs=(self,),
+            )
+        else:
+            pool = None
+
+        def expand(kernels: List[Dict[int, int]]):
+            if pool is None or len(kernels) < _MIN_PARALLEL_BATCH:
+                return [self._expand(kernel) for kernel in kernels]
+            size = -(-len(kernels) // (jobs * 4))
+            chunks = [kernels[i : i + size] for i in range(0, len(kernels), size)]
+            return [res for chunk in pool.map(_expand_kernels, chunks) for res in chunk]
+
+        try:
+            yield expand
+        finally:
+            if pool is not None:
+                pool.shutdown()
+
+    def _expand(
+        self, kernel: Dict[int, int]
+    ) -> Tuple[Dict[int, int], List[Tuple[int, Dict[int, int]]]]:
+        """Expands a state.
 
         Parameters
         ----------
-        items : List[LRItem]
-            List of LR items.
+        kernel : Dict[int, int]
+            Kernel items of the state and their lookaheads.
 
         Returns
         -------
-        int
-            State number.
+        Tuple[Dict[int, int], List[Tuple[int, Dict[int, int]]]]
+            Items of the state with the dot at the end (and their
+            lookaheads), and the kernels reached by each symbol (sorted by
+            symbol id).
         """
-        hashsum = self.items_hash(items)
-        if hashsum in self._id_by_hashsum:
-            return self._id_by_hashsum[hashsum]
-        number = len(self._states_by_id)
-        self._states_by_id[number] = items
-        self._id_by_hashsum[hashsum] = number
-        return number
+        closure = self._closure(kernel)
+        item_sym = self._item_sym
+        reduces = {item: lah for item, lah in closure.items() if item_sym[item] < 0}
+        return reduces, sorted(self._goto_kernels(closure).items())
 
-    def __getitem__(self, index):
-        return self._table.get(index, None)
+    def _closure(self, kernel: Dict[int, int]) -> Dict[int, int]:
+        """Returns the closure of a kernel.
+
+        Parameters
+        ----------
+        kernel : Dict[int, int]
+            Kernel items and their lookaheads.
+
+        Returns
+        -------
+        Dict[int, int]
+            Closure items and their lookaheads.
+        """
+        term_count = len(self._term_ids)
+        item_sym, item_first = self._item_sym, self._item_first
+        item_nullable, nonterm_items = self._item_nullable, self._nonterm_items
+        closure = dict(kernel)
+        pending = list(kernel)
+        while pending:
+            item = pending.pop()
+            sym = item_sym[item]
+            if sym < term_count:
+                continue
+            lah = item_first[item]
+            if item_nullable[item]:
+                lah |= closure[item]
+            for new_item in nonterm_items[sym - term_count]:
+                old_lah = closure.get(new_item, 0)
+                if old_lah | lah != old_lah:
+                    closure[new_item] = old_lah | lah
+                    pending.append(new_item)
+        return closure
 
-    def items_hash(self, items: Set[LRItem]) -> Any:
-        """Returns a unique value for a list of LR items.
+    def _goto_kernels(self, closure: Dict[int, int]) -> Dict[int, Dict[int, int]]:
+        """Returns the kernels reached from a state by each symbol.
 
         Parameters
         ----------
-        items : Set[LRItem]
-            Set of LR items.
+        closure : Dict[int, int]
+            Closure of the state.
 
         Returns
         -------
-        Any
-            Hash sum.
+        Dict[int, Dict[int, int]]
+            Kernel (items and their lookaheads) by symbol id.
         """
-        # return "".join([item.__repr__() for item in items])
-        return sum(hash(item) for item in items)
+        item_sym = self._item_sym
+        kernels: Dict[int, Dict[int, int]] = {}
+        for item, lah in closure.items():
+            sym = item_sym[item]
+            if sym >= 0:
+                kernels.setdefault(sym, {})[item + 1] = lah
+        return kernels
 
-    @lru_cache(maxsize=None)
-    def _goto(self, state: int, symbol: Symbol) -> int:
-        """Returns the state number for a state and a symbol.
+    @staticmethod
+    def _merge_lookaheads(kernel: Dict[int, int], other: Dict[int, int]) -> bool:
+        """Adds the lookaheads of a kernel to another one with the same core.
 
         Parameters
         ----------
-        state : int
-            State number.
-        symbol : Symbol
-            Symbol.
+        kernel : Dict[int, int]
+            Kernel to be updated.
+        other : Dict[int, int]
+            Kernel with the same core.
 
         Returns
         -------
-        int
-            State number.
+        bool
+            True if any lookahead was added.
         """
-        logging.debug(f"Goto({state}, {symbol})")
-        state_items = self._states_by_id[state]
-        filtered_items = {
-            self._lr_items[item.prod, item.dot_pos + 1, item.lah]
-            for item in state_items
-            if item.at_symbol == symbol
-        }
-        clausure = self._closure(filtered_items)
-        return self.get_state_number(clausure)
+        change = False
+        for item, lah in other.items():
+            if kernel[item] | lah != kernel[item]:
+                kernel[item] |= lah
+                change = True
+        return change
+
+    def _set_automaton_table(
+        self, reductions: List[Dict[int, int]], transitions: List[Dict[int, int]]
+    ):
+        """Sets the table arrays given the states of the LR automaton.
+
+        Parameters
+        ----------
+        reductions : List[Dict[int, int]]
+            Items with the dot at the end (and their lookaheads) of each
+            state.
+        transitions : List[Dict[int, int]]
+            Next state of each state by symbol id.
+
+        Shift/reduce conflicts are resolved with the precedences of the
+        grammar (see ``Grammar.open``) when both the terminal and the
+        production have one.
+
+        Raises
+        ------
+        ValueError
+            If the grammar has a conflict that can not be resolved.
+        """
+        term_count = len(self._term_ids)
+        nonterm_count = len(self._nonterm_ids)
+        state_count = len(reductions)
+        values = [0] * (state_count * term_count)
+        goto_values = [0] * (state_count * nonterm_count)
+        item_prod = self._item_prod
+        precedence = self.grammar.precedence
+        term_prec = [precedence.get(name) for name in self._term_ids]
+        prod_prec = [self.grammar.prod_precedence(prod) for prod in self._prods]
+        for state, reduces in enumerate(reductions):
+            row = state * term_count
+            for sym, next_state in transitions[state].items():
+                if sym < term_count:
+                    values[row + sym] = next_state + 1
+                else:
+                    goto_values[state * nonterm_count + sym - term_count] = (
+                        next_state + 1
+                    )
+            for item, lah in reduces.items():
+                prod_id = item_prod[item]
+                code = -prod_id - 1
+                while lah:
+                    low_bit = lah & -lah
+                    term = low_bit.bit_length() - 1
+                    lah ^= low_bit
+                    current = values[row + term]
+                    if current in (0, code):
+                        values[row + term] = code
+                        continue
+                    reduce = None
+                    if current > 0:
+                        reduce = _prefer_reduce(prod_prec[prod_id], term_prec[term])
+                    if reduce is None:
+                        self._raise_conflict(state, term, current, code)
+                    if reduce:
+                        values[row + term] = code
+        self._set_arrays(state_count, values, goto_values)
+
+    def _raise_conflict(self, state: int, term: int, code: int, other_code: int):
+        """Raises a ValueError describing a conflict in the table.
 
-    def _closure(self, items: Set[LRItem]) -> Set[LRItem]:
-        """Returns the closure of a list of LR items.
+        Parameters
+        ----------
+        state : int
+            State where the conflict was found.
+        term : int
+            Terminal id.
+        code : int
+            Encoded value already in the table.
+        other_code : int
+            Encoded value that was going to be set.
+        """
+        names = list(self._term_ids)
+        actions = [
+            f"shift {val - 1}"
+            if val > 0
+            else f"reduce {self._prods[-val - 1].head_str}"
+            for val in (code, other_code)
+        ]
+        msg = f"conflict in state {state} on symbol '{names[term]}': "
+        msg += f"{actions[0]}  *** {actions[1]}"
+        if self.lalr:
+            raise ValueError(
+                f"LALR1 {msg}. The grammar may not be LALR1, "
+                "try a canonical LR1 table"
+            )
+        raise ValueError(f"LR1 {msg}")
+
+    def __getitem__(self, index):
+        state, symbol = index
+        if symbol in self._term_ids:
+            return self.action(state, symbol)
+        return self.goto(state, symbol)
+
+    def _decode(self, code: int) -> Union[str, int, Production, None]:
+        """Decodes a table value.
 
         Parameters
         ----------
-        items : List[LRItem]
-            List of LR items.
+        code : int
+            Encoded value.
 
         Returns
         -------
-        List[LRItem]
-            Closure of the list of LR items.
+        Union[str, int, Production, None]
+            Next state, production to be reduced, ``"OK"`` or None if the
+            value is an error.
         """
-        hashsum = self.items_hash(items)
-        if hashsum in self._closure_cache:
-            return self._closure_cache[hashsum]
-        logging.debug(f"Calculating closure of {items}")
-        closure = items
-        change = True
-        while change:
-            change = False
-            new = set()
-            for item in closure:
-                next_item = item.at_symbol
-                if next_item is None or next_item.is_terminal:
-                    continue
-                lah = item.lah
-                rest = item.prod.symbols[item.dot_pos + 1 :]
-                rest.append(lah)
-                for prod in self._item_prods[next_item.name]:
-                    for fol in self._follow[next_item]:
-                        if not self._contained_in_first(fol, *rest):
-                            continue
-                        lr_item = self._lr_items[prod, 0, fol]
-                        if lr_item not in closure:
-                            new.add(lr_item)
-                            change = True
-            closure.update(new)
-        self._closure_cache[hashsum] = closure
-        return closure
+        if code > 0:
+            return code - 1
+        if code == -1:
+            return "OK"
+        if code < 0:
+            return self._prods[-code - 1]
+        return None
 
 
 class LR1Parser(Parser):
@@ -344,64 +1069,387 @@ class LR1Parser(Parser):
         If the file does not exist, it will be created.
         If not specified, the table will be built automatically from
         the grammar.
+    lalr : bool, optional
+        If True, an LALR1 table is generated instead of a canonical LR1 one.
+        LALR1 tables have fewer states, so they are faster to generate and
+        load, but not every LR1 grammar is LALR1. By default False.
+    use_cache : bool, optional
+        If True and ``table_file`` is not given, the table is stored in
+        the NumLab cache directory, by default False.
+    jobs : Optional[int], optional
+        Number of processes used to generate the table, by default 1. If
+        None, the number of CPUs is used.
     """
 
-    def __init__(self, grammar: Grammar, table_file: str = None):
+    def __init__(
+        self,
+        grammar: Grammar,
+        table_file: str = None,
+        lalr: bool = False,
+        use_cache: bool = False,
+        jobs: Optional[int] = 1,
+    ):
         super().__init__(grammar)
-        self.lr1_table = LR1Table(grammar, table_file)
+        self.lr1_table = LR1Table(grammar, table_file, lalr, use_cache, jobs)
 
     def save_table(self, table_file: str):
         """Saves the LR1 table."""
         self.lr1_table.save_table(table_file)
 
+    def _reductions(self) -> Tuple[List[int], List[int], List[Optional[Callable]]]:
+        """Gets the data needed to reduce each production.
+
+        Returns
+        -------
+        Tuple[List[int], List[int], List[Optional[Callable]]]
+            Number of symbols, head (non terminal id) and builder of each
+            production. The builder of identity productions is None: they
+            are reduced without building an AST.
+        """
+        table = self.lr1_table
+        sizes, heads, builders = [], [], []
+        for prod in table.productions:
+            sizes.append(len(prod.symbols))
+            heads.append(table._nonterm_ids[prod.head.name])
+            if prod.is_identity:
+                builders.append(None)
+            else:
+                builders.append(prod._builder or _missing_builder(prod))
+        return sizes, heads, builders
+
+    def _statement_prods(self) -> Dict[int, List[int]]:
+        """Finds the productions that add statements to the program.
+
+        They are the left recursive productions of the start expression
+        (e.g. ``program -> program stmt``): when one of them is reduced, the
+        non terminals after the start expression are complete statements.
+
+        Returns
+        -------
+        Dict[int, List[int]]
+            Positions of the statements (from the end of the production) by
+            production id.
+        """
+        start = self.grammar.start.prod_0.symbols[0].name
+        prods = {}
+        for prod_id, prod in enumerate(self.lr1_table.productions):
+            if prod.head.name == start and prod.symbols and prod.symbols[0] == start:
+                size = len(prod.symbols)
+                prods[prod_id] = [
+                    i - size
+                    for i, sym in enumerate(prod.symbols)
+                    if i > 0 and not sym.is_terminal
+                ]
+        return prods
+
     def parse(self, tokens: List[Token]) -> AST:
-        logging.debug(f"Parsing {len(tokens)} tokens (LR1)")
+        # No statements are given, the driver stops with the AST
+        driver = self._drive(iter(tokens), None)
+        try:
+            next(driver)
+        except StopIteration as stop:
+            return stop.value
+        raise AssertionError("Unexpected statement")
+
+    def parse_stream(self, tokens: Iterable[Token]) -> Iterator[AST]:
+        """Parses the tokens giving each top-level statement as soon as it is
+        reduced.
+
+        The statements are the ones added to the program by the left
+        recursive productions of the start expression (see
+        ``_statement_prods``), whose builders are not called, so the whole
+        program is never built. The tokens are consumed as they are needed.
+        If the grammar has no such productions, the resulting AST is given
+        at the end.
+
+        Parameters
+        ----------
+        tokens : Iterable[Token]
+            Tokens to be parsed (ending with the ``$`` token).
+
+        Yields
+        ------
+        AST
+            Top-level statements.
+        """
+        statement_prods = self._statement_prods()
+        result = yield from self._drive(iter(tokens), statement_prods)
+        if not statement_prods:
+            yield result
+
+    def recognize(self, tokens: Iterable[Token]):
+        """Checks the syntax of the tokens without building an AST.
+
+        The table is run as in ``parse`` but only the stack of states is
+        kept: no builder is called and no value is stored, so it is as cheap
+        as the table walk. Errors raised by the builders (e.g. semantic
+        checks of the grammar actions) are not detected.
+
+        Parameters
+        ----------
+        tokens : Iterable[Token]
+            Tokens to be checked (ending with the ``$`` token).
+
+        Raises
+        ------
+        ParsingError
+            If an unexpected token is found.
+        ValueError
+            If the tokens end before they are accepted.
+        """
         table = self.lr1_table
-        stack: List[Tuple[Symbol, int]] = []
-        i = 0
-        while i < len(tokens):
-            token = tokens[i]
-            logging.info(f"----------------------------------------------------")
-            logging.info(f"Parsing token {token}. Stack: {stack}")
-            current_state = stack[-1][1] if stack else 0
-            table_val = table[current_state, token.token_type]
-            logging.info(
-                f"Table value: {table_val} at ({current_state}, {token.token_type})"
-            )
-            if table_val == "OK":
-                break
-            if isinstance(table_val, int):
-                logging.info(f"Making SHIFT action")
-                term = Terminal(token.token_type, value=token.lexem)
-                stack.append((term, table_val))
-                i += 1
-            elif isinstance(table_val, Production):
-                logging.info(f"Making REDUCE action")
-                reduce_prod = table_val
-                # Pop from stack the necessary items
-                items_needed = len(reduce_prod.symbols)
-                items = []
-                if items_needed != 0:
-                    stack, items = stack[:-items_needed], stack[-items_needed:]
-                items = [item[0].ast for item in items]
-
-                # Apply reduction
-                new_head = reduce_prod.head.copy()
-                new_head.set_ast(reduce_prod.build_ast(items))
-                logging.info(f"Reduced to {new_head}")
-
-                # Check next state
-                left_state = stack[-1][1] if stack else 0
-                next_state = table[left_state, reduce_prod.head.name]
-                logging.info(
-                    f"Next state GOTO({left_state},{reduce_prod.head.name})"
-                    f" is {next_state}"
+        term_ids = table._term_ids
+        action_default = table._action_default
+        action_rows = table._action_rows
+        action_base = table._action_base
+        action_check = table._action_check
+        action_value = table._action_value
+        goto_default = table._goto_default
+        goto_rows = table._goto_rows
+        goto_base = table._goto_base
+        goto_check = table._goto_check
+        goto_value = table._goto_value
+        sizes = [len(prod.symbols) for prod in table.productions]
+        heads = [table._nonterm_ids[prod.head.name] for prod in table.productions]
+
+        states = [0]
+        for token in tokens:
+            term = term_ids.get(token.token_type)
+            if term is None:
+                raise ParsingError("Unexpected token", token)
+            while True:
+                state = states[-1]
+                row = action_rows[state]
+                pos = action_base[row] + term
+                if action_check[pos] == row:
+                    code = action_value[pos]
+                else:
+                    code = action_default[state]
+                if code > 0:
+                    states.append(code - 1)
+                    break
+                if code == -1:
+                    return
+                if code == 0:
+                    raise ParsingError("Unexpected token", token)
+                prod = -code - 1
+                if sizes[prod]:
+                    del states[-sizes[prod] :]
+                nonterm = heads[prod]
+                row = goto_rows[nonterm]
+                pos = goto_base[row] + states[-1]
+                if goto_check[pos] == row:
+                    states.append(goto_value[pos] - 1)
+                else:
+                    states.append(goto_default[nonterm] - 1)
+        raise ValueError("Unexpected end of the tokens")
+
+    def _drive(
+        self,
+        tokens: Iterator[Token],
+        statement_prods: Optional[Dict[int, List[int]]],
+        on_top_level: Optional[Callable[[int, list, Token], bool]] = None,
+        program: Optional[list] = None,
+    ) -> Iterator[AST]:
+        """Runs the LR driver.
+
+        Parameters
+        ----------
+        tokens : Iterator[Token]
+            Tokens to be parsed.
+        statement_prods : Optional[Dict[int, List[int]]]
+            Productions whose statements are given instead of being reduced
+            (see ``_statement_prods``), or None.
+        on_top_level : Optional[Callable[[int, list, Token], bool]], optional
+            Function called after each reduction of the start expression at
+            the bottom of the stack (a top-level reduction) with the
+            production id, the values of its symbols and the lookahead
+            token. If it returns True the parsing stops and the current
+            program is returned.
+        program : Optional[list], optional
+            If given, the parsing starts after a top-level reduction, with
+            the program (the only item of the list) in the stack.
+
+        Yields
+        ------
+        AST
+            Statements (only if ``statement_prods`` is given).
+
+        Returns
+        -------
+        AST
+            Resulting AST.
+        """
+        table = self.lr1_table
+        log = logging.getLogger().isEnabledFor(logging.INFO)
+        if log:
+            logging.info("Parsing tokens (LR1)")
+        sizes, heads, builders = self._reductions()
+        # Identity productions are not reduced: after a GOTO the parser goes
+        # directly to the GOTO state of their head
+        identity = [builder is None for builder in builders]
+        if statement_prods:
+            # Statements are given and the program is kept as it is
+            for prod in statement_prods:
+                builders[prod] = None
+        term_ids = table._term_ids
+        action_default = table._action_default
+        action_rows = table._action_rows
+        action_base = table._action_base
+        action_check = table._action_check
+        action_value = table._action_value
+        goto_default = table._goto_default
+        goto_rows = table._goto_rows
+        goto_base = table._goto_base
+        goto_check = table._goto_check
+        goto_value = table._goto_value
+
+        # Parallel stacks of states and values (tokens are the values of
+        # terminals)
+        states = [0]
+        values: list = []
+        start = table._nonterm_ids[self.grammar.start.prod_0.symbols[0].name]
+        if program is not None:
+            states.append(table._goto_code(0, start) - 1)
+            values = program
+        next_token = tokens.__next__
+        token = next(tokens, None)
+        if token is None:
+            raise ValueError("Dirty stack at the end of the parsing. Stack: []")
+        term = term_ids.get(token.token_type)
+        if term is None:
+            raise ParsingError("Unexpected token", token)
+        state = states[-1]
+        row = action_rows[state]
+        pos = action_base[row] + term
+        if action_check[pos] == row:
+            code = action_value[pos]
+        else:
+            code = action_default[state]
+        while True:
+            if log:
+                logging.info(f"Token {token} at state {states[-1]}: action {code}")
+
+            if code > 0:
+                state = code - 1
+                states.append(state)
+                values.append(token)
+                try:
+                    token = next_token()
+                except StopIteration:
+                    break
+                term = term_ids.get(token.token_type)
+                if term is None:
+                    raise ParsingError("Unexpected token", token)
+            elif code < -1:
+                prod = -code - 1
+                size = sizes[prod]
+                builder = builders[prod]
+                top_level = (
+                    on_top_level is not None
+                    and len(states) == size + 1
+                    and heads[prod] == start
                 )
-                # Push to stack the new item
-                stack.append((new_head, next_state))
-            elif table_val is None:
-                raise ParsingError(f"Unexpected token", token)
-
-        if len(stack) != 1:
-            raise ValueError(f"Dirty stack at the end of the parsing. Stack: {stack}")
-        return stack[-1][0].ast
+                if top_level:
+                    args = values[len(values) - size :]
+                if builder is not None:
+                    if size:
+                        values[-size:] = [builder(*values[-size:])]
+                    else:
+                        values.append(builder())
+                elif statement_prods and prod in statement_prods:
+                    for i in statement_prods[prod]:
+                        yield values[i]
+                    # The program (the first value) is kept
+                    if size > 1:
+                        del values[1 - size :]
+                if size:
+                    del states[-size:]
+                nonterm = heads[prod]
+                prev_state = states[-1]
+                while True:
+                    row = goto_rows[nonterm]
+                    pos = goto_base[row] + prev_state
+                    if goto_check[pos] == row:
+                        state = goto_value[pos] - 1
+                    else:
+                        state = goto_default[nonterm] - 1
+                    row = action_rows[state]
+                    pos = action_base[row] + term
+                    if action_check[pos] == row:
+                        code = action_value[pos]
+                    else:
+                        code = action_default[state]
+                    if code >= -1 or not identity[-code - 1]:
+                        break
+                    # Identity production (the value is kept)
+                    nonterm = heads[-code - 1]
+                states.append(state)
+                if log:
+                    logging.info(
+                        f"Reduced {table.productions[prod].head_str}, "
+                        f"GOTO({prev_state}, {nonterm}) is {state}"
+                    )
+                if top_level and on_top_level(prod, args, token):
+                    return values[0]
+                continue
+            elif code == -1:
+                break
+            else:
+                raise ParsingError("Unexpected token", token)
+
+            row = action_rows[state]
+            pos = action_base[row] + term
+            if action_check[pos] == row:
+                code = action_value[pos]
+            else:
+                code = action_default[state]
+
+        if len(values) != 1:
+            raise ValueError(f"Dirty stack at the end of the parsing. Stack: {values}")
+        return values[0]
+
+
+def _missing_builder(prod: Production) -> Callable:
+    def builder(*_):
+        raise ValueError(f"Builder function not set on production {prod}.")
+
+    return builder
+
+
+def _prefer_reduce(
+    prod_prec: Optional[Tuple[int, str]], term_prec: Optional[Tuple[int, str]]
+) -> Optional[bool]:
+    """Resolves a shift/reduce conflict using precedences.
+
+    Parameters
+    ----------
+    prod_prec : Optional[Tuple[int, str]]
+        Precedence level and associativity of the production.
+    term_prec : Optional[Tuple[int, str]]
+        Precedence level and associativity of the terminal.
+
+    Returns
+    -------
+    Optional[bool]
+        True if the reduction is chosen, False if the shift is chosen or None
+        if the conflict can not be resolved.
+    """
+    if prod_prec is None or term_prec is None:
+        return None
+    if prod_prec[0] != term_prec[0]:
+        return prod_prec[0] > term_prec[0]
+    return prod_prec[1] == "left"
+
+
+# Table being built (in the worker processes of a parallel build)
+_WORKER_TABLE: LR1Table = None
+
+
+def _init_build_worker(table: LR1Table):
+    global _WORKER_TABLE  # pylint: disable=global-statement
+    _WORKER_TABLE = table
+
+
+def _expand_kernels(kernels: List[Dict[int, int]]) -> list:
+    return [_WORKER_TABLE._expand(kernel) for kernel in kernels]
@@ -1,5 +1,5 @@
 import abc
-from typing import List
+from typing import Iterable, Iterator, List
 
 from numlab.compiler.generic_ast import AST
 from numlab.compiler.grammar import Grammar
@@ -13,3 +13,14 @@ class Parser(metaclass=abc.ABCMeta):
     @abc.abstractmethod
     def parse(self, tokens: List[Token]) -> AST:
         pass
+
+    def parse_stream(self, tokens: Iterable[Token]) -> Iterator[AST]:
+        """Parses the tokens giving the top-level statements as soon as they
+        are parsed. By default the whole AST is given at the end."""
+        yield self.parse(list(tokens))
+
+    def recognize(self, tokens: Iterable[Token]):
+        """Checks the syntax of the tokens without building an AST, raising
+        a ``ParsingError`` if they are not accepted. By default the AST is
+        built and discarded."""
+        self.parse(list(tokens))
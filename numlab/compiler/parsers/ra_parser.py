@@ -0,0 +1,520 @@
+"""
+This module contains a recursive ascent LR parser.
+
+The parser is a Python module generated from an LR1 table. Each state of
+the table becomes a function whose ACTION and GOTO decisions are inlined as
+comparisons on integer symbol ids. Shifting a token (or going to a state
+after a reduction) is a call to the function of the next state, and a
+reduction of a production with ``k`` symbols returns through ``k`` calls.
+"""
+
+import hashlib
+import importlib.util
+import logging
+import os
+import types
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+from numlab.compiler.cache import atomic_write, cache_dir
+from numlab.compiler.generic_ast import AST
+from numlab.compiler.grammar import Grammar
+from numlab.compiler.parsers.lr1_parser import LR1Parser, LR1Table
+from numlab.compiler.tokenizer import Token
+
+# Version of the module generator. It must be increased every time a change
+# in the generator changes the modules it produces, so cached modules are
+# regenerated.
+_RA_GENERATOR_VERSION = 3
+
+# Maximum number of exceptional symbols of a state dispatched with a chain
+# of equality checks (instead of a binary search on the symbol id)
+_MAX_CHAIN = 4
+
+# Leaves of the dispatch code
+_SHIFT = "shift"
+_REDUCE = "reduce"
+_GOTO = "goto"
+_GOTO_BY_TERM = "goto_by_term"
+_ACCEPT = "accept"
+_ERROR = "error"
+
+
+def module_key(table: LR1Table) -> str:
+    """Returns the key that identifies the parser module of a table.
+
+    The key depends on the table and on which productions are identity
+    productions (they are skipped by the generated code).
+
+    Parameters
+    ----------
+    table : LR1Table
+        LR1 table.
+
+    Returns
+    -------
+    str
+        Key (an hexadecimal digest).
+    """
+    identities = [
+        str(prod_id)
+        for prod_id, prod in enumerate(table.productions)
+        if prod.is_identity
+    ]
+    desc = f"{_RA_GENERATOR_VERSION} {table.key.hex()} {','.join(identities)}"
+    return hashlib.sha256(desc.encode("utf-8")).hexdigest()[:32]
+
+
+def _goto_entries(table: LR1Table) -> List[Dict[int, int]]:
+    """Finds the GOTO entries of each state that are used by the parser.
+
+    A state ``s`` needs the GOTO entry of a non terminal ``A`` if some
+    production ``A -> X1 ... Xk`` is reduced in the state reached from
+    ``s`` by ``X1 ... Xk``. Default GOTO entries make some unused entries
+    look valid, which only adds unreachable branches.
+
+    Returns
+    -------
+    List[Dict[int, int]]
+        Next state (encoded) of each non terminal id, by state.
+    """
+    # pylint: disable=protected-access
+    term_ids = table._term_ids
+    nonterm_ids = table._nonterm_ids
+    state_count = table._state_count
+    reduced = []
+    for state in range(state_count):
+        codes = {table._action_code(state, term_id) for term_id in term_ids.values()}
+        reduced.append({-code - 1 for code in codes if code < -1})
+
+    prods = []
+    for prod_id, prod in enumerate(table.productions[1:], 1):
+        path = [
+            (True, term_ids[sym.name])
+            if sym.is_terminal
+            else (False, nonterm_ids[sym.name])
+            for sym in prod.symbols
+        ]
+        prods.append((prod_id, nonterm_ids[prod.head.name], path))
+
+    entries: List[Dict[int, int]] = [{} for _ in range(state_count)]
+    for state in range(state_count):
+        for prod_id, head, path in prods:
+            current = state
+            for is_term, sym_id in path:
+                if is_term:
+                    code = table._action_code(current, sym_id)
+                else:
+                    code = table._goto_code(current, sym_id)
+                if code <= 0:
+                    break
+                current = code - 1
+            else:
+                if prod_id in reduced[current]:
+                    entries[state][head] = table._goto_code(state, head)
+    return entries
+
+
+def _goto_leaf(table: LR1Table, state: int, nonterm: int, identity: List[bool]) -> tuple:
+    """Gets the leaf of the GOTO of a state on a non terminal.
+
+    Identity productions are not reduced: if the action of the next state
+    for the lookahead is the reduction of an identity production, the
+    parser goes directly to the GOTO state of its head (as ``LR1Parser``).
+    As the next state depends on the lookahead, the leaf may dispatch on
+    the terminal id.
+
+    Parameters
+    ----------
+    table : LR1Table
+        LR1 table.
+    state : int
+        State.
+    nonterm : int
+        Non terminal id.
+    identity : List[bool]
+        Whether each production is an identity production.
+
+    Returns
+    -------
+    tuple
+        Leaf of the GOTO.
+    """
+    # pylint: disable=protected-access
+    row = []
+    for term_id in range(len(table._term_ids)):
+        head = nonterm
+        while True:
+            next_state = table._goto_code(state, head) - 1
+            code = table._action_code(next_state, term_id)
+            if code >= -1 or not identity[-code - 1]:
+                break
+            head = table._nonterm_ids[table.productions[-code - 1].head.name]
+        row.append((term_id, (_GOTO, next_state)))
+    if len({leaf for _, leaf in row}) == 1:
+        return row[0][1]
+    return (_GOTO_BY_TERM, tuple(row))
+
+
+def _dispatch(
+    lines: List[str],
+    indent: str,
+    var: str,
+    entries: List[Tuple[int, tuple]],
+    emit_leaf: Callable[[List[str], str, tuple], None],
+):
+    """Emits the code that selects a leaf given the value of a variable.
+
+    Parameters
+    ----------
+    lines : List[str]
+        Code lines (the new ones are appended).
+    indent : str
+        Indentation of the code.
+    var : str
+        Name of the variable.
+    entries : List[Tuple[int, tuple]]
+        Values of the variable (sorted) and their leaves. Values that are
+        not given select the leaf of the previous value.
+    emit_leaf : Callable[[List[str], str, tuple], None]
+        Function that emits the code of a leaf.
+    """
+    counts: Dict[tuple, int] = {}
+    for _, leaf in entries:
+        counts[leaf] = counts.get(leaf, 0) + 1
+    common = max(counts, key=counts.get)
+    if len(entries) - counts[common] <= _MAX_CHAIN:
+        others: Dict[tuple, List[int]] = {}
+        for value, leaf in entries:
+            if leaf != common:
+                others.setdefault(leaf, []).append(value)
+        keyword = "if"
+        for leaf, values in others.items():
+            cond = " or ".join(f"{var} == {value}" for value in values)
+            lines.append(f"{indent}{keyword} {cond}:")
+            emit_leaf(lines, indent + "    ", leaf)
+            keyword = "elif"
+        if others:
+            lines.append(f"{indent}else:")
+            emit_leaf(lines, indent + "    ", common)
+        else:
+            emit_leaf(lines, indent, common)
+        return
+
+    # Binary search on the intervals of values with the same leaf
+    intervals = []
+    for value, leaf in entries:
+        if not intervals or intervals[-1][1] != leaf:
+            intervals.append((value, leaf))
+    _dispatch_intervals(lines, indent, var, intervals, emit_leaf)
+
+
+def _dispatch_intervals(lines, indent, var, intervals, emit_leaf):
+    if len(intervals) == 1:
+        emit_leaf(lines, indent, intervals[0][1])
+        return
+    mid = len(intervals) // 2
+    lines.append(f"{indent}if {var} < {intervals[mid][0]}:")
+    _dispatch_intervals(lines, indent + "    ", var, intervals[:mid], emit_leaf)
+    lines.append(f"{indent}else:")
+    _dispatch_intervals(lines, indent + "    ", var, intervals[mid:], emit_leaf)
+
+
+def generate_module(table: LR1Table) -> str:
+    """Generates the source of a recursive ascent parser module.
+
+    The module defines ``make_parser(builders)``, which receives the builder
+    of each production (by production id) and returns a ``parse(tokens)``
+    function. ``parse`` is not reentrant.
+
+    Parameters
+    ----------
+    table : LR1Table
+        LR1 table of the parser.
+
+    Returns
+    -------
+    str
+        Module source.
+    """
+    # pylint: disable=protected-access
+    term_ids = table._term_ids
+    nonterm_count = len(table._nonterm_ids)
+    start = table._nonterm_ids[table.grammar.start.name]
+    prods = table.productions
+    identity = [prod.is_identity for prod in prods]
+    gotos = _goto_entries(table)
+
+    def emit_leaf(lines: List[str], indent: str, leaf: tuple):
+        kind = leaf[0]
+        if kind == _GOTO_BY_TERM:
+            lines.append(f"{indent}t = ids[pos]")
+            _dispatch(lines, indent, "t", list(leaf[1]), emit_leaf)
+        elif kind == _SHIFT:
+            lines.append(f"{indent}values.append(tokens[pos])")
+            lines.append(f"{indent}pos += 1")
+            lines.append(f"{indent}code = s{leaf[1]}()")
+        elif kind == _GOTO:
+            lines.append(f"{indent}code = s{leaf[1]}()")
+        elif kind == _REDUCE:
+            prod_id = leaf[1]
+            prod = prods[prod_id]
+            size = len(prod.symbols)
+            head = table._nonterm_ids[prod.head.name]
+            args = ", ".join(f"values[{i - size}]" for i in range(size))
+            if size == 0:
+                lines.append(f"{indent}values.append(b{prod_id}())")
+                lines.append(f"{indent}code = {head}")
+            elif prod.is_identity:
+                lines.append(f"{indent}return {head}")
+            else:
+                if size == 1:
+                    lines.append(f"{indent}values[-1] = b{prod_id}(values[-1])")
+                else:
+                    lines.append(f"{indent}values[-{size}:] = [b{prod_id}({args})]")
+                lines.append(f"{indent}return {(size - 1) * nonterm_count + head}")
+        elif kind == _ACCEPT:
+            lines.append(f"{indent}return {start}")
+        else:
+            lines.append(f"{indent}raise error()")
+
+    lines = [
+        '"""',
+        "Recursive ascent parser generated by NumLab (do not edit).",
+        '"""',
+        "",
+        "from numlab.exceptions import ParsingError",
+        "",
+        f"MODULE_KEY = {module_key(table)!r}",
+        f"TERMINAL_IDS = {dict(term_ids)!r}",
+        "",
+        "",
+        "def make_parser(builders):",
+    ]
+    codes = {
+        table._action_code(state, term_id)
+        for state in range(table._state_count)
+        for term_id in term_ids.values()
+    }
+    for prod_id in sorted(-code - 1 for code in codes if code < -1):
+        if not prods[prod_id].is_identity:
+            lines.append(f"    b{prod_id} = builders[{prod_id}]")
+    lines += [
+        "    tokens = ids = values = None",
+        "    pos = 0",
+        "",
+        "    def error():",
+        '        return ParsingError("Unexpected token", tokens[pos])',
+    ]
+
+    for state in range(table._state_count):
+        row = []
+        for term_id in range(len(term_ids)):
+            code = table._action_code(state, term_id)
+            if code > 0:
+                row.append((term_id, (_SHIFT, code - 1)))
+            elif code == -1:
+                row.append((term_id, (_ACCEPT,)))
+            elif code < 0:
+                row.append((term_id, (_REDUCE, -code - 1)))
+            else:
+                row.append((term_id, (_ERROR,)))
+        shifts = any(leaf[0] == _SHIFT for _, leaf in row)
+        lines += ["", f"    def s{state}():"]
+        if shifts:
+            lines.append("        nonlocal pos")
+        if len({leaf for _, leaf in row}) > 1:
+            lines.append("        t = ids[pos]")
+            _dispatch(lines, "        ", "t", row, emit_leaf)
+        else:
+            emit_leaf(lines, "        ", row[0][1])
+
+        goto_row = [
+            (nonterm_id, _goto_leaf(table, state, nonterm_id, identity))
+            for nonterm_id, code in sorted(gotos[state].items())
+            if code > 0
+        ]
+        if state == 0:
+            goto_row = sorted(goto_row + [(start, (_ACCEPT,))])
+        returns = all(
+            leaf[0] in (_ACCEPT, _ERROR)
+            or (leaf[0] == _REDUCE and prods[leaf[1]].symbols)
+            for _, leaf in row
+        )
+        if returns:
+            continue
+        if not goto_row:
+            lines.append(f"        return code - {nonterm_count}")
+            continue
+
+        # Back from a reduction: unwind or go to the next state
+        lines.append("        while True:")
+        lines.append(f"            if code >= {nonterm_count}:")
+        lines.append(f"                return code - {nonterm_count}")
+
+        def emit_goto(lines, indent, leaf):
+            if leaf[0] == _ACCEPT:
+                lines.append(f"{indent}return")
+            else:
+                emit_leaf(lines, indent, leaf)
+
+        _dispatch(lines, "            ", "code", goto_row, emit_goto)
+
+    lines += [
+        "",
+        "    def parse(token_list):",
+        "        nonlocal tokens, ids, values, pos",
+        "        get_id = TERMINAL_IDS.get",
+        "        token_ids = [get_id(tok.token_type) for tok in token_list]",
+        "        if None in token_ids:",
+        "            tok = token_list[token_ids.index(None)]",
+        '            raise ParsingError("Unexpected token", tok)',
+        "        tokens, ids, values, pos = token_list, token_ids, [], 0",
+        "        try:",
+        "            s0()",
+        "            return values[0]",
+        "        finally:",
+        "            tokens = ids = values = None",
+        "",
+        "    return parse",
+        "",
+    ]
+    return "\n".join(lines)
+
+
+class RAParser(LR1Parser):
+    """Recursive ascent LR1 parser.
+
+    It parses with a Python module generated from the LR1 table (see
+    ``generate_module``), so no table lookups are made while parsing. The
+    module is saved next to the table in the NumLab cache directory and
+    Python caches its bytecode.
+
+    Each state in the parser stack is a Python call, inputs nested deeper
+    than the recursion limit are parsed with the table (as ``LR1Parser``).
+    Recursion errors raised by the builders are not caught.
+
+    Parameters
+    ----------
+    grammar : Grammar
+        Grammar to be used.
+    table_file : str
+        Path to the file containing the LR1 table (see ``LR1Parser``).
+    lalr : bool, optional
+        If True, an LALR1 table is generated instead of a canonical LR1
+        one, by default False.
+    use_cache : bool, optional
+        If True, the table and the parser module are stored in the NumLab
+        cache directory, by default False.
+    jobs : Optional[int], optional
+        Number of processes used to generate the table, by default 1.
+    module_file : str, optional
+        Path of the parser module. If the file does not exist or it contains
+        a module generated for another table, it is generated and saved to
+        this file. If not given (and ``use_cache`` is False) the module is
+        only generated in memory.
+    """
+
+    def __init__(
+        self,
+        grammar: Grammar,
+        table_file: str = None,
+        lalr: bool = False,
+        use_cache: bool = False,
+        jobs: Optional[int] = 1,
+        module_file: str = None,
+    ):
+        super().__init__(grammar, table_file, lalr, use_cache, jobs)
+        self.key = module_key(self.lr1_table)
+        if module_file is None and use_cache:
+            module_file = cache_dir() / f"ra_{self.key}.py"
+        module = self._load_module(module_file)
+        _, _, builders = self._reductions()
+        self._parse = module.make_parser(builders)
+        self._module_file = self._parse.__code__.co_filename
+
+    def _load_module(self, module_file: Optional[str]) -> types.ModuleType:
+        """Loads the parser module, generating it if needed.
+
+        Parameters
+        ----------
+        module_file : Optional[str]
+            Path of the module file.
+
+        Returns
+        -------
+        types.ModuleType
+            Parser module.
+        """
+        if module_file is not None:
+            module = self._import_module(Path(module_file))
+            if module is not None:
+                return module
+
+        source = generate_module(self.lr1_table)
+        if module_file is not None:
+            module_file = Path(module_file)
+            try:
+                module_file.parent.mkdir(parents=True, exist_ok=True)
+                with atomic_write(module_file) as module_f:
+                    module_f.write(source.encode("utf-8"))
+                # The bytecode of the replaced module is outdated
+                pyc_file = importlib.util.cache_from_source(str(module_file))
+                if os.path.exists(pyc_file):
+                    os.unlink(pyc_file)
+                module = self._import_module(module_file)
+                if module is not None:
+                    return module
+            except OSError as err:
+                logging.warning(f"Can not save parser module {module_file}: {err}")
+
+        module = types.ModuleType(f"numlab_ra_{self.key}")
+        exec(compile(source, f"<parser {self.key}>", "exec"), module.__dict__)
+        return module
+
+    def _import_module(self, module_file: Path) -> Optional[types.ModuleType]:
+        """Imports a parser module file.
+
+        Returns
+        -------
+        Optional[types.ModuleType]
+            Parser module, or None if the file does not exist or it contains
+            a module generated for another table.
+        """
+        if not module_file.exists():
+            return None
+        logging.info(f"Loading parser module from {module_file}")
+        name = f"numlab_ra_{self.key}"
+        spec = importlib.util.spec_from_file_location(name, str(module_file))
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        if getattr(module, "MODULE_KEY", None) != self.key:
+            logging.info(f"Parser module in {module_file} is outdated")
+            return None
+        return module
+
+    def parse(self, tokens: List[Token]) -> AST:
+        try:
+            return self._parse(tokens)
+        except RecursionError as err:
+            if not self._too_deep(err):
+                raise
+            logging.info("Input too deep for the recursive ascent parser")
+            return super().parse(tokens)
+
+    def _too_deep(self, err: RecursionError) -> bool:
+        """Checks if a recursion error was caused by the nesting of the input.
+
+        It is the case when most of the frames in its traceback are calls to
+        the functions of the parser module (and not, e.g., to a recursive
+        builder).
+        """
+        module_frames = other_frames = 0
+        trace = err.__traceback__
+        while trace is not None:
+            if trace.tb_frame.f_code.co_filename == self._module_file:
+                module_frames += 1
+            else:
+                other_frames += 1
+            trace = trace.tb_next
+        return module_frames > other_frames
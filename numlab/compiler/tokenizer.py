@@ -17,15 +17,151 @@ Example of use:
     > [Tok('aaaba'), Tok(23), Tok('bba'), Tok(34)]
 """
 
-from typing import Any, Callable, Dict, List, Union, Tuple
+import hashlib
+import mmap
+import multiprocessing
+import os
+from array import array
+from bisect import bisect_left, bisect_right
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, Iterator, List, Optional, Union, Tuple
 
 from numlab.exceptions import TokenizationError
 from numlab.nlre import RegexPattern, compile_patt
 
 
+class ByteText:
+    """Read-only text view of an UTF-8 encoded buffer (e.g. a memory-mapped
+    file).
+
+    Indexing gives single characters and slicing gives decoded strings, so
+    the text can be scanned without decoding the whole buffer. Positions are
+    byte offsets.
+
+    Parameters
+    ----------
+    buffer : Any
+        Buffer with the encoded text. It must support indexing, slicing and
+        ``find`` as ``bytes`` does.
+    """
+
+    __slots__ = ("buffer",)
+
+    def __init__(self, buffer: Any):
+        self.buffer = buffer
+
+    def find(self, sub: str, start: int = 0) -> int:
+        return self.buffer.find(sub.encode("utf-8"), start)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return self.buffer[index].decode("utf-8", errors="replace")
+        return chr(self.buffer[index])
+
+    def __len__(self):
+        return len(self.buffer)
+
+
+class LineIndex:
+    """Index of the line start offsets of a text.
+
+    It is built once per source and maps text offsets to line and column
+    positions using a binary search over the line starts.
+
+    Parameters
+    ----------
+    text : Union[str, ByteText]
+        Indexed text.
+    tab_size : int, optional
+        Number of columns a tab character expands to, by default 1.
+
+    Attributes
+    ----------
+    text : Union[str, ByteText]
+        Indexed text.
+    tab_size : int
+        Number of columns a tab character expands to.
+    line_starts : array
+        Offset where each line of the text starts.
+    """
+
+    __slots__ = ("text", "tab_size", "line_starts")
+
+    def __init__(self, text: Union[str, ByteText], tab_size: int = 1):
+        self.text = text
+        self.tab_size = tab_size
+        line_starts = array("q", [0])
+        find = text.find
+        pos = find("\n")
+        while pos != -1:
+            line_starts.append(pos + 1)
+            pos = find("\n", pos + 1)
+        self.line_starts = line_starts
+
+    def line(self, pos: int) -> int:
+        """Gets the line of a text offset.
+
+        Parameters
+        ----------
+        pos : int
+            Text offset.
+
+        Returns
+        -------
+        int
+            Line number (starting at 0).
+        """
+        return bisect_right(self.line_starts, pos) - 1
+
+    def col(self, pos: int) -> int:
+        """Gets the column of a text offset.
+
+        Tabs before the offset in the same line are expanded to
+        ``tab_size`` columns.
+
+        Parameters
+        ----------
+        pos : int
+            Text offset.
+
+        Returns
+        -------
+        int
+            Column number (starting at 0).
+        """
+        return self.position(pos)[1]
+
+    def position(self, pos: int) -> Tuple[int, int]:
+        """Gets the line and column of a text offset.
+
+        Parameters
+        ----------
+        pos : int
+            Text offset.
+
+        Returns
+        -------
+        Tuple[int, int]
+            Line and column numbers.
+        """
+        line = self.line(pos)
+        line_start = self.line_starts[line]
+        if isinstance(self.text, str) and self.tab_size == 1:
+            return line, pos - line_start
+        prefix = self.text[line_start:pos]
+        return line, len(prefix) + prefix.count("\t") * (self.tab_size - 1)
+
+    def __len__(self):
+        return len(self.line_starts)
+
+
 class Token:
     """Represents a single token.
 
+    Tokens created by a tokenizer only store the offset where they start in
+    the source text. Their line and column are computed on demand from the
+    ``LineIndex`` of the source.
+
     Parameters
     ----------
     token_type : str
@@ -33,9 +169,13 @@ class Token:
     lexem : str
         Token lexem.
     line : int
-        Line token position.
+        Line token position. Only used if no ``line_index`` is given.
     col : int
-        Column token position.
+        Column token position. Only used if no ``line_index`` is given.
+    pos : int
+        Offset of the token in the source text.
+    line_index : LineIndex
+        Line index of the source text.
 
     Attributes
     ----------
@@ -43,19 +183,52 @@ class Token:
         Token type name.
     lexem : str
         Token lexem.
-    line : int
-        Line token position.
-    col : int
-        Column token position.
+    pos : int
+        Offset of the token in the source text.
+    line_index : LineIndex
+        Line index of the source text.
     """
 
+    __slots__ = ("token_type", "lexem", "pos", "line_index", "_line", "_col")
+
     def __init__(
-        self, token_type: str, lexem: str, line: int = 0, col: int = 0
+        self,
+        token_type: str,
+        lexem: str,
+        line: int = 0,
+        col: int = 0,
+        pos: int = -1,
+        line_index: Optional[LineIndex] = None,
     ):
         self.token_type = token_type
         self.lexem = lexem
-        self.line = line
-        self.col = col
+        self.pos = pos
+        self.line_index = line_index
+        self._line = line
+        self._col = col
+
+    @property
+    def line(self) -> int:
+        """Line token position."""
+        if self.line_index is None:
+            return self._line
+        return self.line_index.line(self.pos)
+
+    @property
+    def col(self) -> int:
+        """Column token position."""
+        if self.line_index is None:
+            return self._col
+        return self.line_index.col(self.pos)
+
+    @property
+    def value(self) -> str:
+        """Token lexem.
+
+        Parsers give tokens to the builders as the values of terminals, so
+        builders can use ``value`` as with a ``Terminal``.
+        """
+        return self.lexem
 
     def info(self) -> str:
         """Gives a detailed and formated info about the token.
@@ -69,8 +242,15 @@ class Token:
         return f"{line_col:<16} {self.token_type:<25} {self.lexem}"
 
     def __getattr__(self, item):
+        # Special, private and unset attributes are not token types
+        if item.startswith("_") or item in Token.__slots__:
+            raise AttributeError(item)
         return self.token_type == item
 
+    def __reduce__(self):
+        # The line index (and so the source text) is not pickled
+        return (Token, (self.token_type, self.lexem, self.line, self.col, self.pos))
+
     def __eq__(self, other):
         if not isinstance(other, Token):
             return self.lexem == other
@@ -84,14 +264,44 @@ class Token:
 
 
 class Tokenizer:
-    """Tokenizer"""
+    """Tokenizer
 
-    def __init__(self):
+    Parameters
+    ----------
+    indentation : bool
+        If True, indentation is tracked while scanning (as in Python-like
+        languages). Redundant ``NEWLINE`` tokens are dropped, ``INDENT`` and
+        ``DEDENT`` tokens are emitted when the column of the first token of a
+        line changes and a final ``NEWLINE`` token is added at the end of the
+        token list. By default False.
+    """
+
+    def __init__(self, indentation: bool = False):
         self.token_patterns: Dict[str, RegexPattern] = {}
+        self.indentation = indentation
         self._token_found_functions = {}
-        self._process_tokens = lambda tk: tk
+        self._process_tokens = None
         self._keywords = {}
 
+    def content_hash(self) -> str:
+        """Returns a hash of the tokenizer definition.
+
+        Two tokenizers have the same hash if they have the same patterns (in
+        the same order), the same keywords and the same indentation setting.
+        The functions applied to the lexems are not taken into account.
+
+        Returns
+        -------
+        str
+            Hash (hexadecimal SHA-256 digest).
+        """
+        desc = [f"indentation: {self.indentation}"]
+        for token_type, patt in self.token_patterns.items():
+            desc.append(f"{token_type}: {patt.re_expr}")
+        for keyword, token_type in sorted(self._keywords.items()):
+            desc.append(f"keyword {keyword}: {token_type}")
+        return hashlib.sha256("\n".join(desc).encode("utf-8")).hexdigest()
+
     def add_pattern(
         self, token_type: str, pattern: str, func: Callable[[str], Any] = None
     ):
@@ -235,39 +445,386 @@ class Tokenizer:
 
         return token_deco
 
-    def tokenize(self, text: str) -> List[Token]:
+    def tokenize(self, text: Union[str, ByteText], tab_size: int = 1) -> List[Token]:
         """Tokenize a text using the added token patterns.
 
+        Parameters
+        ----------
+        text : Union[str, ByteText]
+            Text to be tokenized.
+        tab_size : int, optional
+            Number of columns a tab character expands to when computing
+            token columns, by default 1.
+        """
+        line_index = LineIndex(text, tab_size)
+        tokens = self._scan(text, line_index)
+        if self.indentation:
+            tokens = self._track_indentation(tokens, len(text), line_index)
+        return self._processed(list(tokens))
+
+    def iter_tokens(
+        self, text: Union[str, ByteText], tab_size: int = 1, start: int = 0
+    ) -> Iterator[Token]:
+        """Tokenize a text lazily.
+
+        Tokens are scanned as they are requested, so a consumer (e.g. a
+        parser) can start before the whole text is scanned. If a function
+        for processing the tokens was given (see ``process_tokens``) it
+        needs the whole token list, and the text is tokenized at once.
+
+        Parameters
+        ----------
+        text : Union[str, ByteText]
+            Text to be tokenized.
+        tab_size : int, optional
+            Number of columns a tab character expands to when computing
+            token columns, by default 1.
+        start : int, optional
+            Position where the scan starts, by default 0. The indentation is
+            tracked as if the text started at this position.
+
+        Yields
+        ------
+        Token
+            Tokens found.
+        """
+        line_index = LineIndex(text, tab_size)
+        tokens = self._scan(text, line_index, start)
+        if self.indentation:
+            tokens = self._track_indentation(tokens, len(text), line_index)
+        if self._process_tokens is not None:
+            yield from self._processed(list(tokens))
+            return
+        yield from tokens
+
+    def tokenize_file(self, file_path: str, tab_size: int = 1) -> List[Token]:
+        """Tokenize the contents of a file.
+
+        The file is memory-mapped and its bytes are scanned directly, so the
+        file contents are never loaded as a whole in memory. Token positions
+        are byte offsets.
+
+        Parameters
+        ----------
+        file_path : str
+            Path of an UTF-8 encoded file.
+        tab_size : int, optional
+            Number of columns a tab character expands to when computing
+            token columns, by default 1.
+
+        Returns
+        -------
+        List[Token]
+            Tokens found.
+        """
+        return self.tokenize(map_file(file_path), tab_size)
+
+    def iter_file_tokens(self, file_path: str, tab_size: int = 1) -> Iterator[Token]:
+        """Tokenize the contents of a file lazily (see ``iter_tokens``).
+
+        The file is memory-mapped as in ``tokenize_file``.
+
+        Parameters
+        ----------
+        file_path : str
+            Path of an UTF-8 encoded file.
+        tab_size : int, optional
+            Number of columns a tab character expands to when computing
+            token columns, by default 1.
+
+        Returns
+        -------
+        Iterator[Token]
+            Tokens found.
+        """
+        return self.iter_tokens(map_file(file_path), tab_size)
+
+    def tokenize_parallel(
+        self, text: str, jobs: int = None, tab_size: int = 1
+    ) -> List[Token]:
+        """Tokenize a text splitting it in chunks that are scanned in a
+        process pool.
+
+        The text is split at lines with no indentation. Each chunk is scanned
+        by a worker and the results are stitched together with the positions
+        relative to the whole text. If a chunk boundary does not match a
+        token boundary of the sequential scan (e.g. it falls inside a
+        multiline string) the text is rescanned from the last valid position,
+        so the result is always the same as the one given by ``tokenize``.
+
+        Workers are forked, if the platform does not support forking
+        processes the text is tokenized sequentially.
+
         Parameters
         ----------
         text : str
             Text to be tokenized.
+        jobs : int, optional
+            Number of worker processes. By default the number of CPUs.
+        tab_size : int, optional
+            Number of columns a tab character expands to when computing
+            token columns, by default 1.
+
+        Returns
+        -------
+        List[Token]
+            Tokens found.
+        """
+        if jobs is None:
+            jobs = os.cpu_count() or 1
+        chunks = _split_chunks(text, jobs)
+        if len(chunks) < 2:
+            return self.tokenize(text, tab_size)
+        try:
+            mp_context = multiprocessing.get_context("fork")
+        except ValueError:
+            return self.tokenize(text, tab_size)
+
+        with ProcessPoolExecutor(
+            max_workers=len(chunks),
+            mp_context=mp_context,
+            initializer=_init_scan_worker,
+            initargs=(self, text),
+        ) as pool:
+            results = list(pool.map(_scan_chunk, chunks))
+
+        line_index = LineIndex(text, tab_size)
+        matches = []
+        pos = 0
+        for (start, stop), result in zip(chunks, results):
+            if pos >= stop:
+                continue
+            if result is not None:
+                chunk_matches, starts, end = result
+                first = bisect_left(starts, pos)
+                if first < len(starts) and starts[first] == pos:
+                    matches.extend(chunk_matches[first:])
+                    pos = end
+                    continue
+            # The chunk is not aligned with the sequential scan
+            for match in self._matches(text, line_index, pos, stop):
+                matches.append(match)
+                pos = match[3]
+
+        tokens = (
+            Token(token_type, lexem, pos=pos, line_index=line_index)
+            for token_type, lexem, pos, _ in matches
+            if lexem is not None
+        )
+        if self.indentation:
+            tokens = self._track_indentation(tokens, len(text), line_index)
+        return self._processed(list(tokens))
+
+    def _processed(self, tokens: List[Token]) -> List[Token]:
+        if self._process_tokens is None:
+            return tokens
+        return self._process_tokens(tokens)
+
+    def _scan(
+        self, text: Union[str, ByteText], line_index: LineIndex, start: int = 0
+    ) -> Iterator[Token]:
+        """Scans a text yielding the tokens found.
+
+        Parameters
+        ----------
+        text : Union[str, ByteText]
+            Text to be scanned.
+        line_index : LineIndex
+            Line index of the text.
+        start : int, optional
+            Position where the scan starts, by default 0.
+
+        Yields
+        ------
+        Token
+            Found tokens.
+        """
+        for token_type, lexem, pos, _ in self._matches(text, line_index, start):
+            if lexem is not None:
+                yield Token(token_type, lexem, pos=pos, line_index=line_index)
+
+    def _matches(
+        self,
+        text: Union[str, ByteText],
+        line_index: Optional[LineIndex],
+        start: int = 0,
+        stop: int = None,
+    ) -> Iterator[Tuple[str, Any, int, int]]:
+        """Scans a text yielding every pattern match.
+
+        Matches whose lexem was discarded (processed to ``None``) are also
+        given.
+
+        Parameters
+        ----------
+        text : Union[str, ByteText]
+            Text to be scanned.
+        line_index : Optional[LineIndex]
+            Line index of the text, used to locate the position of an error.
+            If None, the error gives the text offset instead.
+        start : int, optional
+            Position where the scan starts, by default 0.
+        stop : int, optional
+            The scan finishes at the first match that ends at or after this
+            position. By default the length of the text.
+
+        Yields
+        ------
+        Tuple[str, Any, int, int]
+            Token type, processed lexem, start and end positions of the match.
         """
-        tokens = []
-        line, col = 0, 0
-        i = 0
-        while i < len(text):
+        stop = len(text) if stop is None else stop
+        i = start
+        while i < stop:
             for token_type, patt in self.token_patterns.items():
-                re_match = patt.match(text[i:])
+                re_match = patt.match(text, i)
                 if re_match is not None:
                     lexem = re_match.matched_text
                     tok_lexem = self._token_found_functions[token_type](lexem)
                     if tok_lexem in self._keywords:
                         token_type = self._keywords[tok_lexem]
-                    if tok_lexem is not None:
-                        tok = Token(token_type, tok_lexem, line, col)
-                        tokens.append(tok)
-                    i += len(lexem)
-                    line_breaks = lexem.count("\n")
-                    line += line_breaks
-                    col += len(lexem)
-                    if line_breaks:
-                        col = len(lexem.split("\n")[-1])
+                    end = re_match.end
+                    yield token_type, tok_lexem, i, end
+                    i = end
                     break
             else:
+                if line_index is None:
+                    position = f"Pos: {i}"
+                else:
+                    line, col = line_index.position(i)
+                    position = f"Line: {line}, Col: {col}"
                 raise TokenizationError(
-                    f"No match found. Line: {line}, Col: {col}.\n"
+                    f"No match found. {position}.\n"
                     f"Text: {text[i:i+10]}..."
                 )
 
-        return self._process_tokens(tokens)
+    @staticmethod
+    def _track_indentation(
+        tokens: Iterator[Token], end: int, line_index: LineIndex
+    ) -> Iterator[Token]:
+        """Emits the INDENT and DEDENT tokens while the tokens are scanned.
+
+        The indentation stack is updated when the first token after a
+        ``NEWLINE`` is found. Empty lines do not produce ``NEWLINE`` tokens.
+
+        Parameters
+        ----------
+        tokens : Iterator[Token]
+            Scanned tokens.
+        end : int
+            Length of the scanned text.
+        line_index : LineIndex
+            Line index of the text.
+
+        Yields
+        ------
+        Token
+            Tokens including the indentation ones.
+        """
+        indentations = [0]
+        at_line_start = False
+        last_newline = True
+        for tok in tokens:
+            if tok.token_type == "NEWLINE":
+                at_line_start = True
+                if not last_newline:
+                    last_newline = True
+                    yield tok
+                continue
+            if at_line_start:
+                at_line_start = False
+                new_indentation_size = line_index.col(tok.pos)
+                while new_indentation_size < indentations[-1]:
+                    indentations.pop()
+                    yield Token("DEDENT", "DEDENT", pos=tok.pos, line_index=line_index)
+                if new_indentation_size > indentations[-1]:
+                    indentations.append(new_indentation_size)
+                    yield Token("INDENT", "INDENT", pos=tok.pos, line_index=line_index)
+            last_newline = False
+            yield tok
+
+        for _ in range(len(indentations) - 1):
+            yield Token("DEDENT", "DEDENT", pos=end, line_index=line_index)
+        yield Token("NEWLINE", "\n", pos=end, line_index=line_index)
+
+
+def map_file(file_path: str) -> Union[str, ByteText]:
+    """Memory-maps an UTF-8 encoded file.
+
+    Parameters
+    ----------
+    file_path : str
+        Path of the file.
+
+    Returns
+    -------
+    Union[str, ByteText]
+        Text of the file (an empty string if the file is empty, as empty
+        files can not be mapped).
+    """
+    with open(file_path, "rb") as file:
+        if os.fstat(file.fileno()).st_size == 0:
+            return ""
+        # The map outlives the file object, it is closed once the tokens
+        # (that reference it through their line index) are released.
+        buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    return ByteText(buffer)
+
+
+# Tokenizer and text used by the workers of ``Tokenizer.tokenize_parallel``
+_WORKER_DATA: Tuple[Tokenizer, str] = None
+
+
+def _split_chunks(text: str, count: int) -> List[Tuple[int, int]]:
+    """Splits a text in (at most) ``count`` chunks of similar size.
+
+    Chunks start at lines with no indentation.
+
+    Parameters
+    ----------
+    text : str
+        Text to be split.
+    count : int
+        Number of chunks.
+
+    Returns
+    -------
+    List[Tuple[int, int]]
+        Start and stop positions of each chunk.
+    """
+    cuts = [0]
+    size = len(text) // max(count, 1)
+    for i in range(1, count):
+        pos = max(size * i, cuts[-1])
+        while True:
+            pos = text.find("\n", pos) + 1
+            if pos <= 0 or pos >= len(text):
+                break
+            if text[pos] not in " \t\n":
+                cuts.append(pos)
+                break
+        if pos <= 0 or pos >= len(text):
+            break
+    cuts.append(len(text))
+    return [(cuts[i], cuts[i + 1]) for i in range(len(cuts) - 1)]
+
+
+def _init_scan_worker(tokenizer: Tokenizer, text: str):
+    global _WORKER_DATA  # pylint: disable=global-statement
+    _WORKER_DATA = (tokenizer, text)
+
+
+def _scan_chunk(chunk: Tuple[int, int]):
+    tokenizer, text = _WORKER_DATA
+    start, stop = chunk
+    matches, starts = [], []
+    end = start
+    try:
+        # Errors are discarded, so the position is not located
+        for match in tokenizer._matches(text, None, start, stop):
+            starts.append(match[2])
+            matches.append(match)
+            end = match[3]
+    except TokenizationError:
+        return None
+    return matches, starts, end
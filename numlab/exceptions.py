@@ -33,6 +33,9 @@ class ParsingError(NumlabError):
             self.message, self.line, self.column, self.token
         )
 
+    def __reduce__(self):
+        return (self.__class__, (self.message, self.token))
+
 
 class RuntimeError(NumlabError):
     def __init__(self, message):
@@ -1,11 +1,13 @@
 import json
 import logging
 from pathlib import Path
+from typing import List
 
 import typer
 
 import numlab
 from numlab.compiler import Grammar, LR1Parser, ParserManager
+from numlab.exceptions import NumlabError
 from numlab.lang.context import Context
 from numlab.nl_builders import builders
 from numlab.nl_tokenizer import tknz
@@ -24,23 +26,25 @@ def echo(msg, verbose):
         typer.echo(msg)
 
 
-def get_ast(file_path: str, verbose: bool = False):
-    # Load grammar
+def get_parser_manager(verbose: bool = False) -> ParserManager:
+    # Load grammar (it is cached after the first time) and assign builders
     echo("Loading grammar", verbose)
-    grammar = Grammar.open(str(Path(__file__).parent / "nl_grammar.gm"))
-    echo("Assigning builders", verbose)
-    grammar.assign_builders(builders)
+    grammar = Grammar.load(str(Path(__file__).parent / "nl_grammar.gm"), builders)
 
-    # Create LR1Parser
+    # Create LR1Parser (the table is generated the first time and cached)
     echo("Loading parser table", verbose)
-    parser = LR1Parser(grammar, str(Path(__file__).parent / "nl_lr1_table"))
+    parser = LR1Parser(grammar, lalr=True, use_cache=True)
 
     # Create parser
-    parser_man = ParserManager(grammar, tknz, parser)
+    return ParserManager(grammar, tknz, parser)
+
+
+def get_ast(file_path: str, verbose: bool = False):
+    parser_man = get_parser_manager(verbose)
 
-    # Parse file
+    # Parse file (the AST is cached until the file changes)
     echo("Parsing script", verbose)
-    program = parser_man.parse_file(file_path)
+    program = parser_man.parse_file(file_path, use_cache=True)
     return program
 
 
@@ -180,14 +184,33 @@ def optimize(
         typer.echo("No changes were found for possible optimizations")
 
 
+def _dumped(stmts):
+    for stmt in stmts:
+        stmt.dump()
+        yield stmt
+
+
 @app.command("run")
 def run(
     input_path: str = typer.Argument(..., help="Input file"),
     dump: bool = typer.Option(False, "--dump", "-d", help="Dump AST"),
     verbose: bool = typer.Option(False, "--verbose", "-v", help="Verbose mode"),
+    stream: bool = typer.Option(
+        False, "--stream", "-s", help="Run each statement as soon as it is parsed"
+    ),
 ):
     """Run the program given in the input file"""
 
+    if stream:
+        parser_man = get_parser_manager(verbose)
+        echo("Program output:", verbose)
+        stmts = parser_man.parse_file_stream(input_path)
+        if dump:
+            stmts = _dumped(stmts)
+        evaluator = EvalVisitor(Context())
+        evaluator.eval_stmts(stmts)
+        return
+
     program = get_ast(input_path, verbose)
     if dump:
         program.dump()
@@ -198,6 +221,28 @@ def run(
     evaluator.eval(program)
 
 
+@app.command("check")
+def check(
+    input_files: List[str] = typer.Argument(..., help="Input files"),
+    verbose: bool = typer.Option(False, "--verbose", "-v", help="Verbose mode"),
+):
+    """Check the syntax of the given files without running them"""
+
+    parser_man = get_parser_manager(verbose)
+    failed = 0
+    for input_file in input_files:
+        try:
+            parser_man.check_file(input_file)
+        except (NumlabError, OSError) as err:
+            failed += 1
+            message = str(err).replace("\n", ": ")
+            typer.echo(f"{input_file}: {message}")
+        else:
+            echo(f"{input_file}: OK", verbose)
+    if failed:
+        raise typer.Exit(1)
+
+
 @app.command("version", help="Print the version number")
 def version():
     typer.echo(f"NumLab v{numlab.__version__}")
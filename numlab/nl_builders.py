@@ -1,4 +1,10 @@
 import numlab.nl_ast as ast
+from numlab.compiler import identity
+
+
+def append(items: list, item) -> list:
+    items.append(item)
+    return items
 
 
 def build_args(arg: ast.Arg, args: ast.Args = None) -> ast.Args:
@@ -7,24 +13,19 @@ def build_args(arg: ast.Arg, args: ast.Args = None) -> ast.Args:
     if arg.is_arg:
         if args.vararg is not None:
             raise ValueError("Only one *arg is allowed")
+        if args.kwarg is not None:
+            raise ValueError("**kwargs must be after *args")
         args.vararg = arg
 
     if arg.is_kwarg:
         if args.kwarg is not None:
             raise ValueError("Only one **arg is allowed")
-        if args.vararg is not None:
-            raise ValueError("**kwargs must be after *args")
         args.kwarg = arg
 
-    if arg.default is not None:
-        if (
-            args.args
-            and args.args[0].default is None
-            and not args.args[0].is_arg
-            and not args.args[0].is_kwarg
-        ):
+    if arg.default is None and not arg.is_arg and not arg.is_kwarg:
+        if args.args and args.args[-1].default is not None:
             raise ValueError("Default argument must be after positional argument")
-    args.args.insert(0, arg)
+    args.args.append(arg)
     return args
 
 
@@ -35,20 +36,20 @@ def build_if_stmt(test, body, elif_clauses, else_clause=None):
         current_if.orelse = [elif_clause]
         current_if = elif_clause
     if else_clause is not None:
-        current_if.orelse = [else_clause]
+        current_if.orelse = else_clause
     return start_if
 
 
 def build_try_stmt(body, except_clauses, else_clause=None, finally_clause=None):
-    try_stmt = ast.TryStmt(body)
-    for h_type, h_name, h_body in except_clauses:
-        handler = ast.ExceptHandler(h_type, h_name, h_body)
-        try_stmt.handlers.append(handler)
-    if else_clause is not None:
-        try_stmt.orelse = [else_clause]
-    if finally_clause is not None:
-        try_stmt.finalbody = [finally_clause]
-    return try_stmt
+    return ast.TryStmt(body, except_clauses, else_clause, finally_clause)
+
+
+def build_assign_stmt(target, values):
+    if not values:
+        return target
+    targets = [target]
+    targets.extend(values)
+    return ast.AssignStmt(targets, targets.pop())
 
 
 def build_atom_expr(atom, trailer_list):
@@ -69,6 +70,7 @@ def build_atom_expr(atom, trailer_list):
 def build_call_expr(func, args=None):
     call: ast.CallExpr = build_call_trailer(args)
     call.func = func
+    return call
 
 
 def build_call_trailer(args=None):
@@ -85,15 +87,6 @@ def build_call_trailer(args=None):
     return ast.CallExpr(None, not_keywords, keywords)
 
 
-def build_dotted_name(names):
-    last_node = names.pop()
-    while names:
-        current = names.pop()
-        attr = ast.AttributeExpr(last_node, current.name_id)
-        last_node = attr
-    return last_node
-
-
 def build_generators(comp_iters):
     generators = []
     for comp in comp_iters:
@@ -108,15 +101,15 @@ def build_generators(comp_iters):
 
 builders = {
     # -------------------------------------------------------------------------
-    "program -> stmt program": lambda s, p: ast.Program([s] + p.stmts),
-    "program -> NEWLINE program": lambda n, p: p,
+    "program -> program stmt": lambda p, s: ast.Program(append(p.stmts, s)),
+    "program -> program NEWLINE": lambda p, n: p,
     "program -> EPS": lambda: ast.Program([]),
     # -------------------------------------------------------------------------
-    "stmt -> simple_stmt": lambda s: s,
-    "stmt -> compound_stmt": lambda c: c,
+    "stmt -> simple_stmt": identity,
+    "stmt -> compound_stmt": identity,
     # -------------------------------------------------------------------------
     "stmt_list -> stmt": lambda s: [s],
-    "stmt_list -> stmt stmt_list": lambda s, sl: [s] + sl,
+    "stmt_list -> stmt_list stmt": lambda sl, s: append(sl, s),
     # -------------------------------------------------------------------------
     "simple_stmt -> small_stmt NEWLINE": lambda s, n: s,
     # -------------------------------------------------------------------------
@@ -131,43 +124,43 @@ builders = {
         lambda c, n, c_, s: ast.ClassDefStmt(ast.NameExpr(n.value), [], s)
     ),
     "classdef -> class NAME ( ) : suite": (
-        lambda c, n, c_, s: ast.ClassDefStmt(ast.NameExpr(n.value), [], s)
+        lambda c, n, p, p2, c_, s: ast.ClassDefStmt(ast.NameExpr(n.value), [], s)
     ),
     "classdef -> class NAME ( arglist ) : suite": (
-        lambda c, n, p, a, c_, s: ast.ClassDefStmt(ast.NameExpr(n.value), a, s)
+        lambda c, n, p, a, p2, c_, s: ast.ClassDefStmt(ast.NameExpr(n.value), a, s)
     ),
     # -------------------------------------------------------------------------
     "parameters -> param": lambda p: build_args(p),
-    "parameters -> param , parameters": lambda p, c, ps: build_args(p, ps),
+    "parameters -> parameters , param": lambda ps, c, p: build_args(p, ps),
     # -------------------------------------------------------------------------
-    "param -> tfpdef": lambda p: p,
+    "param -> tfpdef": identity,
     "param -> tfpdef = test": lambda p, e, t: p.set_default(t),
     "param -> * tfpdef": lambda s, p: p.set_arg(True),
     "param -> ** tfpdef": lambda ss, p: p.set_kwarg(True),
     # -------------------------------------------------------------------------
     "tfpdef -> NAME": lambda n: ast.Arg(ast.NameExpr(n.value)),
-    "tfpdef -> NAME : test": lambda n, t: ast.Arg(ast.NameExpr(n.value), t),
+    "tfpdef -> NAME : test": lambda n, c, t: ast.Arg(ast.NameExpr(n.value), t),
     # -------------------------------------------------------------------------
     "varargslist -> vfpdef": lambda v: build_args(v),
-    "varargslist -> vfpdef , varargslist": lambda v, c, va: build_args(v, va),
+    "varargslist -> varargslist , vfpdef": lambda va, c, v: build_args(v, va),
     # -------------------------------------------------------------------------
-    "vararg -> vfpdef": lambda v: v,
+    "vararg -> vfpdef": identity,
     "vararg -> vfpdef = test": lambda v, e, t: v.set_default(t),
     "vararg -> * vfpdef": lambda s, v: v.set_arg(True),
     "vararg -> ** vfpdef": lambda ss, v: v.set_kwarg(True),
     # -------------------------------------------------------------------------
     "vfpdef -> NAME": lambda n: ast.Arg(ast.NameExpr(n.value)),
     # -------------------------------------------------------------------------
-    "small_stmt -> expr_stmt": lambda e: e,
-    "small_stmt -> del_stmt": lambda d: d,
-    "small_stmt -> pass_stmt": lambda p: p,
-    "small_stmt -> flow_stmt": lambda f: f,
-    "small_stmt -> global_stmt": lambda g: g,
-    "small_stmt -> nonlocal_stmt": lambda n: n,
-    "small_stmt -> assert_stmt": lambda a: a,
-    "small_stmt -> sim_stmt": lambda s: s,
-    "small_stmt -> stat_stmt": lambda s: s,
-    # "small_stmt -> import_stmt": lambda i: i,
+    "small_stmt -> expr_stmt": identity,
+    "small_stmt -> del_stmt": identity,
+    "small_stmt -> pass_stmt": identity,
+    "small_stmt -> flow_stmt": identity,
+    "small_stmt -> global_stmt": identity,
+    "small_stmt -> nonlocal_stmt": identity,
+    "small_stmt -> assert_stmt": identity,
+    "small_stmt -> sim_stmt": identity,
+    "small_stmt -> stat_stmt": identity,
+    # "small_stmt -> import_stmt": identity,
     # -------------------------------------------------------------------------
     "sim_stmt -> begsim test": lambda b, t: ast.Begsim(t),
     "sim_stmt -> endsim": lambda e: ast.Endsim(),
@@ -185,13 +178,13 @@ builders = {
     "assert_stmt -> assert test_list": lambda a, t: ast.AssertStmt(t),
     # -------------------------------------------------------------------------
     "namelist -> NAME": lambda n: [ast.NameExpr(n.value)],
-    "namelist -> NAME , namelist": lambda n, c, nl: [ast.NameExpr(n.value)] + nl,
+    "namelist -> namelist , NAME": lambda nl, c, n: append(nl, ast.NameExpr(n.value)),
     # -------------------------------------------------------------------------
-    "flow_stmt -> break_stmt": lambda b: b,
-    "flow_stmt -> continue_stmt": lambda c: c,
-    "flow_stmt -> return_stmt": lambda r: r,
-    "flow_stmt -> raise_stmt": lambda r: r,
-    "flow_stmt -> yield_stmt": lambda y: y,
+    "flow_stmt -> break_stmt": identity,
+    "flow_stmt -> continue_stmt": identity,
+    "flow_stmt -> return_stmt": identity,
+    "flow_stmt -> raise_stmt": identity,
+    "flow_stmt -> yield_stmt": identity,
     # -------------------------------------------------------------------------
     "break_stmt -> break": lambda b: ast.BreakStmt(),
     # -------------------------------------------------------------------------
@@ -207,15 +200,15 @@ builders = {
     "raise_stmt -> raise test": lambda r, t: ast.RaiseStmt(t),
     "raise_stmt -> raise test from test": lambda r, t, f, t2: ast.RaiseStmt(t, t2),
     # -------------------------------------------------------------------------
-    "compound_stmt -> if_stmt": lambda i: i,
-    "compound_stmt -> while_stmt": lambda w: w,
-    "compound_stmt -> for_stmt": lambda f: f,
-    "compound_stmt -> try_stmt": lambda t: t,
-    "compound_stmt -> with_stmt": lambda w: w,
-    "compound_stmt -> funcdef": lambda f: f,
-    "compound_stmt -> classdef": lambda c: c,
-    "compound_stmt -> decorated": lambda d: d,
-    "compound_stmt -> confdef": lambda c: c,
+    "compound_stmt -> if_stmt": identity,
+    "compound_stmt -> while_stmt": identity,
+    "compound_stmt -> for_stmt": identity,
+    "compound_stmt -> try_stmt": identity,
+    "compound_stmt -> with_stmt": identity,
+    "compound_stmt -> funcdef": identity,
+    "compound_stmt -> classdef": identity,
+    "compound_stmt -> decorated": identity,
+    "compound_stmt -> confdef": identity,
     # -------------------------------------------------------------------------
     "confdef -> conf NAME : NEWLINE INDENT confbody DEDENT": (
         lambda c, n, c_, nl, i, cb, d: ast.ConfDefStmt(n.value, cb)
@@ -225,18 +218,20 @@ builders = {
     ),
     # -------------------------------------------------------------------------
     "confbody -> NAME test NEWLINE": lambda n, t, nl: [ast.ConfOption(n.value, t)],
-    "confbody -> NAME test NEWLINE confbody": (
-        lambda n, t, nl, cb: [ast.ConfOption(n.value, t)] + cb
+    "confbody -> confbody NAME test NEWLINE": (
+        lambda cb, n, t, nl: append(cb, ast.ConfOption(n.value, t))
     ),
     # -------------------------------------------------------------------------
     "if_stmt -> if test : suite elif_clause": lambda i, t, c, s, e: build_if_stmt(
         t, s, e
     ),
     "if_stmt -> if test : suite elif_clause else : suite": (
-        lambda i, t, c, s, e, el, s2: build_if_stmt(t, s, e, s2)
+        lambda i, t, c, s, e, el, c2, s2: build_if_stmt(t, s, e, s2)
     ),
     # -------------------------------------------------------------------------
-    "elif_clause -> elif test : suite elif_clause": (lambda e, t, s, e2: [(t, s)] + e2),
+    "elif_clause -> elif_clause elif test : suite": (
+        lambda e, el, t, c, s: append(e, ast.IfStmt(t, s))
+    ),
     "elif_clause -> EPS": lambda: [],
     # -------------------------------------------------------------------------
     "while_stmt -> while test : suite": lambda w, t, c, s: ast.WhileStmt(t, s),
@@ -253,32 +248,32 @@ builders = {
     # -------------------------------------------------------------------------
     "try_stmt -> try : suite except_clause": (lambda t, c, s, e: build_try_stmt(s, e)),
     "try_stmt -> try : suite except_clause else : suite": (
-        lambda t, c, s, e, el, s2: build_try_stmt(s, e, else_clause=s2)
+        lambda t, c, s, e, el, c2, s2: build_try_stmt(s, e, else_clause=s2)
     ),
     "try_stmt -> try : suite except_clause finally : suite": (
-        lambda t, c, s, e, f, s2: build_try_stmt(s, e, finally_clause=s2)
+        lambda t, c, s, e, f, c2, s2: build_try_stmt(s, e, finally_clause=s2)
     ),
     "try_stmt -> try : suite except_clause else : suite finally : suite": (
-        lambda t, c, s, e, el, s2, f, s3: build_try_stmt(s, e, s2, s3)
+        lambda t, c, s, e, el, c2, s2, f, c3, s3: build_try_stmt(s, e, s2, s3)
     ),
     # -------------------------------------------------------------------------
-    "except_clause -> except : suite maybe_except_clause": (
-        lambda e, c, s, m: [(None, None, s)] + m
+    "except_clause -> except_handler": lambda h: [h],
+    "except_clause -> except_clause except_handler": lambda e, h: append(e, h),
+    # -------------------------------------------------------------------------
+    "except_handler -> except : suite": (
+        lambda e, c, s: ast.ExceptHandler(None, None, s)
     ),
-    "except_clause -> except test : suite maybe_except_clause": (
-        lambda e, t, c, s, m: [(t, None, s)] + m
+    "except_handler -> except test : suite": (
+        lambda e, t, c, s: ast.ExceptHandler(t, None, s)
     ),
-    "except_clause -> except test as NAME : suite maybe_except_clause": (
-        lambda e, t, c, s, a, n, m: [(t, ast.NameExpr(n.value), s)] + m
+    "except_handler -> except test as NAME : suite": (
+        lambda e, t, a, n, c, s: ast.ExceptHandler(t, ast.NameExpr(n.value), s)
     ),
     # -------------------------------------------------------------------------
-    "maybe_except_clause -> except_clause": lambda e: [e],
-    "maybe_except_clause -> EPS": lambda: [],
-    # -------------------------------------------------------------------------
     "with_stmt -> with with_items : suite": lambda w, i, c, s: ast.WithStmt(i, s),
     # -------------------------------------------------------------------------
     "with_items -> with_item": lambda i: [i],
-    "with_items -> with_item , with_items": lambda i, c, i2: [i] + i2,
+    "with_items -> with_items , with_item": lambda i, c, i2: append(i, i2),
     # -------------------------------------------------------------------------
     "with_item -> test": lambda t: ast.WithItem(t),
     "with_item -> test as expr": lambda t, a, e: ast.WithItem(t, e),
@@ -289,55 +284,49 @@ builders = {
     "decorated -> decorators funcdef": lambda d, f: f.add_decorators(d),
     "decorated -> decorators classdef": lambda d, c: c.add_decorators(d),
     # -------------------------------------------------------------------------
-    "decorators -> decorator decorators": lambda d, d2: [d] + d2,
+    "decorators -> decorators decorator": lambda d, d2: append(d, d2),
     "decorators -> decorator": lambda d: [d],
     # -------------------------------------------------------------------------
-    "decorator -> @ dotted_name NEWLINE": lambda d, n, nl: build_dotted_name(n),
+    "decorator -> @ dotted_name NEWLINE": lambda d, n, nl: n,
     "decorator -> @ dotted_name ( ) NEWLINE": (
-        lambda d, n, p, nl: build_call_expr(build_dotted_name(n), [])
+        lambda d, n, p, p2, nl: build_call_expr(n)
     ),
     "decorator -> @ dotted_name ( arglist ) NEWLINE": (
-        lambda d, n, p, a, nl: build_call_expr(build_dotted_name(n), a)
+        lambda d, n, p, a, p2, nl: build_call_expr(n, a)
     ),
     # -------------------------------------------------------------------------
-    "dotted_name -> NAME": lambda n: [ast.NameExpr(n.value)],
-    "dotted_name -> NAME . dotted_name": lambda n, c, n2: [ast.NameExpr(n.value)] + n2,
+    "dotted_name -> NAME": lambda n: ast.NameExpr(n.value),
+    "dotted_name -> dotted_name . NAME": (
+        lambda d, c, n: ast.AttributeExpr(d, n.value)
+    ),
     # -------------------------------------------------------------------------
     "arglist -> argument": lambda a: [a],
-    "arglist -> argument , arglist": lambda a, c, a2: [a] + a2,
+    "arglist -> arglist , argument": lambda a, c, a2: append(a, a2),
     # -------------------------------------------------------------------------
-    "argument -> test": lambda t: t,
+    "argument -> test": identity,
     "argument -> test comp_for": lambda t, c: ast.GeneratorExpr(t, build_generators(c)),
     "argument -> test = test": lambda t, e, t2: ast.Keyword(t, t2),
     "argument -> * test": lambda a, t: ast.StarredExpr(t),
     "argument -> ** test": lambda a, t: ast.Keyword(None, t),
     # -------------------------------------------------------------------------
-    "comp_for -> for expr_list in or_test comp_iter": (
-        lambda f, e, i, o, c: [ast.Comprehension(e, o)] + c
+    "comp_for -> for expr_list in or_test": (
+        lambda f, e, i, o: [ast.Comprehension(e, o)]
+    ),
+    "comp_for -> comp_for for expr_list in or_test": (
+        lambda c, f, e, i, o: append(c, ast.Comprehension(e, o))
+    ),
+    "comp_for -> comp_for if test_nocond": (
+        lambda c, i, t: append(c, ast.IfExpr(t, None))
     ),
-    # -------------------------------------------------------------------------
-    "comp_if -> if test_nocond": lambda i, t: [ast.IfExpr(t, None)],
-    "comp_if -> if test_nocond comp_iter": lambda i, t, c: [ast.IfExpr(t, None)] + c,
-    # -------------------------------------------------------------------------
-    "comp_iter -> comp_for": lambda c: c,
-    "comp_iter -> comp_if": lambda c: c,
-    "comp_iter -> EPS": lambda: [],
     # -------------------------------------------------------------------------
     "expr_stmt -> test_list annassign": lambda t, a: a.set_target(t),
     "expr_stmt -> test_list augassign yield_or_testlist": (
         lambda t, a, y: ast.AugAssignStmt(t, a, y)
     ),
-    "expr_stmt -> test_list assign": (
-        lambda t, a: ast.AssignStmt([t] + a.targets, a.value)
-        if isinstance(a, ast.AssignStmt)
-        else (ast.AssignStmt([t], a) if isinstance(a, ast.TupleExpr) else t)
-    ),
-    # -------------------------------------------------------------------------
-    "test_list -> test": lambda t: [t],
-    "test_list -> test , test_list": lambda t, c, t2: [t] + t2,
+    "expr_stmt -> test_list assign": lambda t, a: build_assign_stmt(t, a),
     # -------------------------------------------------------------------------
-    "yield_or_testlist -> yield_expr": lambda y: y,
-    "yield_or_testlist -> test_list": lambda t: t,
+    "yield_or_testlist -> yield_expr": identity,
+    "yield_or_testlist -> test_list": identity,
     # -------------------------------------------------------------------------
     "yield_expr -> yield": lambda y: ast.YieldExpr(),
     "yield_expr -> yield yield_arg": (
@@ -347,19 +336,11 @@ builders = {
     ),
     # -------------------------------------------------------------------------
     "yield_arg -> from test": lambda f, t: ast.YieldFromExpr(t),
-    "yield_arg -> test_list": lambda t: t,
+    "yield_arg -> test_list": identity,
     # -------------------------------------------------------------------------
-    "assign -> = yield_expr assign": (
-        lambda e, t, a: ast.AssignStmt([t] + a.targets, a.value)
-        if isinstance(a, ast.AssignStmt)
-        else (ast.AssignStmt([t], a) if isinstance(a, ast.TupleExpr) else t)
-    ),
-    "assign -> = test_list assign": (
-        lambda e, t, a: ast.AssignStmt([t] + a.targets, a.value)
-        if isinstance(a, ast.AssignStmt)
-        else (ast.AssignStmt([t], a) if isinstance(a, ast.TupleExpr) else t)
-    ),
-    "assign -> EPS": lambda: None,
+    "assign -> assign = yield_expr": lambda a, e, y: append(a, y),
+    "assign -> assign = test_list": lambda a, e, t: append(a, t),
+    "assign -> EPS": lambda: [],
     # -------------------------------------------------------------------------
     "annassign -> : test = test": lambda c, a, e, t: ast.AnnAssignStmt(None, a, t),
     # -------------------------------------------------------------------------
@@ -377,14 +358,14 @@ builders = {
     "augassign -> **=": lambda a: ast.Operator.POW,
     "augassign -> //=": lambda a: ast.Operator.FLOORDIV,
     # -------------------------------------------------------------------------
-    "test -> or_test": lambda o: o,
+    "test -> or_test": identity,
     "test -> or_test if or_test else test": (
         lambda o, i, o2, e, t: ast.IfExpr(o, o2, t)
     ),
-    "test -> lambdef": lambda l: l,
+    "test -> lambdef": identity,
     # -------------------------------------------------------------------------
-    "test_nocond -> or_test": lambda o: o,
-    "test_nocond -> lambdef_nocond": lambda l: l,
+    "test_nocond -> or_test": identity,
+    "test_nocond -> lambdef_nocond": identity,
     # -------------------------------------------------------------------------
     "lambdef -> lambda : test": lambda l, c, t: ast.FuncDefStmt(None, ast.Args(), [t]),
     "lambdef -> lambda varargslist : test": (
@@ -392,26 +373,22 @@ builders = {
     ),
     # -------------------------------------------------------------------------
     "lambdef_nocond -> lambda : test_nocond": (
-        lambda l, c, t: ast.FuncDefStmt(None, [], [t]),
+        lambda l, c, t: ast.FuncDefStmt(None, ast.Args(), [t])
     ),
     "lambdef_nocond -> lambda varargslist : test_nocond": (
         lambda l, v, c, t: ast.FuncDefStmt(None, v, [t])
     ),
     # -------------------------------------------------------------------------
-    "or_test -> and_test": lambda a: a,
-    "or_test -> and_test or or_test": (
-        lambda a, o, o2: ast.BinOpExpr(a, ast.Operator.OR, o2)
+    "or_test -> or_test or or_test": (
+        lambda l, o, r: ast.BinOpExpr(l, ast.Operator.OR, r)
     ),
-    # -------------------------------------------------------------------------
-    "and_test -> not_test": lambda n: n,
-    "and_test -> not_test and and_test": (
-        lambda n, a, a2: ast.BinOpExpr(n, ast.Operator.AND, a2)
+    "or_test -> or_test and or_test": (
+        lambda l, o, r: ast.BinOpExpr(l, ast.Operator.AND, r)
     ),
+    "or_test -> not or_test": lambda n, t: ast.UnaryOpExpr(ast.UnaryOp.NOT, t),
+    "or_test -> comparison": identity,
     # -------------------------------------------------------------------------
-    "not_test -> not not_test": lambda n, t: ast.UnaryOpExpr(ast.UnaryOp.NOT, t),
-    "not_test -> comparison": lambda c: c,
-    # -------------------------------------------------------------------------
-    "comparison -> expr": lambda e: e,
+    "comparison -> expr": identity,
     "comparison -> expr comp_op comparison": (lambda l, o, r: ast.BinOpExpr(l, o, r)),
     # -------------------------------------------------------------------------
     "comp_op -> <": lambda c: ast.CmpOp.LT,
@@ -425,59 +402,29 @@ builders = {
     "comp_op -> is": lambda c: ast.CmpOp.IS,
     "comp_op -> is not": lambda c, c2: ast.CmpOp.IS_NOT,
     # -------------------------------------------------------------------------
-    "expr -> xor_expr": lambda x: x,
-    "expr -> xor_expr | expr": (
-        lambda l, o, r: ast.BinOpExpr(l, ast.Operator.BIT_OR, r)
-    ),
-    # -------------------------------------------------------------------------
-    "xor_expr -> and_expr": lambda a: a,
-    "xor_expr -> and_expr ^ xor_expr": (
-        lambda l, o, r: ast.BinOpExpr(l, ast.Operator.BIT_XOR, r)
-    ),
-    # -------------------------------------------------------------------------
-    "and_expr -> shift_expr": lambda s: s,
-    "and_expr -> shift_expr & and_expr": (
-        lambda l, o, r: ast.BinOpExpr(l, ast.Operator.BIT_AND, r)
-    ),
-    # -------------------------------------------------------------------------
-    "shift_expr -> arith_expr": lambda a: a,
-    "shift_expr -> arith_expr << shift_expr": (
-        lambda l, o, r: ast.BinOpExpr(l, ast.Operator.LSHIFT, r)
-    ),
-    "shift_expr -> arith_expr >> shift_expr": (
-        lambda l, o, r: ast.BinOpExpr(l, ast.Operator.RSHIFT, r)
-    ),
-    # -------------------------------------------------------------------------
-    "arith_expr -> term": lambda t: t,
-    "arith_expr -> term + arith_expr": (
-        lambda l, o, r: ast.BinOpExpr(l, ast.Operator.ADD, r)
-    ),
-    "arith_expr -> term - arith_expr": (
-        lambda l, o, r: ast.BinOpExpr(l, ast.Operator.SUB, r)
-    ),
-    # -------------------------------------------------------------------------
-    "term -> factor": lambda f: f,
-    "term -> factor * term": lambda l, o, r: ast.BinOpExpr(l, ast.Operator.MUL, r),
-    "term -> factor @ term": lambda l, o, r: ast.BinOpExpr(l, ast.Operator.MATMUL, r),
-    "term -> factor / term": lambda l, o, r: ast.BinOpExpr(l, ast.Operator.DIV, r),
-    "term -> factor % term": lambda l, o, r: ast.BinOpExpr(l, ast.Operator.MOD, r),
-    "term -> factor // term": (
+    "expr -> expr | expr": lambda l, o, r: ast.BinOpExpr(l, ast.Operator.BIT_OR, r),
+    "expr -> expr ^ expr": lambda l, o, r: ast.BinOpExpr(l, ast.Operator.BIT_XOR, r),
+    "expr -> expr & expr": lambda l, o, r: ast.BinOpExpr(l, ast.Operator.BIT_AND, r),
+    "expr -> expr << expr": lambda l, o, r: ast.BinOpExpr(l, ast.Operator.LSHIFT, r),
+    "expr -> expr >> expr": lambda l, o, r: ast.BinOpExpr(l, ast.Operator.RSHIFT, r),
+    "expr -> expr + expr": lambda l, o, r: ast.BinOpExpr(l, ast.Operator.ADD, r),
+    "expr -> expr - expr": lambda l, o, r: ast.BinOpExpr(l, ast.Operator.SUB, r),
+    "expr -> expr * expr": lambda l, o, r: ast.BinOpExpr(l, ast.Operator.MUL, r),
+    "expr -> expr @ expr": lambda l, o, r: ast.BinOpExpr(l, ast.Operator.MATMUL, r),
+    "expr -> expr / expr": lambda l, o, r: ast.BinOpExpr(l, ast.Operator.DIV, r),
+    "expr -> expr % expr": lambda l, o, r: ast.BinOpExpr(l, ast.Operator.MOD, r),
+    "expr -> expr // expr": (
         lambda l, o, r: ast.BinOpExpr(l, ast.Operator.FLOORDIV, r)
     ),
-    # -------------------------------------------------------------------------
-    "factor -> + factor": lambda o, f: ast.UnaryOpExpr(ast.UnaryOp.UADD, f),
-    "factor -> - factor": lambda o, f: ast.UnaryOpExpr(ast.UnaryOp.USUB, f),
-    "factor -> ~ factor": lambda o, f: ast.UnaryOpExpr(ast.UnaryOp.INVERT, f),
-    "factor -> power": lambda p: p,
-    # -------------------------------------------------------------------------
-    "power -> atom_expr": lambda a: a,
-    "power -> atom_expr ** factor": (
-        lambda l, o, r: ast.BinOpExpr(l, ast.Operator.POW, r)
-    ),
+    "expr -> + expr": lambda o, e: ast.UnaryOpExpr(ast.UnaryOp.UADD, e),
+    "expr -> - expr": lambda o, e: ast.UnaryOpExpr(ast.UnaryOp.USUB, e),
+    "expr -> ~ expr": lambda o, e: ast.UnaryOpExpr(ast.UnaryOp.INVERT, e),
+    "expr -> expr ** expr": lambda l, o, r: ast.BinOpExpr(l, ast.Operator.POW, r),
+    "expr -> atom_expr": identity,
     # -------------------------------------------------------------------------
     "atom_expr -> atom trailer_expr": lambda a, t: build_atom_expr(a, t),
     # -------------------------------------------------------------------------
-    "trailer_expr -> trailer trailer_expr": lambda t, t2: [t] + t2,
+    "trailer_expr -> trailer_expr trailer": lambda t, t2: append(t, t2),
     "trailer_expr -> EPS": lambda: [],
     # -------------------------------------------------------------------------
     "trailer -> ( )": lambda p, p2: build_call_trailer(),
@@ -490,11 +437,11 @@ builders = {
     "trailer -> . NAME": lambda d, n: ast.AttributeExpr(None, n.value),
     # -------------------------------------------------------------------------
     "subscriptlist -> subscript": lambda s: ast.TupleExpr([s]),
-    "subscriptlist -> subscript , subscriptlist": (
-        lambda s, o, s2: ast.TupleExpr([s] + s2.elts)
+    "subscriptlist -> subscriptlist , subscript": (
+        lambda s, o, s2: ast.TupleExpr(append(s.elts, s2))
     ),
     # -------------------------------------------------------------------------
-    "subscript -> test": lambda t: t,
+    "subscript -> test": identity,
     "subscript -> maybe_test : maybe_test sliceop": (
         lambda l, c, u, s: ast.SliceExpr(l, u, s)
     ),
@@ -502,7 +449,7 @@ builders = {
     "sliceop -> : maybe_test": lambda o, t: t,
     "sliceop -> EPS": lambda: ast.ConstantExpr(1),
     # -------------------------------------------------------------------------
-    "maybe_test -> test": lambda t: t,
+    "maybe_test -> test": identity,
     "maybe_test -> EPS": lambda: None,
     # -------------------------------------------------------------------------
     "atom -> ( test_list_comp )": (
@@ -532,16 +479,15 @@ builders = {
     "atom -> False": lambda f: ast.ConstantExpr(False),
     # -------------------------------------------------------------------------
     "test_list_comp -> test comp_for": lambda t, c: (t, c),
-    "test_list_comp -> test_list": lambda t: t,
+    "test_list_comp -> test_list": identity,
     # -------------------------------------------------------------------------
-    "expr_list -> expr": lambda e: e,
-    "expr_list -> expr , expr_list": lambda e, o, el: (
-        ast.TupleExpr([e] + el.elts)
-        if isinstance(el, ast.TupleExpr)
-        else ast.TupleExpr([e, el])
-    ),
+    "expr_list -> expr": identity,
+    "expr_list -> expr_tuple": identity,
+    # -------------------------------------------------------------------------
+    "expr_tuple -> expr , expr": lambda e, o, e2: ast.TupleExpr([e, e2]),
+    "expr_tuple -> expr_tuple , expr": lambda t, o, e: ast.TupleExpr(append(t.elts, e)),
     # -------------------------------------------------------------------------
     "test_list -> test": lambda t: ast.TupleExpr([t]),
-    "test_list -> test , test_list": lambda t, o, tl: ast.TupleExpr([t] + tl.elts),
+    "test_list -> test_list , test": lambda tl, o, t: ast.TupleExpr(append(tl.elts, t)),
     # -------------------------------------------------------------------------
 }
@@ -1,8 +1,6 @@
-from typing import List
+from numlab.compiler import Tokenizer
 
-from numlab.compiler import Token, Tokenizer
-
-tknz = Tokenizer()
+tknz = Tokenizer(indentation=True)
 tknz.add_pattern("NEWLINE", r"\n")
 tknz.add_pattern("SPACE", r"( |\t)( |\t)*", lambda l: None)
 
@@ -107,34 +105,3 @@ tknz.add_pattern(
     "STRING", r"'((^')|(\\'))*(^\\)'|\"((^\")|(\\\"))*(^\\)\"", lambda t: t[1:-1]
 )
 
-
-@tknz.process_tokens
-def process_tokens(tokens: List[Token]):
-    indent_tok = Token("INDENT", "INDENT")
-    dedent_tok = Token("DEDENT", "DEDENT")
-    indentations = [0]
-    new_tokens = []
-    check_indent = 0
-    for tok in tokens:
-        if tok.NEWLINE and check_indent == 0:
-            check_indent = 1
-        if not tok.NEWLINE and check_indent == 1:
-            check_indent = 2
-        if check_indent == 2:
-            new_indentation_size = tok.col
-            while new_indentation_size < indentations[-1]:
-                new_tokens.append(dedent_tok)
-                indentations.pop()
-            if new_indentation_size > indentations[-1]:
-                indentations.append(new_indentation_size)
-                new_tokens.append(indent_tok)
-            check_indent = 0
-        if not tok.NEWLINE or (new_tokens and not new_tokens[-1].NEWLINE):
-            new_tokens.append(tok)
-
-    if len(indentations) > 1:
-        for _ in range(len(indentations) - 1):
-            new_tokens.append(dedent_tok)
-
-    new_tokens.append(Token("NEWLINE", "\n"))
-    return new_tokens
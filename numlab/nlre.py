@@ -34,8 +34,10 @@ class RegexMatch:
         The regular expression used to match the text.
     text : str
         The text to match against the regular expression.
-    pos : int
+    end : int
         The position where the match ended.
+    start : int
+        The position where the match started.
 
     Attributes
     ----------
@@ -43,21 +45,24 @@ class RegexMatch:
         The regular expression used to match the text.
     text : str
         The text that was matched against the regular expression.
-    pos : int
+    end : int
         The position where the match ended.
+    start : int
+        The position where the match started.
     """
 
-    def __init__(self, re_expr: str, text: str, end: int):
+    def __init__(self, re_expr: str, text: str, end: int, start: int = 0):
         self.re_expr = re_expr
         self.text = text
         self.end = end
+        self.start = start
 
     def __repr__(self):
-        return f"RegexMatch(matched:{self.text[:self.end]}; end={self.end})"
+        return f"RegexMatch(matched:{self.matched_text}; end={self.end})"
 
     @property
     def matched_text(self) -> str:
-        return self.text[: self.end]
+        return self.text[self.start : self.end]
 
 
 class RegexPattern:
@@ -86,7 +91,7 @@ class RegexPattern:
         self.re_expr = re_expr
         self.atmt = _build_automata(self.re_expr).flat().to_dfa()
 
-    def match(self, text: str) -> RegexMatch:
+    def match(self, text: str, pos: int = 0) -> RegexMatch:
         """
         Match the text against the regular expression.
 
@@ -94,6 +99,9 @@ class RegexPattern:
         ----------
         text : str
             The text to match against the regular expression.
+        pos : int, optional
+            Position of the text where the match starts, by default 0.
+            Matching from a position avoids slicing the text.
 
         Returns
         -------
@@ -109,10 +117,10 @@ class RegexPattern:
 
         for state in self.atmt.end_states:
             state.on_visited = set_last_pos
-        self.atmt.run(text)
+        self.atmt.run(text, start=pos)
         if last_pos == -1:
             return None
-        return RegexMatch(self.re_expr, text, last_pos)
+        return RegexMatch(self.re_expr, text, last_pos, pos)
 
 
 def _find_matching_paren(text: str, start: int = 0) -> int:
@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 from time import sleep, time
-from typing import Any, List, Tuple
+from typing import Any, Iterable, List, Tuple
 
 import numlab.nl_ast as ast
 from numlab import builtin
@@ -311,15 +311,19 @@ class EvalVisitor:
             self.context.define(name, value)
         self.set_stat("var_count", self.context.count_vars())
 
-    @visitor
-    def eval(self, node: ast.Program):
+    def eval_stmts(self, stmts: Iterable[ast.Stmt]):
+        # Statements may be given while the program is parsed
         start = time()
         self.flags["start_time"] = start
-        for stmt in node.stmts:
+        for stmt in stmts:
             self.eval(stmt)
         end = time()
         self.set_stat("time", end - start)
 
+    @visitor
+    def eval(self, node: ast.Program):
+        self.eval_stmts(node.stmts)
+
     @visitor
     def eval(self, node: ast.FuncDefStmt):
         for arg in node.args.args:
@@ -1,7 +1,11 @@
+import hashlib
 import os
+import pickle
 
 import pytest
-from numlab.compiler import Grammar
+from numlab.compiler import Grammar, Token
+from numlab.compiler.grammar import _GRAMMAR_CACHE_VERSION, _GrammarParser
+from numlab.compiler.grammar_ops import calculate_first, calculate_follow
 
 
 def test_grammar_parser():
@@ -49,3 +53,125 @@ def test_all_productions(example_grm_4):
 
         assert c_expr_name == expr_name
         assert all(x1 == x2 for x1, x2 in zip(c_prod_items, prod_items))
+
+
+def _names(sets):
+    return {key: {term.name for term in terms} for key, terms in sets.items()}
+
+
+def test_first_and_follow():
+    grammar = Grammar.open("./tests/grammars/first_follow.gm")
+    first = calculate_first(grammar)
+    assert _names(first) == {
+        "E": {"(", "i"},
+        "E_X": {"+", "EPS"},
+        "T": {"(", "i"},
+        "T_Y": {"*", "EPS"},
+        "F": {"(", "i"},
+    }
+    follow = _names(calculate_follow(grammar))
+    assert follow == {
+        "E": {"$", ")"},
+        "E_X": {"$", ")"},
+        "T": {"+", "$", ")"},
+        "T_Y": {"+", "$", ")"},
+        "F": {"*", "+", "$", ")"},
+    }
+    assert _names(calculate_follow(grammar, first)) == follow
+
+
+def test_first_with_nullable_prefix(example_grm_4):
+    first = _names(calculate_first(example_grm_4))
+    assert first == {
+        "expr1": {"foo"},
+        "expr2": {"bar", "int", "str", "EPS"},
+        "expr3": {"int", "str"},
+    }
+
+
+def test_load_cached_grammar(tmp_path, monkeypatch):
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache"))
+    grammar_file = tmp_path / "grammar.gm"
+    grammar_file.write_text("%left '+'\n\nE: E '+' T\n | T %prec '+'\n\nT: i\n")
+    builders = {
+        "E -> E + T": lambda e, p, t: e + t,
+        "E -> T": lambda t: t,
+        "T -> i": lambda i: 1,
+    }
+
+    grammar = Grammar.load(str(grammar_file), builders)
+    assert len(list((tmp_path / "cache" / "numlab").glob("grammar_*"))) == 1
+
+    # Second load comes from the cache
+    monkeypatch.setattr(Grammar, "open", None)
+    cached = Grammar.load(str(grammar_file), builders)
+    assert cached.content_hash() == grammar.content_hash()
+    assert cached.E.prods[0].build_ast([1, None, 1]) == 2
+    assert cached.precedence == grammar.precedence == {"+": (1, "left")}
+    assert cached.E.prods[1].prec == "+"
+    monkeypatch.undo()
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache"))
+
+    # An invalid cache file is rebuilt
+    cache_file = next((tmp_path / "cache" / "numlab").glob("grammar_*"))
+    file_hash = hashlib.sha256(grammar_file.read_bytes()).hexdigest()
+    invalid_data = [
+        b"not a pickle",
+        pickle.dumps({"version": 0}),
+        pickle.dumps(set()),
+        # Missing class (e.g. renamed)
+        b"cnumlab.compiler.grammar\nMissing\n.",
+        # Missing fields
+        pickle.dumps({"version": _GRAMMAR_CACHE_VERSION, "hash": file_hash}),
+    ]
+    for data in invalid_data:
+        cache_file.write_bytes(data)
+        assert Grammar.load(str(grammar_file), builders).content_hash() == (
+            grammar.content_hash()
+        )
+        assert cache_file.read_bytes() != data
+
+    # Modifying the file invalidates the cache
+    grammar_file.write_text("E: T\n\nT: i\n")
+    modified = Grammar.load(str(grammar_file))
+    assert [expr.name for expr in modified.exprs] == ["E", "T"]
+    assert len(modified.E.prods) == 1
+
+
+def test_ebnf_operators(tmp_path):
+    grammar = Grammar.open("./tests/grammars/ebnf.gm")
+    names = [expr.name for expr in grammar.exprs]
+    assert names == ["L", "E", "(, E)*", "(E (, E)*)?", "i+"]
+    assert str(grammar.L.prods[0]) == "-> ( (E (, E)*)? )"
+    helper = grammar.exprs_dict["(, E)*"]
+    assert [str(prod) for prod in helper.prods] == ["-> EPS", "-> (, E)* , E"]
+    assert helper.prods[1].build_ast([[1], ",", 2]) == [1, (",", 2)]
+    helper = grammar.exprs_dict["i+"]
+    assert [str(prod) for prod in helper.prods] == ["-> i", "-> i+ i"]
+
+    grammar_file = tmp_path / "grammar.gm"
+    grammar_file.write_text("A: (a | EPS) b\n")
+    with pytest.raises(ValueError, match="Empty alternative"):
+        Grammar.open(str(grammar_file))
+
+
+def test_parse_large_grammar():
+    # Deeper than the recursion limit: one expression per rule and long
+    # productions with nested groups
+    size = 3000
+    tokens = []
+    for i in range(size):
+        tokens += [Token("ID", f"e{i}"), Token("OP", ":"), Token("ID", f"e{i + 1}")]
+        tokens += [Token("OP", "|"), Token("LITERAL", "x"), Token("NEWLINE", "NEWLINE")]
+    tokens += [Token("ID", f"e{size}"), Token("OP", ":")]
+    tokens += [Token("LITERAL", "y") for _ in range(size)]
+    tokens += [Token("OP", "(")] * 3 + [Token("LITERAL", "z")]
+    tokens += [Token("OP", ")"), Token("OP", "*")] * 3 + [Token("NEWLINE", "NEWLINE")]
+    grammar = _GrammarParser(tokens).parse()
+    assert len(grammar.exprs) == size + 4
+    assert grammar.e0.prods[0].symbols == [grammar.e1]
+    assert str(grammar.e0.prods[1]) == "-> x"
+    last = grammar.exprs_dict[f"e{size}"].prods[0]
+    assert len(last.symbols) == size + 1
+    assert last.symbols[-1].name == "z***"
+    assert [expr.name for expr in grammar.exprs[-3:]] == ["z*", "z**", "z***"]
@@ -1,12 +1,26 @@
 import logging
+import marshal
+import multiprocessing
+import os
 import sys
+import time
 from pathlib import Path
 from typing import List
 
+import numlab.nl_ast as nl_ast
 import pytest
-from numlab.compiler import (AST, Grammar, LR1Parser, ParserManager, Symbol,
-                             Tokenizer)
-from numlab.exceptions import ParsingError
+from numlab.compiler import (AST, Grammar, LR1Parser, LR1Table, ParserManager,
+                             Production, RAParser, Symbol, Token, Tokenizer,
+                             identity)
+from numlab.compiler import ast_cache, parser_manager
+from numlab.compiler.cache import FileLock, atomic_write
+from numlab.compiler.parsers import lr1_parser
+from numlab.exceptions import NumlabError, ParsingError
+from numlab.nl_builders import builders as nl_builders
+from numlab.nl_tokenizer import tknz
+from numlab.nlre import compile_patt
+
+NL_GRAMMAR = Path(__file__).parent.parent / "numlab" / "nl_grammar.gm"
 
 
 # Math ast
@@ -127,3 +141,646 @@ def test_save_and_load_lrtable(grammar, tokenizer):
     assert parser_man.parse("1 + 2").eval() == 3
 
     table_file.unlink()
+
+
+def test_binary_and_text_lrtable(grammar, tokenizer, tmp_path):
+    bin_file = tmp_path / "table"
+    text_file = tmp_path / "table.txt"
+
+    parser = LR1Parser(grammar, str(bin_file))
+    assert bin_file.read_bytes().startswith(b"NLLR")
+
+    parser.lr1_table.save_table(str(text_file), binary=False)
+    assert not text_file.read_bytes().startswith(b"NLLR")
+
+    bin_parser = LR1Parser(grammar, str(bin_file))
+    text_parser = LR1Parser(grammar, str(text_file))
+    entries = dict(parser.lr1_table.items())
+    assert dict(bin_parser.lr1_table.items()) == entries
+    assert dict(text_parser.lr1_table.items()) == entries
+    assert bin_parser.lr1_table[0, "not_a_symbol"] is None
+
+    for table_parser in (bin_parser, text_parser):
+        parser_man = ParserManager(grammar, tokenizer, table_parser)
+        assert parser_man.parse("(1 + 2) * 3").eval() == 9
+
+
+def test_lalr_table(grammar, tokenizer):
+    lr1_parser = LR1Parser(grammar)
+    lalr_parser = LR1Parser(grammar, lalr=True)
+    assert lalr_parser.lr1_table._state_count < lr1_parser.lr1_table._state_count
+
+    parser_man = ParserManager(grammar, tokenizer, lalr_parser)
+    assert parser_man.parse("(1 + 2) * (3 + 4)").eval() == 21
+    with pytest.raises(ParsingError):
+        parser_man.parse("1 + 2)")
+
+
+def test_lalr_conflict():
+    grammar = Grammar.open("./tests/grammars/lr1_not_lalr.gm")
+    LR1Parser(grammar)
+    with pytest.raises(ValueError, match="LALR1 conflict"):
+        LR1Parser(grammar, lalr=True)
+
+
+def test_table_conflict():
+    grammar = Grammar.open("./tests/grammars/ambiguous.gm")
+    with pytest.raises(ValueError, match="LR1 conflict in state"):
+        LR1Parser(grammar)
+
+
+@pytest.mark.parametrize("lalr", [False, True])
+def test_precedence_declarations(tokenizer, lalr):
+    grammar = Grammar.open("./tests/grammars/math_expr_prec.gm")
+    grammar.assign_builders(
+        {
+            "E -> E + E": lambda l, o, r: l + r,
+            "E -> E - E": lambda l, o, r: l - r,
+            "E -> E * E": lambda l, o, r: l * r,
+            "E -> E ^ E": lambda l, o, r: l**r,
+            "E -> - E": lambda o, e: -e,
+            "E -> ( E )": lambda p1, e, p2: e,
+            "E -> i": lambda i: int(i.value),
+        }
+    )
+    tokenizer.add_pattern("-", r"-")
+    tokenizer.add_pattern("^", r"\^")
+    parser = ParserManager(grammar, tokenizer, LR1Parser(grammar, lalr=lalr))
+    assert parser.parse("1 + 2 * 3") == 7
+    assert parser.parse("8 - 4 - 2") == 2
+    assert parser.parse("2 ^ 3 ^ 2") == 512
+    assert parser.parse("-2 ^ 2") == -4
+    assert parser.parse("-2 * 3 - -1") == -5
+    assert parser.parse("(1 + 2) * 3") == 9
+
+
+def test_ebnf_grammar(tokenizer, tmp_path, monkeypatch):
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+    ebnf_builders = {
+        "L -> ( (E (, E)*)? )": lambda p1, items, p2: (
+            [] if items is None else [items[0]] + [e for _, e in items[1]]
+        ),
+        "E -> i+": lambda nums: sum(int(num.value) for num in nums),
+        "E -> * E": lambda s, e: -e,
+    }
+    tokenizer.add_pattern(",", r",")
+    for _ in range(2):
+        # The second time the grammar is loaded from the cache
+        grammar = Grammar.load("./tests/grammars/ebnf.gm", ebnf_builders)
+        parser = ParserManager(grammar, tokenizer, LR1Parser(grammar, lalr=True))
+        assert parser.parse("(1 2, *3, 4)") == [3, -3, 4]
+        assert parser.parse("(5)") == [5]
+        assert parser.parse("()") == []
+        with pytest.raises(ParsingError):
+            parser.parse("(1,)")
+
+
+def test_outdated_table_is_rebuilt(grammar, tmp_path):
+    table_file = tmp_path / "table"
+    LR1Parser(Grammar.open("./tests/grammars/lr1_not_lalr.gm"), str(table_file))
+
+    parser = LR1Parser(grammar, str(table_file))
+    assert parser.lr1_table._first is not None
+
+    parser = LR1Parser(grammar, str(table_file))
+    assert parser.lr1_table._first is None
+    assert not list(tmp_path.glob("*.lock")) and not list(tmp_path.glob(".*"))
+
+
+def test_table_cache(grammar, tmp_path, monkeypatch):
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+
+    parser = LR1Parser(grammar, use_cache=True)
+    assert parser.lr1_table._first is not None
+    assert len(list((tmp_path / "numlab").glob("lr1_*.table"))) == 1
+
+    parser = LR1Parser(grammar, use_cache=True)
+    assert parser.lr1_table._first is None
+
+    parser = LR1Parser(grammar, lalr=True, use_cache=True)
+    assert parser.lr1_table._first is not None
+    assert len(list((tmp_path / "numlab").glob("lalr1_*.table"))) == 1
+
+
+def _hold_lock(lock_file, locked):
+    FileLock(lock_file).acquire()
+    locked.set()
+    time.sleep(60)
+
+
+@pytest.mark.skipif(
+    "fork" not in multiprocessing.get_all_start_methods(), reason="requires fork"
+)
+def test_file_lock(tmp_path):
+    old_umask = os.umask(0o027)
+    try:
+        with atomic_write(tmp_path / "file") as file:
+            file.write(b"data")
+    finally:
+        os.umask(old_umask)
+    assert (tmp_path / "file").stat().st_mode & 0o777 == 0o640
+
+    # A lock held by a killed process is released
+    lock_file = tmp_path / "file.lock"
+    ctx = multiprocessing.get_context("fork")
+    locked = ctx.Event()
+    proc = ctx.Process(target=_hold_lock, args=(str(lock_file), locked))
+    proc.start()
+    assert locked.wait(30)
+    proc.kill()
+    proc.join()
+    with FileLock(lock_file) as lock:
+        assert lock.locked
+    assert not lock.locked and not lock_file.exists()
+
+
+def _build_cached_table(barrier, results):
+    grammar = Grammar.open("./tests/grammars/math_expr_lr.gm")
+    barrier.wait()
+    results.put(LR1Table(grammar, use_cache=True)._first is not None)
+
+
+@pytest.mark.skipif(
+    "fork" not in multiprocessing.get_all_start_methods(), reason="requires fork"
+)
+def test_table_cache_concurrent_processes(tmp_path, monkeypatch):
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+    ctx = multiprocessing.get_context("fork")
+    barrier, results = ctx.Barrier(4), ctx.Queue()
+    procs = [
+        ctx.Process(target=_build_cached_table, args=(barrier, results))
+        for _ in range(4)
+    ]
+    for proc in procs:
+        proc.start()
+    built = [results.get(timeout=30) for _ in procs]
+    for proc in procs:
+        proc.join()
+
+    # Only one process builds the table, the others load it
+    assert sum(built) == 1
+    cache_files = list((tmp_path / "numlab").iterdir())
+    assert len(cache_files) == 1 and cache_files[0].suffix == ".table"
+
+
+@pytest.mark.skipif(
+    "fork" not in multiprocessing.get_all_start_methods(), reason="requires fork"
+)
+@pytest.mark.parametrize("lalr", [False, True])
+def test_parallel_table_build(grammar, monkeypatch, lalr):
+    # Expand every batch in the process pool
+    monkeypatch.setattr(lr1_parser, "_MIN_PARALLEL_BATCH", 1)
+    table = LR1Table(grammar, lalr=lalr)
+    parallel_table = LR1Table(grammar, lalr=lalr, jobs=2)
+    for name in lr1_parser._PACKED_ARRAYS:
+        assert getattr(parallel_table, name) == getattr(table, name)
+
+
+def test_identity_productions_are_skipped(tokenizer, caplog):
+    reduced = []
+
+    def recorded(head_str, builder):
+        return lambda *args: reduced.append(head_str) or builder(*args)
+
+    gm = Grammar.open("./tests/grammars/math_expr_lr.gm")
+    builders = {
+        "F -> i": recorded("F -> i", lambda x: int(x.value)),
+        "F -> ( E )": recorded("F -> ( E )", lambda p1, x, p2: x),
+        "T -> F": identity,
+        "T -> T * F": recorded("T -> T * F", lambda t, m, f: t * f),
+        # Only builders declared as identity are skipped
+        "E -> T": lambda t: t,
+        "E -> E + T": recorded("E -> E + T", lambda e, p, t: e + t),
+    }
+    gm.assign_builders(builders)
+    skipped = {prod.head_str for _, prod in gm.all_productions() if prod.is_identity}
+    assert skipped == {"T -> F"}
+
+    gm.assign_builders({**builders, "E -> T": identity})
+    skipped = {prod.head_str for _, prod in gm.all_productions() if prod.is_identity}
+    assert skipped == {"T -> F", "E -> T"}
+
+    for parser in [LR1Parser(gm, lalr=True), RAParser(gm, lalr=True)]:
+        reduced.clear()
+        parser = ParserManager(gm, tokenizer, parser)
+        assert parser.parse("(1+2)*3+4") == 13
+        assert len(reduced) == 8
+
+    # The LR1 driver makes no reduce step for the identity productions
+    reduced.clear()
+    caplog.set_level(logging.INFO)
+    ParserManager(gm, tokenizer, LR1Parser(gm, lalr=True)).parse("(1+2)*3+4")
+    steps = [
+        record.getMessage().split(",")[0][len("Reduced ") :]
+        for record in caplog.records
+        if record.getMessage().startswith("Reduced ")
+    ]
+    assert sorted(steps) == sorted(reduced)
+
+
+def assert_same_ast(ast, other, path="ast"):
+    """Asserts that two ASTs are equal, comparing the classes and the fields
+    of their nodes."""
+    assert type(ast) is type(other), f"{path}: {type(ast)} != {type(other)}"
+    if isinstance(ast, AST):
+        for field in type(ast).__slots__:
+            assert_same_ast(
+                getattr(ast, field), getattr(other, field), f"{path}.{field}"
+            )
+    elif isinstance(ast, list):
+        assert len(ast) == len(other), f"{path}: {len(ast)} != {len(other)}"
+        for i, (item, other_item) in enumerate(zip(ast, other)):
+            assert_same_ast(item, other_item, f"{path}[{i}]")
+    else:
+        assert ast == other, f"{path}: {ast!r} != {other!r}"
+
+
+def test_recursive_ascent_parser(tokenizer, tmp_path):
+    gm = Grammar.open("./tests/grammars/math_expr_lr.gm")
+    builders = {
+        "F -> i": lambda x: int(x.value),
+        "F -> ( E )": lambda p1, x, p2: x,
+        "T -> F": lambda f: f,
+        "T -> T * F": lambda t, m, f: t * f,
+        "E -> T": lambda t: t,
+        "E -> E + T": lambda e, p, t: e + t,
+    }
+    gm.assign_builders(builders)
+    module_file = tmp_path / "parser.py"
+    for _ in range(2):
+        # The second time the module is imported from the file
+        parser = ParserManager(gm, tokenizer, RAParser(gm, module_file=module_file))
+        assert parser.parse("(1+2)*3+4") == 13
+        assert parser.parse("2*(3+4)*5") == 70
+        for text in ["1+2+", "1+2)", "(", ""]:
+            with pytest.raises(ParsingError):
+                parser.parse(text)
+        assert module_file.exists()
+
+    # Too deep for the recursion limit, it is parsed with the table
+    assert parser.parse("(" * 2000 + "1" + ")" * 2000) == 1
+
+    # A recursion error of a builder is not a too deep input
+    calls = []
+
+    def recursive_builder(x, depth=0):
+        if depth == 0:
+            calls.append(x)
+        return recursive_builder(x, depth + 1)
+
+    gm = Grammar.open("./tests/grammars/math_expr_lr.gm")
+    gm.assign_builders({**builders, "F -> i": recursive_builder})
+    parser = ParserManager(gm, tokenizer, RAParser(gm, module_file=module_file))
+    with pytest.raises(RecursionError):
+        parser.parse("1")
+    # It is not parsed again with the table
+    assert len(calls) == 1
+
+
+def test_recursive_ascent_numlab(nl_parser: ParserManager):
+    text = (
+        "def f(a, b=1, *c):\n"
+        "    while a < b:\n"
+        "        a = a + -1 * b ** 2\n"
+        "    return [x for x in c if x], (a, b)\n"
+        "\n"
+        "print(f(1, 2, 3)[0], 'text')\n"
+    )
+    parser = RAParser(nl_parser.grammar, lalr=True)
+    ra_parser = ParserManager(nl_parser.grammar, tknz, parser)
+    assert_same_ast(ra_parser.parse(text), nl_parser.parse(text))
+
+    with pytest.raises(ParsingError):
+        ra_parser.parse("x = = 1\n")
+
+
+def test_parse_stream(nl_parser: ParserManager):
+    text = "x = 1\nif x:\n    y = 2\nelse:\n    y = 3\n\nprint(x, y)\n"
+    scanned = []
+    tokens = (scanned.append(tok) or tok for tok in tknz.iter_tokens(text))
+    stmts = nl_parser.parse_tokens_stream(tokens)
+
+    # Each statement is given once the first token after it is scanned
+    first = next(stmts)
+    assert first.targets[0].elts[0].name_id == "x"
+    assert [tok.lexem for tok in scanned[-2:]] == ["\n", "if"]
+    assert len(list(stmts)) == 2
+
+    program = nl_parser.parse(text)
+    stmts = list(nl_parser.parse_stream(text))
+    assert len(stmts) == len(program.stmts) == 3
+    assert_same_ast(stmts, program.stmts)
+
+
+def test_incremental_reparse(nl_parser: ParserManager):
+    text = (
+        "x = 1\n"
+        "def f(a):\n"
+        "    return a * 2\n"
+        "\n"
+        "if x:\n"
+        "    y = f(x)\n"
+        "print(x, y)\n"
+    )
+    result = nl_parser.parse_incremental(text)
+    stmts = result.ast.stmts
+    assert len(stmts) == 4
+
+    edits = [
+        # Inside a suite, the other statements are reused
+        (text.index("a * 2"), text.index("a * 2") + 1, "(a + 1)"),
+        # A new clause of the previous statement
+        (text.index("print"), text.index("print"), "else:\n    y = 0\n"),
+        # A new statement at the end
+        (len(text), len(text), "z = 3\n"),
+        # The first statement, which is not reused
+        (4, 5, "f(2)"),
+    ]
+    for start, end, replacement in edits:
+        new = nl_parser.reparse(result, start, end, replacement)
+        assert new.text == text[:start] + replacement + text[end:]
+        assert_same_ast(new.ast, nl_parser.parse(new.text))
+
+    # Only the edited statement is parsed again
+    new = nl_parser.reparse(result, *edits[0])
+    assert new.ast.stmts[0] is stmts[0]
+    assert new.ast.stmts[1] is not stmts[1]
+    assert new.ast.stmts[2:] == stmts[2:]
+
+    with pytest.raises(ParsingError):
+        nl_parser.reparse(result, 4, 5, "= =")
+
+    # Errors are the same as the ones of a full parse
+    invalid_edits = [
+        (4, 5, "= ="),
+        (text.index("a * 2"), text.index("a * 2") + 1, "(a"),
+        (text.index("print"), text.index("print"), "else\n"),
+        (text.index("f(x)"), text.index("f(x)"), "'"),
+        (len(text), len(text), "z = $\n"),
+        # Syntax errors before an invalid character
+        (4, 5, "= = $"),
+        (text.index("a * 2"), text.index("a * 2") + 1, "a) $"),
+        (text.index("print"), text.index("print"), "else\n$"),
+    ]
+    for start, end, replacement in invalid_edits:
+        new_text = text[:start] + replacement + text[end:]
+        with pytest.raises(NumlabError) as full_error:
+            nl_parser.parse(new_text)
+        with pytest.raises(NumlabError) as error:
+            nl_parser.reparse(result, start, end, replacement)
+        assert type(error.value) is type(full_error.value)
+        assert str(error.value) == str(full_error.value)
+
+
+def test_ast_cache(nl_parser: ParserManager, tmp_path, monkeypatch):
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache"))
+    source = tmp_path / "script.nl"
+    source.write_text(
+        "@dec\n"
+        "def f(a, b=1.5, *c):\n"
+        "    return [x for x in c if x is not None], -a, 'text', True\n"
+        "\n"
+        "y = f(1, 2)[0:2]\n"
+    )
+    program = nl_parser.parse_file(str(source), use_cache=True)
+    assert len(list((tmp_path / "cache" / "numlab").glob("ast_*.nlc"))) == 1
+
+    # The cached AST is loaded without parsing the file
+    parse_tokens = nl_parser.parse_tokens
+    monkeypatch.setattr(nl_parser, "parse_tokens", None)
+    cached = nl_parser.parse_file(str(source), use_cache=True)
+    assert cached is not program and isinstance(cached, nl_ast.Program)
+    assert cached.stmts[1].value.elts[0].slice_expr.upper.value == 2
+    assert_same_ast(cached, program)
+
+    # A changed file is parsed again
+    source.write_text("y = 2\n")
+    monkeypatch.setattr(nl_parser, "parse_tokens", parse_tokens)
+    program = nl_parser.parse_file(str(source), use_cache=True)
+    assert program.stmts[0].value.elts[0].value == 2
+    assert len(list((tmp_path / "cache" / "numlab").glob("ast_*.nlc"))) == 2
+
+    assert isinstance(ast_cache.load_ast(ast_cache.dump_ast(program)), nl_ast.Program)
+    with pytest.raises(ValueError):
+        ast_cache.load_ast(b"NLC\x00" + marshal.dumps((2, [("os:system", None)], (0,))))
+
+    # An AST class whose fields changed invalidates the cached AST
+    data = ast_cache.dump_ast(program)
+    key = ast_cache.ast_key(b"y = 2\n")
+    ast_cache.save_cached_ast(key, program)
+    monkeypatch.setattr(nl_ast.Program, "__slots__", ("stmts", "extra"))
+    with pytest.raises(ValueError):
+        ast_cache.load_ast(data)
+    assert ast_cache.load_cached_ast(key) is None
+
+    # The key depends on the code of the builders
+    builders = [prod._builder for _, prod in nl_parser.grammar.all_productions()]
+    fingerprint = ast_cache.code_fingerprint(builders)
+    assert fingerprint == ast_cache.code_fingerprint(builders)
+    assert fingerprint != ast_cache.code_fingerprint([identity])
+
+    # and on the tokenizer
+    monkeypatch.undo()
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache"))
+    nl_parser.parse_file(str(source), use_cache=True)
+    monkeypatch.setitem(tknz.token_patterns, "COMMENT", compile_patt(r"#(.)*\n"))
+    nl_parser.parse_file(str(source), use_cache=True)
+    assert len(list((tmp_path / "cache" / "numlab").glob("ast_*.nlc"))) == 4
+    monkeypatch.setattr(parser_manager, "TAB_SIZE", 8)
+    nl_parser.parse_file(str(source), use_cache=True)
+    assert len(list((tmp_path / "cache" / "numlab").glob("ast_*.nlc"))) == 5
+
+
+def test_parse_many(nl_parser: ParserManager, tmp_path):
+    texts = [f"x = {i}\nif x:\n    print(x, 'x')\n" for i in range(5)]
+    texts[2] = "x = 1\ny = = 2\n"
+    paths = []
+    for i, text in enumerate(texts):
+        paths.append(str(tmp_path / f"script_{i}.nl"))
+        Path(paths[-1]).write_text(text)
+    paths.append(str(tmp_path / "missing.nl"))
+
+    results = list(nl_parser.parse_many(paths, jobs=2))
+    assert [file_path for file_path, _, _ in results] == paths
+    for i in (0, 1, 3, 4):
+        _, ast, error = results[i]
+        assert error is None
+        assert_same_ast(ast, nl_parser.parse(texts[i]))
+    _, ast, error = results[2]
+    assert ast is None and isinstance(error, ParsingError)
+    assert (error.line, error.column, error.token.lexem) == (1, 4, "=")
+    assert isinstance(results[5][2], FileNotFoundError)
+
+    unordered = list(nl_parser.parse_many(paths, jobs=2, ordered=False))
+    assert sorted(file_path for file_path, _, _ in unordered) == sorted(paths)
+    sequential = list(nl_parser.parse_many(paths, jobs=1))
+    assert [error is None for _, _, error in sequential] == [
+        error is None for _, _, error in results
+    ]
+
+
+def test_recognize(nl_parser: ParserManager, tmp_path, monkeypatch):
+    # No builder is called
+    for _, prod in nl_parser.grammar.all_productions():
+        monkeypatch.setattr(prod, "_builder", None)
+    text = "def f(a):\n    return [x for x in a if x]\n\nprint(f((1, 2)))\n"
+    nl_parser.check(text)
+    source = tmp_path / "script.nl"
+    source.write_text(text)
+    nl_parser.check_file(str(source))
+    RAParser(nl_parser.grammar, lalr=True).recognize(
+        tknz.tokenize(text) + [Token("$", "$")]
+    )
+
+    with pytest.raises(ParsingError) as err:
+        nl_parser.check("x = 1\nif x:\n    y = = 2\n")
+    assert (err.value.line, err.value.column) == (2, 8)
+    with pytest.raises(ValueError):
+        nl_parser.parser.recognize(tknz.tokenize(text))
+
+
+@pytest.fixture(scope="module")
+def nl_parser():
+    grammar = Grammar.open(str(NL_GRAMMAR))
+    grammar.assign_builders(nl_builders)
+    return ParserManager(grammar, tknz, LR1Parser(grammar, lalr=True))
+
+
+def test_numlab_list_rules(nl_parser: ParserManager):
+    program = nl_parser.parse("".join(f"x{i} = {i}\n\n" for i in range(300)))
+    assert len(program.stmts) == 300
+    assert [stmt.value.elts[0].value for stmt in program.stmts] == list(range(300))
+
+    program = nl_parser.parse(
+        "@a.b.c\n"
+        "def f(a, b=1, *c, **d):\n"
+        "    global x, y, z\n"
+        "    if a:\n"
+        "        pass\n"
+        "    elif b:\n"
+        "        pass\n"
+        "    elif c:\n"
+        "        pass\n"
+        "    return g(a, b)[1, 2:3], c\n"
+    )
+    func = program.stmts[0]
+    decorator = func.decorators[0]
+    assert decorator.attr == "c" and decorator.value.value.name_id == "a"
+    assert [arg.arg.name_id for arg in func.args.args] == ["a", "b", "c", "d"]
+    assert func.body[0].names[2].name_id == "z"
+    if_stmt = func.body[1]
+    assert if_stmt.orelse[0].orelse[0].test.name_id == "c"
+    ret = func.body[2].expr
+    assert len(ret.elts) == 2 and len(ret.elts[0].slice_expr.elts) == 2
+    assert ret.elts[0].value.args[1].name_id == "b"
+
+    with pytest.raises(ValueError):
+        nl_parser.parse("def f(a=1, b):\n    pass\n")
+
+
+def test_numlab_builders(nl_parser: ParserManager):
+    def parse_stmt(text):
+        return nl_parser.parse(text).stmts[0]
+
+    # Classes with and without bases
+    for text in ["class A:\n    pass\n", "class A():\n    pass\n"]:
+        cls = parse_stmt(text)
+        assert cls.name.name_id == "A" and cls.bases == []
+    cls = parse_stmt("class A(B, C):\n    x = 1\n")
+    assert [base.name_id for base in cls.bases] == ["B", "C"]
+    assert isinstance(cls.body[0], nl_ast.AssignStmt)
+
+    # Typed parameters
+    func = parse_stmt("def f(a: int, b: str = 'x', *c):\n    pass\n")
+    a, b, c = func.args.args
+    assert a.annotation.name_id == "int" and a.default is None
+    assert b.annotation.name_id == "str" and b.default.value == "x"
+    assert c.is_arg and func.args.vararg is c
+
+    # Validation of the parameters order
+    for text in [
+        "def f(a=1, b):\n    pass\n",
+        "def f(*a, *b):\n    pass\n",
+        "def f(**a, *b):\n    pass\n",
+        "def f(**a, **b):\n    pass\n",
+    ]:
+        with pytest.raises(ValueError):
+            nl_parser.parse(text)
+    func = parse_stmt("def f(a, b=1, *c, d, **e):\n    pass\n")
+    assert [arg.arg.name_id for arg in func.args.args] == ["a", "b", "c", "d", "e"]
+    assert func.args.vararg.arg.name_id == "c" and func.args.kwarg.arg.name_id == "e"
+
+    # if / elif / else
+    if_stmt = parse_stmt("if a:\n    x = 1\nelif b:\n    x = 2\nelse:\n    x = 3\n")
+    elif_stmt = if_stmt.orelse[0]
+    assert elif_stmt.test.name_id == "b"
+    assert elif_stmt.orelse[0].value.elts[0].value == 3
+    if_stmt = parse_stmt("if a:\n    x = 1\nelse:\n    x = 3\n")
+    assert if_stmt.orelse[0].value.elts[0].value == 3
+
+    # try / except / else / finally
+    try_stmt = parse_stmt(
+        "try:\n    x = 1\n"
+        "except:\n    x = 2\n"
+        "except E:\n    x = 3\n"
+        "except E as e:\n    x = 4\n"
+        "else:\n    x = 5\n"
+        "finally:\n    x = 6\n"
+    )
+    bare, typed, named = try_stmt.handlers
+    assert bare.hand_type is None and bare.name is None
+    assert typed.hand_type.name_id == "E" and typed.name is None
+    assert named.name.name_id == "e" and named.body[0].value.elts[0].value == 4
+    assert try_stmt.orelse[0].value.elts[0].value == 5
+    assert try_stmt.finalbody[0].value.elts[0].value == 6
+    body = "try:\n    x = 1\nexcept:\n    x = 2\n"
+    try_stmt = parse_stmt(body + "else:\n    x = 5\n")
+    assert len(try_stmt.orelse) == 1 and not try_stmt.finalbody
+    try_stmt = parse_stmt(body + "finally:\n    x = 6\n")
+    assert not try_stmt.orelse and len(try_stmt.finalbody) == 1
+
+    # Decorators
+    func = parse_stmt("@a.b\n@c()\n@d.e(1, k=2)\ndef f():\n    pass\n")
+    attr, call, call_args = func.decorators
+    assert attr.attr == "b" and attr.value.name_id == "a"
+    assert call.func.name_id == "c" and call.args == []
+    assert call_args.func.attr == "e" and call_args.args[0].value == 1
+    assert call_args.keywords[0].arg.name_id == "k"
+
+    # Targets of for loops
+    for_stmt = parse_stmt("for a, b, c in x:\n    pass\n")
+    assert [elt.name_id for elt in for_stmt.target.elts] == ["a", "b", "c"]
+    assert parse_stmt("for a in x:\n    pass\n").target.name_id == "a"
+
+    # Chained assignments
+    assign = parse_stmt("x = y = 1, 2\n")
+    assert [target.elts[0].name_id for target in assign.targets] == ["x", "y"]
+    assert [elt.value for elt in assign.value.elts] == [1, 2]
+    func = parse_stmt("def f():\n    x = y = yield 1\n")
+    assign = func.body[0]
+    assert len(assign.targets) == 2 and isinstance(assign.value, nl_ast.YieldExpr)
+
+    # Conditions of comprehensions
+    expr = parse_stmt("[x for x in y if lambda: x]\n").elts[0]
+    lambda_expr = expr.generators[0].ifs[0].test
+    assert isinstance(lambda_expr.args, nl_ast.Args) and lambda_expr.name is None
+
+
+def test_numlab_operator_precedence(nl_parser: ParserManager):
+    expr = nl_parser.parse("a - b - -c * d ** e ** f\n").stmts[0].elts[0]
+    assert expr.op == nl_ast.Operator.SUB and expr.right.op == nl_ast.Operator.MUL
+    assert expr.left.op == nl_ast.Operator.SUB and expr.left.left.name_id == "a"
+    assert expr.right.left.op == nl_ast.UnaryOp.USUB
+    power = expr.right.right
+    assert power.left.name_id == "d" and power.right.op == nl_ast.Operator.POW
+
+    expr = nl_parser.parse("not a == b and c or d\n").stmts[0].elts[0]
+    assert expr.op == nl_ast.Operator.OR and expr.left.op == nl_ast.Operator.AND
+    assert expr.left.left.op == nl_ast.UnaryOp.NOT
+    assert expr.left.left.operand.op == nl_ast.CmpOp.EQ
+
+    # The unary 'not' has its own level, the 'not' token has no precedence
+    assert "not" not in nl_parser.grammar.precedence
+    expr = nl_parser.parse("not a not in b or not c\n").stmts[0].elts[0]
+    assert expr.op == nl_ast.Operator.OR and expr.right.op == nl_ast.UnaryOp.NOT
+    assert expr.left.operand.op == nl_ast.CmpOp.NOT_IN
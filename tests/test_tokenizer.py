@@ -1,8 +1,9 @@
 import logging
+import pickle
 import re
 
 import pytest
-from numlab.compiler import Tokenizer
+from numlab.compiler import LineIndex, Tokenizer
 from numlab.exceptions import TokenizationError
 
 
@@ -84,3 +85,130 @@ def test_wrong_pattern_order(tokenizer: Tokenizer):
     tokens = tokenizer.tokenize(text)
 
     assert tokens[0].token_type != ttype_2
+
+
+def test_token_positions(tokenizer: Tokenizer):
+    tokenizer.add_pattern("NEWLINE", r"\n")
+    tokenizer.add_pattern("SPACE", r"( |\t)( |\t)*", lambda l: None)
+    tokenizer.add_pattern("AB", r"(a|b)(a|b)*")
+
+    text = "ab ba\n\n  aaa\nb"
+    tokens = tokenizer.tokenize(text)
+
+    positions = [(tok.token_type, tok.line, tok.col) for tok in tokens]
+    assert positions == [
+        ("AB", 0, 0),
+        ("AB", 0, 3),
+        ("NEWLINE", 0, 5),
+        ("NEWLINE", 1, 0),
+        ("AB", 2, 2),
+        ("NEWLINE", 2, 5),
+        ("AB", 3, 0),
+    ]
+    assert [tok.pos for tok in tokens] == [0, 3, 5, 6, 9, 12, 13]
+
+    # Pickled tokens keep their positions (without the source text)
+    unpickled = pickle.loads(pickle.dumps(tokens))
+    assert [(tok.token_type, tok.line, tok.col) for tok in unpickled] == positions
+    assert unpickled[4].AB and unpickled[4].line_index is None
+
+
+def test_line_index():
+    index = LineIndex("a\nbc\n\nd")
+    assert list(index.line_starts) == [0, 2, 5, 6]
+    assert index.position(0) == (0, 0)
+    assert index.position(1) == (0, 1)
+    assert index.position(3) == (1, 1)
+    assert index.position(5) == (2, 0)
+    assert index.position(6) == (3, 0)
+
+
+def test_indentation():
+    tokenizer = Tokenizer(indentation=True)
+    tokenizer.add_pattern("NEWLINE", r"\n")
+    tokenizer.add_pattern("SPACE", r"( |\t)( |\t)*", lambda l: None)
+    tokenizer.add_pattern("AB", r"(a|b)(a|b)*")
+
+    text = "\na\n  b\n\n    ab\n  a\nb"
+    tokens = tokenizer.tokenize(text)
+
+    types = [tok.token_type for tok in tokens]
+    assert types == [
+        "AB",
+        "NEWLINE",
+        "INDENT",
+        "AB",
+        "NEWLINE",
+        "INDENT",
+        "AB",
+        "NEWLINE",
+        "DEDENT",
+        "AB",
+        "NEWLINE",
+        "DEDENT",
+        "AB",
+        "NEWLINE",
+    ]
+    assert (tokens[2].line, tokens[2].col) == (2, 2)
+
+
+def test_tokenize_parallel():
+    tokenizer = Tokenizer(indentation=True)
+    tokenizer.add_pattern("NEWLINE", r"\n")
+    tokenizer.add_pattern("SPACE", r"( |\t)( |\t)*", lambda l: None)
+    tokenizer.add_pattern("STRING", r"'(^')*'")
+    tokenizer.add_pattern("AB", r"(a|b)(a|b)*")
+
+    text = "a\n  b 'a\nb'\nab\n  'b\nba'\nb\n" * 20
+    tokens = tokenizer.tokenize(text)
+
+    for jobs in [1, 2, 5]:
+        par_tokens = tokenizer.tokenize_parallel(text, jobs=jobs)
+        assert [(t.token_type, t.lexem, t.line, t.col) for t in par_tokens] == [
+            (t.token_type, t.lexem, t.line, t.col) for t in tokens
+        ]
+
+
+def test_tokenize_file(tmp_path):
+    tokenizer = Tokenizer(indentation=True)
+    tokenizer.add_pattern("NEWLINE", r"\n")
+    tokenizer.add_pattern("SPACE", r"( |\t)( |\t)*", lambda l: None)
+    tokenizer.add_pattern("AB", r"(a|b)(a|b)*")
+
+    text = "a\n\tb\n    ab\n\t a\n"
+    file_path = tmp_path / "source"
+    file_path.write_text(text, encoding="utf-8")
+
+    tokens = tokenizer.tokenize(text, tab_size=4)
+    file_tokens = tokenizer.tokenize_file(str(file_path), tab_size=4)
+    lazy_tokens = tokenizer.iter_file_tokens(str(file_path), tab_size=4)
+
+    for other in [file_tokens, list(lazy_tokens)]:
+        assert [(t.token_type, t.lexem, t.line, t.col) for t in other] == [
+            (t.token_type, t.lexem, t.line, t.col) for t in tokens
+        ]
+    assert [(t.line, t.col) for t in tokens if t.AB] == [(0, 0), (1, 4), (2, 4), (3, 5)]
+    assert [t.token_type for t in tokens].count("INDENT") == 2
+
+    # Errors are located with the same tab size
+    with pytest.raises(TokenizationError, match="Line: 1, Col: 5"):
+        tokenizer.tokenize("a\n\tbc", tab_size=4)
+
+
+def test_iter_tokens():
+    tokenizer = Tokenizer(indentation=True)
+    tokenizer.add_pattern("NEWLINE", r"\n")
+    tokenizer.add_pattern("SPACE", r"( |\t)( |\t)*", lambda l: None)
+    tokenizer.add_pattern("AB", r"(a|b)(a|b)*")
+
+    text = "a\n  b\n" * 3 + "!"
+    tokens = tokenizer.iter_tokens(text)
+    assert [next(tokens).lexem for _ in range(4)] == ["a", "\n", "INDENT", "b"]
+    with pytest.raises(TokenizationError):
+        list(tokens)
+
+    tokenizer.process_tokens(lambda tokens: tokens[1:])
+    text = text[:-1]
+    assert [t.lexem for t in tokenizer.iter_tokens(text)] == [
+        t.lexem for t in tokenizer.tokenize(text)
+    ]